@@ -0,0 +1,208 @@
+"""
+Verificación y benchmark de batch_engine.BatchEngine contra ModeloEdificio.
+
+1. Fases exactas: toma estados de partidas reales del modelo (clones cada pocos pasos),
+   los carga en un lote y aplica la misma fase en ambos lados con las mismas entradas
+   aleatorias: campos de distancia, advance_goo en una celda dada, explosion/shockwave,
+   check_secondary_effects y knocked_down con una entrada dada. Cualquier diferencia en
+   tableros, paredes, puertas, contadores o agentes termina con error.
+2. Partidas completas: el lote usa su propio generador, así que se comparan distribuciones
+   (razón de fin, víctimas salvadas y perdidas, pasos) contra batch_runner con la misma
+   cantidad de partidas; una diferencia mayor a --sigmas errores estándar termina con error.
+3. Rendimiento: partidas por hora del lote contra el modelo en un proceso. Uso:
+    python benchmarks/bench_batch.py --states 300 --games 2000 --batch 4096
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+
+import numpy as np
+
+SIM_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'simulation_data')
+sys.path.insert(0, SIM_DIR)
+
+import flashpoint as fp  # noqa: E402
+import batch_runner  # noqa: E402
+from batch_engine import BatchEngine, FIELD_POI, FIELD_EXIT, INF  # noqa: E402
+from board import GOO, AGENTS  # noqa: E402
+
+
+class ScriptedRandom(random.Random):
+    """Generador del modelo con sorteos fijos: randrange regresa ``cell`` y choice el elemento ``entry``."""
+
+    def __init__(self, cell=0, entry=0):
+        super().__init__(0)
+        self.cell = cell
+        self.entry = entry
+
+    def randrange(self, *args, **kwargs):
+        return self.cell
+
+    def choice(self, seq):
+        return seq[self.entry % len(seq)]
+
+
+def reference_states(scenario, count, seed, every=7, max_steps=400):
+    """Clones de partidas del modelo cada ``every`` pasos hasta reunir ``count`` estados."""
+    states = []
+    for game_seed in fp.spawn_seeds(seed, count):
+        model = fp.ModeloEdificio.from_scenario(scenario, seed=game_seed, record_trajectory=False)
+        while model.running and model.steps < max_steps and len(states) < count:
+            model.step()
+            if model.running and model.steps % every == 0:
+                states.append(model.clone())
+        if len(states) >= count:
+            break
+    return states
+
+
+def model_state(model, engine):
+    """Estado de un modelo con la forma de un juego de BatchEngine."""
+    store = model.agent_store
+    return {
+        "board": model.board.ravel() & (0xFF ^ AGENTS),
+        "wall": model.wall_code,
+        "door": model.door_code,
+        "counters": (model.current_threat_markers, model.poi_total_count, model.poi_false_alarm,
+                     model.poi_real_victim, model.poi_in_building, model.damage_counter,
+                     model.saved_victims, model.lost_victims),
+        "pos": store.x[:engine.agents] * engine.width + store.y[:engine.agents],
+        "carrying": store.carrying[:engine.agents],
+    }
+
+
+def engine_state(engine, game):
+    """Estado de un juego del lote (ver model_state)."""
+    return {
+        "board": engine.board[game, :engine.cells],
+        "wall": engine.wall[game, :engine.edges],
+        "door": engine.door[game, :engine.edges],
+        "counters": tuple(int(getattr(engine, name)[game]) for name in (
+            "threat_markers", "poi_total", "poi_false", "poi_real", "poi_in_building", "damage", "saved", "lost")),
+        "pos": engine.pos[game],
+        "carrying": engine.carrying[game],
+    }
+
+
+def compare(phase, models, engine):
+    """Termina con error si algún juego del lote difiere de su modelo."""
+    for game, model in enumerate(models):
+        expected, actual = model_state(model, engine), engine_state(engine, game)
+        for key in expected:
+            if not np.array_equal(np.asarray(expected[key]), np.asarray(actual[key])):
+                raise AssertionError(f"{phase}: diferencia en '{key}' (juego {game}, seed {model.seed}, "
+                                     f"paso {model.steps}):\n{expected[key]}\n{actual[key]}")
+
+
+def check_phases(states, seed):
+    """Aplica cada fase determinista en el modelo y en el lote; regresa cuántos estados revisó."""
+    rng = np.random.default_rng(seed)
+    engine = BatchEngine.from_models(states)
+    games = np.arange(len(states))
+
+    # Campos de distancia (ambos objetivos), contra DistanceField del modelo.
+    for kind, goal, carrying in ((FIELD_POI, fp.GOAL_POI, False), (FIELD_EXIT, fp.GOAL_EXIT, True)):
+        fields = engine.distance_fields(games, np.full(len(games), kind))
+        for game, model in enumerate(states):
+            distance = model.distance_field(goal, carrying).distance
+            expected = np.array([distance[divmod(cell, model.width)] for cell in range(engine.cells)])
+            actual = fields[game, :engine.cells].astype(float)
+            actual[actual >= INF] = np.inf
+            if not np.array_equal(expected, actual):
+                raise AssertionError(f"Campo de distancia {goal} distinto (seed {states[game].seed}, paso {model.steps})")
+
+    phases = [
+        ("advance_goo", lambda model, cell: model.advance_goo(), lambda cells: engine.advance_goo(games, cells)),
+        ("explosion", lambda model, cell: model.explosion(*divmod(cell, model.width)),
+         lambda cells: engine.explosion(games, cells)),
+        ("check_secondary_effects", lambda model, cell: model.check_secondary_effects(),
+         lambda cells: engine.promote_droplets(games)),
+    ]
+    models = [model.clone() for model in states]
+    for name, reference, batched in phases:
+        if name == "explosion":
+            # Una celda con goo de cada tablero (o cualquiera si no hay) para forzar explosiones.
+            cells = np.array([rng.choice(np.flatnonzero(board & GOO)) if (board & GOO).any()
+                              else rng.integers(engine.cells) for board in engine.board[:, :engine.cells]])
+        else:
+            cells = rng.integers(engine.cells, size=len(models))
+        for model, cell in zip(models, cells):
+            model.random = ScriptedRandom(cell=int(cell))
+            reference(model, int(cell))
+        batched(cells)
+        compare(name, models, engine)
+
+    entries = rng.integers(len(engine.entry_points), size=len(models))
+    for model, entry in zip(models, entries):
+        model.random = ScriptedRandom(entry=int(entry))
+        model.agent_store.agents[0].knocked_down()
+    engine.knocked_down(games, np.repeat(entries[:, None], engine.employees, axis=1))
+    compare("knocked_down", models, engine)
+    return len(states)
+
+
+def standard_error(p, q, n, m):
+    """Error estándar de la diferencia entre dos proporciones."""
+    pooled = (p * n + q * m) / (n + m)
+    return max(np.sqrt(pooled * (1 - pooled) * (1 / n + 1 / m)), 1e-9)
+
+
+def check_games(scenario, games, batch, seed, max_steps, sigmas, workers):
+    """Compara distribuciones de resultados del lote y del modelo; regresa ambos resúmenes y los tiempos."""
+    start = time.perf_counter()
+    reference = batch_runner.aggregate(batch_runner.run_batch(scenario, games, base_seed=seed, max_steps=max_steps,
+                                                              workers=workers))
+    reference_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    engine = BatchEngine.from_scenario(scenario, batch, seed=seed)
+    engine.run(max_steps)
+    batched = batch_runner.aggregate(engine.results())
+    batch_seconds = time.perf_counter() - start
+
+    print(f"{'':<22} {'modelo':>10} {'lote':>10} {'σ':>7}")
+    failures = []
+    reasons = sorted(set(reference["end_reasons"]) | set(batched["end_reasons"]))
+    for reason in reasons:
+        p, q = reference["end_reasons"].get(reason, 0.0), batched["end_reasons"].get(reason, 0.0)
+        z = abs(p - q) / standard_error(p, q, games, batch)
+        print(f"{reason:<22} {p:>10.3f} {q:>10.3f} {z:>7.2f}")
+        if z > sigmas:
+            failures.append(reason)
+    for key in ("mean_saved_victims", "mean_lost_victims", "mean_steps"):
+        print(f"{key:<22} {reference[key]:>10.2f} {batched[key]:>10.2f}")
+    if failures:
+        raise AssertionError(f"Distribuciones distintas en: {', '.join(failures)}")
+    return reference_seconds, batch_seconds
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Verificación y benchmark del motor por lotes.")
+    parser.add_argument('--states', type=int, default=300, help="Estados del modelo para las fases exactas.")
+    parser.add_argument('--games', type=int, default=2000, help="Partidas del modelo para comparar distribuciones.")
+    parser.add_argument('--batch', type=int, default=4096, help="Partidas del lote.")
+    parser.add_argument('--steps', type=int, default=20000, help="Pasos máximos por partida.")
+    parser.add_argument('--sigmas', type=float, default=4.0, help="Diferencia máxima, en errores estándar.")
+    parser.add_argument('--workers', type=int, default=None, help="Procesos del modelo (por defecto, todos).")
+    parser.add_argument('--scenario', default=fp.DEFAULT_SCENARIO)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+
+    scenario = fp.load_scenario(args.scenario)
+    states = reference_states(scenario, args.states, args.seed)
+    print(f"{check_phases(states, args.seed)} estados del modelo: todas las fases coinciden")
+
+    workers = args.workers or os.cpu_count() or 1
+    reference_seconds, batch_seconds = check_games(scenario, args.games, args.batch, args.seed, args.steps,
+                                                   args.sigmas, workers)
+    per_hour = args.batch / batch_seconds * 3600
+    reference_per_hour = args.games / (reference_seconds * workers) * 3600
+    print(f"modelo: {reference_per_hour:,.0f} partidas/hora por proceso ({workers} procesos)")
+    print(f"lote:   {per_hour:,.0f} partidas/hora en un proceso ({per_hour / reference_per_hour:.1f}x)")
+
+
+if __name__ == '__main__':
+    main()
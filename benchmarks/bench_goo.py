@@ -0,0 +1,111 @@
+"""
+Verificación y benchmark de la propagación de goo: recorrido celda por celda (anterior)
+contra goo.promote_droplets (NumPy, o su recorrido sobre listas hasta LOOP_MAX_CELLS celdas).
+
+Primero compara ambas implementaciones sobre muchos tableros aleatorios de distintos
+tamaños y densidades (cualquier diferencia termina con error), y luego mide el tiempo
+por llamada en tableros mucho más grandes que 6x8. Uso:
+    python benchmarks/bench_goo.py --cases 2000 --sizes 6x8 60x80 240x320
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+SIM_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'simulation_data')
+sys.path.insert(0, SIM_DIR)
+
+from mesa.space import MultiGrid  # noqa: E402
+from goo import promote_droplets  # noqa: E402
+from board import THREAT_BITS, THREAT_LAYER  # noqa: E402
+
+
+def legacy_check_secondary_effects(threat_markers, grid):
+    """Implementación anterior de ModeloEdificio.check_secondary_effects."""
+    height, width = threat_markers.shape
+    for x in range(height):
+        for y in range(width):
+            if threat_markers[x, y] == 1:
+                neighbors = grid.get_neighborhood((x, y), moore=True, include_center=False)
+                goo_nearby = any(
+                    threat_markers[nx, ny] == 2
+                    for nx, ny in neighbors
+                    if 0 <= nx < height and 0 <= ny < width
+                )
+                if goo_nearby:
+                    threat_markers[x, y] = 2
+
+
+def random_board(rng, height, width):
+    """Tablero aleatorio de threat_markers (0 vacío, 1 droplet, 2 goo) con densidades variables."""
+    weights = rng.dirichlet((1.0, 1.0, 1.0))
+    return rng.choice(3, size=(height, width), p=weights).astype(float)
+
+
+def to_board(threat_markers):
+    """Convierte threat_markers (0, 1, 2) al tablero de bits que usa promote_droplets."""
+    board = np.zeros(threat_markers.shape, dtype=np.uint8)
+    for value, bits in THREAT_BITS.items():
+        board[threat_markers == value] = bits
+    return board
+
+
+def check(cases, seed):
+    """Compara ambas implementaciones; regresa el número de tableros revisados."""
+    rng = np.random.default_rng(seed)
+    grids = {}
+    for case in range(cases):
+        height, width = int(rng.integers(1, 20)), int(rng.integers(1, 20))
+        grid = grids.setdefault((height, width), MultiGrid(height, width, torus=False))
+        board = random_board(rng, height, width)
+        expected = board.copy()
+        legacy_check_secondary_effects(expected, grid)
+        actual = to_board(board)
+        promote_droplets(actual)
+        actual = THREAT_LAYER[actual]
+        if not np.array_equal(expected, actual):
+            raise AssertionError(f"Diferencia en el caso {case} ({height}x{width}):\n{board}\n{expected}\n{actual}")
+    return cases
+
+
+def time_call(function, boards, repeats):
+    """Segundos promedio por llamada, sobre copias frescas de cada tablero."""
+    elapsed = 0.0
+    calls = 0
+    for _ in range(repeats):
+        for board in boards:
+            working = board.copy()
+            start = time.perf_counter()
+            function(working)
+            elapsed += time.perf_counter() - start
+            calls += 1
+    return elapsed / calls
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Verificación y benchmark de la propagación de goo.")
+    parser.add_argument('--cases', type=int, default=2000, help="Tableros aleatorios a comparar.")
+    parser.add_argument('--sizes', nargs='+', default=['6x8', '60x80', '240x320'], help="Tamaños a medir (HxW).")
+    parser.add_argument('--boards', type=int, default=5, help="Tableros aleatorios por tamaño.")
+    parser.add_argument('--repeats', type=int, default=3)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+
+    print(f"{check(args.cases, args.seed)} tableros aleatorios: ambas implementaciones coinciden")
+
+    rng = np.random.default_rng(args.seed)
+    print(f"{'tamaño':<10} {'anterior ms':>12} {'actual ms':>10} {'aceleración':>12}")
+    for size in args.sizes:
+        height, width = (int(value) for value in size.split('x'))
+        grid = MultiGrid(height, width, torus=False)
+        boards = [random_board(rng, height, width) for _ in range(args.boards)]
+        legacy = time_call(lambda board: legacy_check_secondary_effects(board, grid), boards, args.repeats)
+        vectorized = time_call(promote_droplets, [to_board(board) for board in boards], args.repeats)
+        print(f"{size:<10} {legacy * 1e3:>12.3f} {vectorized * 1e3:>10.3f} {legacy / vectorized:>11.1f}x")
+
+
+if __name__ == '__main__':
+    main()
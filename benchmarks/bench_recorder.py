@@ -0,0 +1,198 @@
+"""
+Benchmark de recolección + exportación por paso: DataCollector + iterrows (anterior)
+contra TrajectoryRecorder + sinks (actual).
+
+Ambos recolectores observan el mismo modelo en cada paso, así que comparan exactamente
+el mismo trabajo. Uso:
+    python benchmarks/bench_recorder.py --steps 200 --repeats 5
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+SIM_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'simulation_data')
+sys.path.insert(0, SIM_DIR)
+
+import flashpoint as fp  # noqa: E402
+from mesa.datacollection import DataCollector  # noqa: E402
+from trajectory import JsonSink, BinarySink  # noqa: E402
+
+
+# -----------------------------------------------------------------------------------------------------------
+# REPORTEROS ANTERIORES
+# -----------------------------------------------------------------------------------------------------------
+# Las funciones que ModeloEdificio registraba en su DataCollector antes de TrajectoryRecorder.
+# Solo las usa este benchmark; el modelo ya no las expone.
+
+def get_grid_doors_entries(model):
+    """Crea una representación de las puertas y puntos de entrada del edificio."""
+    combined_grid = np.copy(model.doors)
+    for x, y in model.entry_points:
+        combined_grid[x, y] = max(combined_grid[x, y], 16)
+    if hasattr(model, "lootbug_nest"):
+        nest_x, nest_y = model.lootbug_nest
+        combined_grid[nest_x, nest_y] = max(combined_grid[nest_x, nest_y], 32)
+    return combined_grid
+
+
+def get_grid_walls(model):
+    """Crea una representación de las paredes del edificio."""
+    return model.walls.copy()
+
+
+def get_grid_poi(model):
+    """Crea una representación de los POI en el edificio."""
+    return model.poi_placement.copy()
+
+
+def get_grid_threat_markers(model):
+    """Crea una representación de los threat markers en el edificio."""
+    return model.threat_markers.copy()
+
+
+def get_grid(model):
+    """Crea una representación de los agentes en el edificio (6 empleado, 7 lootbug)."""
+    grid = np.zeros((model.grid.width, model.grid.height))
+    for content, (x, y) in model.grid.coord_iter():
+        for agent in content:
+            if isinstance(agent, fp.EmployeeAgent):
+                grid[x][y] = 6
+            if isinstance(agent, fp.LootBugAgent):
+                grid[x][y] = 7
+    return grid
+
+
+def get_agents_positions(model):
+    """Posición, valor en la grid (6 o 7) y estado de transporte de víctimas de cada agente."""
+    agents_info = []
+    for agent in model.schedule.agents:
+        if isinstance(agent, (fp.EmployeeAgent, fp.LootBugAgent)):
+            agents_info.append({
+                "position": agent.pos,
+                "value": 6 if isinstance(agent, fp.EmployeeAgent) else 7,
+                "carrying_victim": getattr(agent, "carrying_victim", False),
+            })
+    return agents_info
+
+
+def convert_keys_to_str(data):
+    """Convierte las claves de un diccionario a cadenas."""
+    if isinstance(data, dict):
+        return {str(key): convert_keys_to_str(value) for key, value in data.items()}
+    elif isinstance(data, list):
+        return [convert_keys_to_str(element) for element in data]
+    else:
+        return data
+
+
+def legacy_datacollector():
+    """DataCollector con los doce reporteros que usaba ModeloEdificio."""
+    return DataCollector(
+        model_reporters={
+            "Grid 1 Puertas y salidas": get_grid_doors_entries,
+            "Grid 2 Paredes": get_grid_walls,
+            "Grid 3 POI": get_grid_poi,
+            "Grid 4 Threatmarkers": get_grid_threat_markers,
+            "Grid 5 Agents": get_grid,
+            "Agentes": get_agents_positions,
+            "Estados Paredes": lambda model: model.wall_states,
+            "Estados Puertas": lambda model: model.door_states,
+            "Steps": lambda model: model.steps,
+            "Edificio colapsado": lambda model: model.collapsed_building,
+            "Victimas salvadas": lambda model: model.saved_victims,
+            "Victimas perdidas": lambda model: model.lost_victims,
+        }
+    )
+
+
+def legacy_export(datacollector, summary, output_file):
+    """Exportación anterior: DataFrame -> iterrows -> listas -> json.dump."""
+    collected_data = datacollector.get_model_vars_dataframe()
+    json_data = {"simulation_data": [], "summary": summary}
+    for index, row in collected_data.iterrows():
+        json_data["simulation_data"].append({
+            "step": row["Steps"],
+            "grid_doors_entries": np.array(row["Grid 1 Puertas y salidas"]).tolist(),
+            "grid_walls": np.array(row["Grid 2 Paredes"]).tolist(),
+            "grid_poi": np.array(row["Grid 3 POI"]).tolist(),
+            "grid_threat_markers": np.array(row["Grid 4 Threatmarkers"]).tolist(),
+            "grid_agents": np.array(row["Grid 5 Agents"]).tolist(),
+            "agents_info": convert_keys_to_str(row["Agentes"]),
+            "wall_states": convert_keys_to_str(row["Estados Paredes"]),
+            "door_states": convert_keys_to_str(row["Estados Puertas"]),
+            "collapsed_building": row["Edificio colapsado"],
+            "saved_victims": row["Victimas salvadas"],
+            "lost_victims": row["Victimas perdidas"],
+        })
+    with open(output_file, 'w') as outfile:
+        json.dump(json_data, outfile, indent=4)
+
+
+def run_once(steps, output_dir):
+    model = fp.ModeloEdificio.from_scenario(fp.load_scenario())
+    # El modelo ya recolecta con su TrajectoryRecorder dentro de step(); se desactiva
+    # para medir ambos recolectores por separado sobre el mismo estado.
+    recorder = model.recorder
+    model.recorder = type("NoRecorder", (), {"collect": lambda self, model: None})()
+    datacollector = legacy_datacollector()
+
+    timings = {"legacy_collect": 0.0, "recorder_collect": 0.0}
+    collected = 0
+    for _ in range(steps):
+        if not model.running:
+            break
+        model.step()
+        start = time.perf_counter()
+        datacollector.collect(model)
+        timings["legacy_collect"] += time.perf_counter() - start
+        start = time.perf_counter()
+        recorder.collect(model)
+        timings["recorder_collect"] += time.perf_counter() - start
+        collected += 1
+
+    summary = {"steps": steps}
+    start = time.perf_counter()
+    legacy_export(datacollector, summary, os.path.join(output_dir, 'legacy.json'))
+    timings["legacy_export"] = time.perf_counter() - start
+    start = time.perf_counter()
+    recorder.save(JsonSink(os.path.join(output_dir, 'recorder.json')), summary)
+    timings["recorder_export_json"] = time.perf_counter() - start
+    start = time.perf_counter()
+    recorder.save(BinarySink(os.path.join(output_dir, 'recorder.npz')), summary)
+    timings["recorder_export_binary"] = time.perf_counter() - start
+    return collected, timings
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark de recolección y exportación por paso.")
+    parser.add_argument('--steps', type=int, default=200)
+    parser.add_argument('--repeats', type=int, default=5)
+    args = parser.parse_args(argv)
+
+    totals = {}
+    total_steps = 0
+    with tempfile.TemporaryDirectory() as output_dir:
+        for _ in range(args.repeats):
+            collected, timings = run_once(args.steps, output_dir)
+            total_steps += collected
+            for name, seconds in timings.items():
+                totals[name] = totals.get(name, 0.0) + seconds
+
+    print(f"{total_steps} pasos recolectados en {args.repeats} corridas")
+    print(f"{'fase':<26} {'us/paso':>10}")
+    for name, seconds in totals.items():
+        print(f"{name:<26} {seconds / max(total_steps, 1) * 1e6:>10.1f}")
+    legacy = totals["legacy_collect"] + totals["legacy_export"]
+    current = totals["recorder_collect"] + totals["recorder_export_json"]
+    print(f"{'total anterior (JSON)':<26} {legacy / max(total_steps, 1) * 1e6:>10.1f}")
+    print(f"{'total recorder (JSON)':<26} {current / max(total_steps, 1) * 1e6:>10.1f}")
+
+
+if __name__ == '__main__':
+    main()
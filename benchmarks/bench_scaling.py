@@ -0,0 +1,148 @@
+"""
+Benchmark de escalamiento: tiempo por paso de ModeloEdificio contra el número de celdas.
+
+Genera edificios de cuartos (paredes cada ``--room`` celdas con una puerta por tramo),
+los guarda y vuelve a leer con save_scenario/load_scenario, corre cada uno sin recolectar
+la trayectoria e imprime el tiempo por paso. Si el tiempo por paso crece con H·W, alguna
+acción sigue recorriendo todo el tablero; ``--profile`` muestra las funciones que más
+tiempo toman en el tablero más grande. Uso:
+    python benchmarks/bench_scaling.py --sizes 6x8 24x32 60x80 120x160 300x400 --plot scaling.png
+"""
+
+import argparse
+import cProfile
+import os
+import pstats
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+SIM_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'simulation_data')
+sys.path.insert(0, SIM_DIR)
+
+import flashpoint as fp  # noqa: E402
+
+
+def generate_scenario(height, width, room=4, seed=0):
+    """
+    Edificio de ``height`` x ``width`` dividido en cuartos de ``room`` x ``room`` celdas.
+    Cada tramo de pared entre dos cuartos tiene una puerta; hay 3 POIs, algo de goo
+    (una celda por cada 5 cuartos, mínimo 10) y 4 entradas en el borde.
+    """
+    rng = np.random.default_rng(seed)
+    walls = []
+    for x in range(height):
+        row = []
+        for y in range(width):
+            value = 0
+            if x % room == 0:
+                value |= 8  # Arriba
+            if y == width - 1 or (y + 1) % room == 0:
+                value |= 4  # Derecha
+            if x == height - 1 or (x + 1) % room == 0:
+                value |= 2  # Abajo
+            if y % room == 0:
+                value |= 1  # Izquierda
+            row.append(format(value, "04b"))
+        walls.append(row)
+
+    # Una puerta por tramo de pared entre cuartos (coordenadas desde 1, como testCase.txt).
+    doors = []
+    for x in range(room, height, room):
+        for y0 in range(0, width, room):
+            y = int(rng.integers(y0, min(y0 + room, width)))
+            doors.append([x, y + 1, x + 1, y + 1])
+    for y in range(room, width, room):
+        for x0 in range(0, height, room):
+            x = int(rng.integers(x0, min(x0 + room, height)))
+            doors.append([x + 1, y, x + 1, y + 1])
+
+    # Celdas distintas para POIs y goo, lejos del nido del LootBug en (0, 0).
+    rooms = max(1, (height // room) * (width // room))
+    goo_count = max(10, rooms // 5)
+    cells = rng.choice(np.arange(1, height * width), size=min(3 + goo_count, height * width - 1), replace=False)
+    coordinates = [(int(cell) // width + 1, int(cell) % width + 1) for cell in cells]
+    pois = [[x, y, kind] for (x, y), kind in zip(coordinates[:3], "vfv")]
+    goo = [[x, y] for x, y in coordinates[3:]]
+
+    entries = [[1, width // 2 + 1], [height // 2 + 1, 1], [height // 2 + 1, width], [height, width // 2 + 1]]
+    return fp.Scenario(walls, pois, goo, doors, entries)
+
+
+def run_size(scenario, steps, seed):
+    """Regresa (segundos de inicialización, segundos por paso, pasos corridos)."""
+    start = time.perf_counter()
+    model = fp.ModeloEdificio.from_scenario(scenario, seed=seed, record_trajectory=False)
+    init = time.perf_counter() - start
+
+    ran = 0
+    start = time.perf_counter()
+    for _ in range(steps):
+        if not model.running:
+            break
+        model.step()
+        ran += 1
+    elapsed = time.perf_counter() - start
+    return init, elapsed / max(ran, 1), ran
+
+
+def plot(results, path):
+    """Guarda la gráfica de tiempo por paso contra número de celdas (requiere matplotlib)."""
+    try:
+        import matplotlib
+        matplotlib.use("Agg")
+        import matplotlib.pyplot as plt
+    except ImportError:
+        print("matplotlib no está instalado; no se generó la gráfica")
+        return
+    cells = [result["cells"] for result in results]
+    step_us = [result["step_us"] for result in results]
+    figure, axes = plt.subplots()
+    axes.loglog(cells, step_us, marker="o")
+    axes.set_xlabel("celdas (H·W)")
+    axes.set_ylabel("µs por paso")
+    axes.set_title("ModeloEdificio: tiempo por paso contra tamaño del edificio")
+    axes.grid(True, which="both", alpha=0.3)
+    figure.savefig(path, bbox_inches="tight")
+    print(f"Gráfica guardada en {path}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark de tiempo por paso contra tamaño del edificio.")
+    parser.add_argument('--sizes', nargs='+', default=['6x8', '24x32', '60x80', '120x160', '300x400'],
+                        help="Tamaños a medir (HxW).")
+    parser.add_argument('--steps', type=int, default=200, help="Pasos por tamaño.")
+    parser.add_argument('--room', type=int, default=4, help="Lado de cada cuarto en celdas.")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--plot', default=None, help="Archivo PNG opcional con la gráfica.")
+    parser.add_argument('--profile', action='store_true', help="Perfilar el tamaño más grande.")
+    args = parser.parse_args(argv)
+
+    results = []
+    print(f"{'tamaño':<10} {'celdas':>8} {'init ms':>10} {'pasos':>6} {'us/paso':>10}")
+    with tempfile.TemporaryDirectory() as directory:
+        for size in args.sizes:
+            height, width = (int(value) for value in size.split('x'))
+            path = os.path.join(directory, f"{size}.txt")
+            fp.save_scenario(generate_scenario(height, width, args.room, args.seed), path)
+            scenario = fp.load_scenario(path)
+            init, per_step, ran = run_size(scenario, args.steps, args.seed)
+            results.append({"size": size, "cells": height * width, "init_ms": init * 1e3, "step_us": per_step * 1e6})
+            print(f"{size:<10} {height * width:>8} {init * 1e3:>10.1f} {ran:>6} {per_step * 1e6:>10.1f}")
+
+        if args.profile:
+            profiler = cProfile.Profile()
+            profiler.enable()
+            run_size(scenario, args.steps, args.seed)
+            profiler.disable()
+            pstats.Stats(profiler).sort_stats("tottime").print_stats(15)
+
+    if args.plot:
+        plot(results, args.plot)
+    return results
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,383 @@
+"""
+Suite de benchmarks de la simulación, la exportación y el servidor, con semillas fijas.
+
+Mide con ``testCase.txt``:
+- model.*: construir ModeloEdificio y una corrida de 200 pasos sin recolectar.
+- end_turn.*: cada fase de end_turn (end_game, advance_goo, check_secondary_effects,
+  knocked_down, replenish_pois) sobre estados reales de partidas.
+- recorder.collect: recolectar un paso.
+- export.*: run_model_and_save_to_json de 200 pasos en los modos full, delta y binary.
+- server.*: latencia de POST de un paso (modos single y threaded) y de un rango de 20
+  pasos con campos, con un cliente local contra server.py en un puerto libre.
+- large.*: construcción y 200 pasos en edificios sintéticos (bench_scaling.generate_scenario).
+
+Cada benchmark corre ``--rounds`` rondas; el tiempo de una ronda se divide entre las
+operaciones que hizo, y se guardan mínimo, mediana, media y desviación por operación.
+``compare`` marca como regresión todo benchmark cuya estadística (por defecto el mínimo,
+el más estable en una máquina con ruido) creció más de ``--threshold`` contra la línea
+base, y termina con error si hay alguna. Uso:
+    python benchmarks/bench_suite.py run --output results.json
+    python benchmarks/bench_suite.py compare benchmarks/baselines/baseline.json results.json
+    python benchmarks/bench_suite.py run --only end_turn --baseline benchmarks/baselines/baseline.json
+"""
+
+import argparse
+import contextlib
+import datetime
+import fnmatch
+import http.client
+import io
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+import numpy as np
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+SIM_DIR = os.path.join(BENCH_DIR, '..', 'simulation_data')
+SERVER_DIR = os.path.join(BENCH_DIR, '..', 'server')
+sys.path.insert(0, SIM_DIR)
+sys.path.insert(0, SERVER_DIR)
+
+import flashpoint as fp  # noqa: E402
+import server  # noqa: E402
+from bench_scaling import generate_scenario  # noqa: E402
+
+# Semilla de todas las partidas de la suite.
+SEED = 2024
+
+# Pasos de las corridas completas.
+RUN_STEPS = 200
+
+# Tamaños de los edificios sintéticos.
+LARGE_SIZES = ("60x80", "120x160")
+
+# Línea base por defecto de ``compare`` y ``run --baseline``.
+DEFAULT_BASELINE = os.path.join(BENCH_DIR, 'baselines', 'baseline.json')
+
+# Fases de end_turn: nombre -> función que la aplica a un modelo.
+END_TURN_PHASES = {
+    "end_game": lambda model: model.end_game(),
+    "advance_goo": lambda model: model.advance_goo(),
+    "check_secondary_effects": lambda model: model.check_secondary_effects(),
+    "knocked_down": lambda model: model.agent_store.agents[0].knocked_down(),
+    "replenish_pois": lambda model: model.replenish_pois(),
+}
+
+
+# -----------------------------------------------------------------------------------------------------------
+# MEDICIÓN
+# -----------------------------------------------------------------------------------------------------------
+
+def measure(setup, run, rounds):
+    """
+    Corre ``rounds`` rondas: ``setup()`` fuera del tiempo y ``run(contexto)`` medido, que
+    regresa cuántas operaciones hizo. Regresa las estadísticas en segundos por operación.
+    """
+    times = []
+    operations = 0
+    for _ in range(rounds):
+        context = setup()
+        start = time.perf_counter()
+        count = run(context)
+        times.append((time.perf_counter() - start) / count)
+        operations += count
+    return {
+        "min": min(times),
+        "median": statistics.median(times),
+        "mean": statistics.fmean(times),
+        "stdev": statistics.stdev(times) if len(times) > 1 else 0.0,
+        "rounds": rounds,
+        "operations": operations,
+    }
+
+
+def run_steps(model, steps=RUN_STEPS):
+    """Avanza ``model`` hasta ``steps`` pasos o el fin del juego; regresa 1 (una corrida)."""
+    for _ in range(steps):
+        if not model.running:
+            break
+        model.step()
+    return 1
+
+
+def reference_states(scenario, count, every=5):
+    """Clones de partidas con semilla fija cada ``every`` pasos hasta reunir ``count`` estados."""
+    states = []
+    for game_seed in fp.spawn_seeds(SEED, count):
+        model = fp.ModeloEdificio.from_scenario(scenario, seed=game_seed, record_trajectory=False)
+        while model.running and model.steps < 400 and len(states) < count:
+            model.step()
+            if model.running and model.steps % every == 0:
+                states.append(model.clone())
+        if len(states) >= count:
+            break
+    return states
+
+
+# -----------------------------------------------------------------------------------------------------------
+# BENCHMARKS
+# -----------------------------------------------------------------------------------------------------------
+
+def bench_model(scenario, rounds, prefix="model"):
+    """Construcción y corrida de RUN_STEPS pasos sin recolectar."""
+    def construct(_):
+        fp.ModeloEdificio.from_scenario(scenario, seed=SEED, record_trajectory=False)
+        return 1
+    yield f"{prefix}.construct", measure(lambda: None, construct, rounds)
+    yield f"{prefix}.run_{RUN_STEPS}", measure(
+        lambda: fp.ModeloEdificio.from_scenario(scenario, seed=SEED, record_trajectory=False),
+        run_steps, rounds)
+
+
+def bench_end_turn(scenario, rounds, states=64):
+    """Cada fase de end_turn sobre clones de ``states`` estados reales (cada ronda con clones nuevos)."""
+    reference = reference_states(scenario, states)
+    for name, phase in END_TURN_PHASES.items():
+        def run(models, phase=phase):
+            for model in models:
+                phase(model)
+            return len(models)
+        yield f"end_turn.{name}", measure(lambda: [state.clone() for state in reference], run, rounds)
+
+
+def bench_collect(scenario, rounds, collects=200):
+    """``recorder.collect`` sobre estados sucesivos de una partida."""
+    models = []
+    model = fp.ModeloEdificio.from_scenario(scenario, seed=SEED, record_trajectory=False)
+    while model.running and len(models) < collects:
+        model.step()
+        models.append(model.clone(record_trajectory=True))
+
+    def run(recorders):
+        for recorder, state in recorders:
+            recorder.collect(state)
+        return len(recorders)
+    yield "recorder.collect", measure(lambda: [(state.recorder, state) for state in
+                                               (state.clone(record_trajectory=True) for state in models)],
+                                      run, rounds)
+
+
+def bench_export(scenario, rounds, directory):
+    """run_model_and_save_to_json de RUN_STEPS pasos en cada modo de salida."""
+    for mode in ("full", "delta", "binary"):
+        output = os.path.join(directory, f"export.{'npz' if mode == 'binary' else 'json'}")
+
+        def run(model, mode=mode, output=output):
+            with contextlib.redirect_stdout(io.StringIO()):
+                fp.run_model_and_save_to_json(RUN_STEPS, model, output, output_mode=mode)
+            return 1
+        yield f"export.{mode}", measure(lambda: fp.ModeloEdificio.from_scenario(scenario, seed=SEED), run, rounds)
+
+
+def bench_server(scenario, rounds, directory, requests=200):
+    """
+    Latencia de POST con un cliente local contra server.py sirviendo una partida completa.
+    ``post_step_revalidate`` manda el ETag de cada paso en If-None-Match (un cliente que
+    repite pasos que ya tiene) y espera 304.
+    """
+    path = os.path.join(directory, "server.json")
+    model = fp.ModeloEdificio.from_scenario(scenario, seed=SEED)
+    with contextlib.redirect_stdout(io.StringIO()):
+        fp.run_model_and_save_to_json(RUN_STEPS, model, path)
+    server.SimulationServer.log_message = lambda *args, **kwargs: None
+    server.STORE.path = path
+    server.STORE.refresh()
+    total_steps = len(server.STORE)
+    headers = {'Content-Type': 'application/json'}
+
+    def step_body(i):
+        return {"step": i % total_steps + 1}
+
+    def revalidate(i):
+        return {**headers, 'If-None-Match': server.STORE.get_step_entry(i % total_steps)[1]}
+
+    # (nombre, modo del servidor, cuerpo de la solicitud i, cabeceras de la solicitud i, estado esperado)
+    cases = (
+        ("post_step.single", "single", step_body, lambda i: headers, 200),
+        ("post_step.threaded", "threaded", step_body, lambda i: headers, 200),
+        ("post_step_revalidate.threaded", "threaded", step_body, revalidate, 304),
+        ("post_range.threaded", "threaded",
+         lambda i: {"from": i % total_steps + 1, "to": min(i % total_steps + 20, total_steps),
+                    "fields": ["grid_threat_markers", "agents_info"]}, lambda i: headers, 200),
+    )
+    for name, mode, body, request_headers, status in cases:
+        httpd = server.make_server(port=0, mode=mode, host='127.0.0.1')
+        port = httpd.server_address[1]
+        thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+        thread.start()
+        requests_ = [(json.dumps(body(i)), request_headers(i)) for i in range(requests)]
+
+        def run(connection, requests_=requests_, name=name, status=status):
+            for payload, request_headers_ in requests_:
+                connection.request('POST', '/', body=payload, headers=request_headers_)
+                response = connection.getresponse()
+                response.read()
+                if response.status != status:
+                    raise RuntimeError(f"server.{name}: respuesta {response.status}")
+            connection.close()
+            return len(requests_)
+        try:
+            yield f"server.{name}", measure(lambda: http.client.HTTPConnection('127.0.0.1', port, timeout=30),
+                                            run, rounds)
+        finally:
+            httpd.shutdown()
+            httpd.server_close()
+
+
+def bench_large(rounds, directory):
+    """Construcción y RUN_STEPS pasos en edificios sintéticos de LARGE_SIZES."""
+    for size in LARGE_SIZES:
+        height, width = (int(value) for value in size.split('x'))
+        path = os.path.join(directory, f"{size}.txt")
+        fp.save_scenario(generate_scenario(height, width, seed=SEED), path)
+        yield from bench_model(fp.load_scenario(path), rounds, prefix=f"large.{size}")
+
+
+def run_suite(rounds, only=None):
+    """Corre los benchmarks (los que coinciden con algún patrón de ``only``) e imprime cada uno."""
+    scenario = fp.load_scenario(fp.DEFAULT_SCENARIO)
+    patterns = [pattern if any(c in pattern for c in "*?[") else f"{pattern}*" for pattern in (only or ["*"])]
+    groups = (
+        ("model", lambda directory: bench_model(scenario, rounds)),
+        ("end_turn", lambda directory: bench_end_turn(scenario, rounds)),
+        ("recorder", lambda directory: bench_collect(scenario, rounds)),
+        ("export", lambda directory: bench_export(scenario, rounds, directory)),
+        ("server", lambda directory: bench_server(scenario, rounds, directory)),
+        ("large", lambda directory: bench_large(rounds, directory)),
+    )
+    results = {}
+    print(f"{'benchmark':<36} {'mínimo':>12} {'mediana':>12} {'desv.':>10}")
+    with tempfile.TemporaryDirectory() as directory:
+        for group, benchmarks in groups:
+            # Un grupo se salta completo (sin preparar nada) si ningún patrón puede coincidir con sus nombres.
+            if not any(fnmatch.fnmatch(group, pattern.split(".")[0]) for pattern in patterns):
+                continue
+            for name, stats in benchmarks(directory):
+                if not any(fnmatch.fnmatch(name, pattern) for pattern in patterns):
+                    continue
+                results[name] = stats
+                print(f"{name:<36} {format_time(stats['min']):>12} {format_time(stats['median']):>12} "
+                      f"{format_time(stats['stdev']):>10}")
+    return results
+
+
+def format_time(seconds):
+    """Segundos con la unidad más legible (s, ms o µs)."""
+    if seconds >= 1:
+        return f"{seconds:.3f} s"
+    if seconds >= 1e-3:
+        return f"{seconds * 1e3:.3f} ms"
+    return f"{seconds * 1e6:.1f} µs"
+
+
+def metadata(rounds):
+    """Datos del entorno para interpretar los resultados guardados."""
+    import mesa
+    return {
+        "date": datetime.datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "mesa": mesa.__version__,
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "seed": SEED,
+        "rounds": rounds,
+        "unit": "segundos por operación",
+    }
+
+
+# -----------------------------------------------------------------------------------------------------------
+# COMPARACIÓN
+# -----------------------------------------------------------------------------------------------------------
+
+def compare(baseline, current, threshold, stat="min"):
+    """
+    Imprime la razón actual/base de ``stat`` (el mínimo, como en la CLI) de cada benchmark y
+    regresa los nombres de los que crecieron más de ``threshold`` (0.1 = 10 %). Los que solo están en un lado se listan aparte.
+    """
+    base, ours = baseline["benchmarks"], current["benchmarks"]
+    regressions = []
+    print(f"{'benchmark':<36} {'base':>12} {'actual':>12} {'razón':>7}")
+    for name in sorted(set(base) & set(ours)):
+        before, after = base[name][stat], ours[name][stat]
+        ratio = after / before if before else float("inf")
+        mark = ""
+        if ratio > 1 + threshold:
+            mark = "  REGRESIÓN"
+            regressions.append(name)
+        elif ratio < 1 - threshold:
+            mark = "  mejora"
+        print(f"{name:<36} {format_time(before):>12} {format_time(after):>12} {ratio:>7.2f}{mark}")
+    for name in sorted(set(base) - set(ours)):
+        print(f"{name:<36} solo en la línea base")
+    for name in sorted(set(ours) - set(base)):
+        print(f"{name:<36} nuevo (sin línea base)")
+    return regressions
+
+
+def load_results(path):
+    with open(path) as file:
+        return json.load(file)
+
+
+def save_results(results, path):
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(path, "w") as file:
+        json.dump(results, file, indent=2, sort_keys=True)
+    print(f"Resultados guardados en {path}")
+
+
+def report(regressions, threshold):
+    """Regresa el código de salida de una comparación."""
+    if regressions:
+        print(f"{len(regressions)} regresiones de más de {threshold:.0%}: {', '.join(regressions)}")
+        return 1
+    print(f"Sin regresiones de más de {threshold:.0%}")
+    return 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Suite de benchmarks con líneas base en JSON.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = commands.add_parser("run", help="Correr la suite.")
+    run_parser.add_argument('--rounds', type=int, default=5, help="Rondas por benchmark.")
+    run_parser.add_argument('--only', nargs='+', default=None,
+                            help="Patrones de nombres a correr (prefijos o comodines, p. ej. end_turn 'server.*').")
+    run_parser.add_argument('--output', default=None, help="Guardar los resultados en este JSON.")
+    run_parser.add_argument('--baseline', nargs='?', const=DEFAULT_BASELINE, default=None,
+                            help="Comparar contra esta línea base al terminar.")
+    run_parser.add_argument('--threshold', type=float, default=0.15, help="Crecimiento máximo (0.15 = 15 %%).")
+    run_parser.add_argument('--stat', choices=("min", "median", "mean"), default="min")
+
+    compare_parser = commands.add_parser("compare", help="Comparar dos resultados guardados.")
+    compare_parser.add_argument('baseline', help="Línea base (JSON de 'run --output').")
+    compare_parser.add_argument('current', help="Resultados nuevos.")
+    compare_parser.add_argument('--threshold', type=float, default=0.15, help="Crecimiento máximo (0.15 = 15 %%).")
+    compare_parser.add_argument('--stat', choices=("min", "median", "mean"), default="min")
+    args = parser.parse_args(argv)
+
+    if args.command == "compare":
+        regressions = compare(load_results(args.baseline), load_results(args.current), args.threshold, args.stat)
+        return report(regressions, args.threshold)
+
+    results = {"metadata": metadata(args.rounds), "benchmarks": run_suite(args.rounds, args.only)}
+    if args.output:
+        save_results(results, args.output)
+    if args.baseline:
+        print()
+        regressions = compare(load_results(args.baseline), results, args.threshold, args.stat)
+        return report(regressions, args.threshold)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
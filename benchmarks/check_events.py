@@ -0,0 +1,66 @@
+"""
+Verificación de ModeloEdificio.events: aplicar los eventos de cada paso sobre el estado del
+paso anterior (threat markers, POI, estados de paredes y de puertas) debe dar exactamente el
+estado nuevo. Corre partidas con semilla fija sobre testCase.txt; cualquier diferencia termina
+con error. Uso:
+    python benchmarks/check_events.py --seeds 25 --steps 300
+"""
+
+import argparse
+import os
+import sys
+
+SIM_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'simulation_data')
+sys.path.insert(0, SIM_DIR)
+
+import flashpoint as fp  # noqa: E402
+from board import THREAT_LAYER, POI_LAYER  # noqa: E402
+
+
+def board_state(model):
+    """Lo que reconstruyen los eventos: {(kind, where): state} para cada celda y arista."""
+    state = {}
+    threat, poi = THREAT_LAYER[model.board], POI_LAYER[model.board]
+    for x in range(model.height):
+        for y in range(model.width):
+            state["threat", (x, y)] = int(threat[x, y])
+            state["poi", (x, y)] = int(poi[x, y])
+    for where, name in model.wall_states.items():
+        state["wall", where] = name
+    for where, name in model.door_states.items():
+        state["door", where] = name
+    return state
+
+
+def check(scenario, seeds, steps):
+    """Repite los eventos paso por paso en cada semilla; regresa los pasos revisados."""
+    checked = 0
+    for seed in range(seeds):
+        model = fp.ModeloEdificio.from_scenario(scenario, seed=seed, record_trajectory=False)
+        replayed = board_state(model)
+        for _ in range(steps):
+            if not model.running:
+                break
+            model.step()
+            for kind, where, value in model.events:
+                replayed[kind, where] = value
+            expected = board_state(model)
+            if replayed != expected:
+                missing = sorted(key for key in expected if replayed.get(key) != expected[key])
+                raise AssertionError(f"seed {seed}, paso {model.steps}: eventos incompletos en {missing[:10]}")
+            checked += 1
+    return checked
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Verificación del registro de eventos del modelo.")
+    parser.add_argument('--seeds', type=int, default=25)
+    parser.add_argument('--steps', type=int, default=300)
+    args = parser.parse_args(argv)
+
+    scenario = fp.load_scenario()
+    print(f"{check(scenario, args.seeds, args.steps)} pasos en {args.seeds} partidas: los eventos reproducen el tablero")
+
+
+if __name__ == '__main__':
+    main()
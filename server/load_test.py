@@ -0,0 +1,150 @@
+"""
+Prueba de carga local para server.py.
+
+Levanta el servidor en un puerto libre para cada modo de servicio, lanza varios
+clientes concurrentes que piden pasos uno por uno (como lo hace Unity) y reporta
+solicitudes por segundo y latencias p50/p99.
+
+``--oversubscribed`` agrega un caso con más clientes lentos que hilos en modo threaded
+(cada cliente espera entre pasos con la conexión abierta) y termina con error si algún
+cliente espera más de ``--max-first-response`` segundos por su primera respuesta.
+
+Uso:
+    python load_test.py --clients 16 --requests 500 --modes single threaded
+    python load_test.py --modes threaded --oversubscribed --workers 2
+"""
+
+import argparse
+import http.client
+import json
+import os
+import sys
+import threading
+import time
+
+import server
+
+# Ruta al JSON relativa a este archivo, para poder correr la prueba desde cualquier directorio
+DEFAULT_JSON = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'simulation_data', 'simulation_output.json')
+
+
+def percentile(sorted_values, fraction):
+    """Regresa el percentil indicado (0-1) de una lista ya ordenada."""
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def client_worker(port, requests, total_steps, latencies, errors, slow_client_delay, first_responses):
+    """
+    Cliente que pide pasos consecutivos reutilizando la conexión cuando el servidor lo permite.
+    Agrega a ``first_responses`` los segundos desde que empieza hasta su primera respuesta.
+    """
+    connection = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+    headers = {'Content-Type': 'application/json'}
+    started = time.perf_counter()
+    for i in range(requests):
+        body = json.dumps({"step": i % total_steps + 1})
+        start = time.perf_counter()
+        try:
+            connection.request('POST', '/', body=body, headers=headers)
+            response = connection.getresponse()
+            response.read()
+            if response.status != 200:
+                errors.append(response.status)
+        except (OSError, http.client.HTTPException) as e:
+            errors.append(str(e))
+            connection.close()
+            continue
+        latencies.append(time.perf_counter() - start)
+        if i == 0:
+            first_responses.append(time.perf_counter() - started)
+        if slow_client_delay:
+            time.sleep(slow_client_delay)
+    connection.close()
+
+
+def run_mode(mode, clients, requests, workers, slow_client_delay, label=None):
+    """Ejecuta la prueba de carga contra un modo y regresa sus métricas."""
+    httpd = server.make_server(port=0, mode=mode, workers=workers, host='127.0.0.1')
+    port = httpd.server_address[1]
+    server_thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    server_thread.start()
+
+    server.STORE.refresh()
+    total_steps = max(1, len(server.STORE))
+    latencies = []
+    errors = []
+    first_responses = []
+    threads = [
+        threading.Thread(target=client_worker,
+                         args=(port, requests, total_steps, latencies, errors, slow_client_delay, first_responses))
+        for _ in range(clients)
+    ]
+
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    httpd.shutdown()
+    httpd.server_close()
+
+    latencies.sort()
+    return {
+        "mode": label or mode,
+        "requests": len(latencies),
+        "errors": len(errors),
+        "seconds": elapsed,
+        "requests_per_second": len(latencies) / elapsed if elapsed else 0.0,
+        "p50_ms": percentile(latencies, 0.50) * 1000,
+        "p99_ms": percentile(latencies, 0.99) * 1000,
+        "max_first_ms": max(first_responses, default=0.0) * 1000,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Prueba de carga local del servidor de simulación.")
+    parser.add_argument('--clients', type=int, default=16, help="Clientes concurrentes.")
+    parser.add_argument('--requests', type=int, default=200, help="Solicitudes por cliente.")
+    parser.add_argument('--workers', type=int, default=server.DEFAULT_WORKERS, help="Hilos del modo threaded.")
+    parser.add_argument('--modes', nargs='+', choices=sorted(server.SERVER_MODES), default=sorted(server.SERVER_MODES))
+    parser.add_argument('--json', default=DEFAULT_JSON, help="Archivo de simulación a servir.")
+    parser.add_argument('--slow-client-delay', type=float, default=0.0,
+                        help="Segundos que cada cliente espera entre pasos (simula clientes lentos).")
+    parser.add_argument('--oversubscribed', action='store_true',
+                        help="Agregar el caso threaded con el triple de clientes lentos que hilos.")
+    parser.add_argument('--max-first-response', type=float, default=1.0,
+                        help="Espera máxima (s) por la primera respuesta en el caso --oversubscribed.")
+    args = parser.parse_args(argv)
+
+    # Silenciar el log por solicitud del manejador para no medir la escritura a stderr
+    server.SimulationServer.log_message = lambda *a, **k: None
+    server.STORE.path = args.json
+
+    results = [run_mode(mode, args.clients, args.requests, args.workers, args.slow_client_delay)
+               for mode in args.modes]
+    oversubscribed = None
+    if args.oversubscribed:
+        # Conexiones keep-alive abiertas que no caben en el pool: ninguna debe quedarse sin respuesta.
+        oversubscribed = run_mode('threaded', args.workers * 3, 10, args.workers, 0.3,
+                                  label=f"threaded {args.workers * 3}c/{args.workers}h")
+        results.append(oversubscribed)
+
+    print(f"{'modo':<22} {'req/s':>10} {'p50 ms':>10} {'p99 ms':>10} {'1a resp. ms':>12} {'errores':>8}")
+    for result in results:
+        print(f"{result['mode']:<22} {result['requests_per_second']:>10.1f} "
+              f"{result['p50_ms']:>10.2f} {result['p99_ms']:>10.2f} {result['max_first_ms']:>12.2f} "
+              f"{result['errors']:>8}")
+    if oversubscribed is not None and oversubscribed['max_first_ms'] > args.max_first_response * 1000:
+        print(f"Un cliente esperó {oversubscribed['max_first_ms']:.0f} ms por su primera respuesta "
+              f"(máximo {args.max_first_response * 1000:.0f} ms)")
+        return None
+    return results
+
+
+if __name__ == '__main__':
+    sys.exit(0 if main() is not None else 1)
@@ -1,76 +1,821 @@
 from http.server import BaseHTTPRequestHandler, HTTPServer
+from concurrent.futures import ThreadPoolExecutor
+from email.utils import formatdate, parsedate_to_datetime
+from urllib.parse import urlsplit, parse_qs
+import argparse
+import hashlib
 import logging
 import json
 import os
+import selectors
+import socket
+import struct
+import threading
+import time
+import zipfile
+
+# Directorio donde flashpoint.py guarda sus salidas por defecto
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'simulation_data')
+
+# Salidas por defecto de flashpoint.py según el modo (ver flashpoint.default_output)
+DEFAULT_DATA_FILES = tuple(os.path.join(DATA_DIR, 'simulation_output' + extension)
+                           for extension in ('.json', '.ndjson', '.npz'))
 
 # Ruta al archivo JSON con los datos de simulación
-JSON_FILE = '../simulation_data/simulation_output.json'
+JSON_FILE = DEFAULT_DATA_FILES[0]
 
-class SimulationServer(BaseHTTPRequestHandler):
 
-    # Cargar datos del JSON al iniciar el servidor
-    def load_simulation_data(self):
-        if os.path.exists(JSON_FILE):
-            with open(JSON_FILE, 'r') as file:
-                return json.load(file).get('simulation_data', [])
+def default_data_file():
+    """Regresa la salida por defecto más reciente de flashpoint.py (JSON, NDJSON o .npz), o JSON_FILE si no hay."""
+    existing = [path for path in DEFAULT_DATA_FILES if os.path.exists(path)]
+    return max(existing, key=os.path.getmtime) if existing else JSON_FILE
+
+
+def apply_delta(record, delta):
+    """
+    Aplica las diferencias de un paso (formato "delta") sobre el registro del paso anterior.
+    Regresa un registro nuevo; el registro anterior no se modifica.
+    """
+    new_record = dict(record)
+    for field, change in delta.items():
+        if field.startswith('grid_'):
+            if isinstance(change, dict):
+                new_record[field] = change['full']  # Cambió la forma del grid
+            else:
+                grid = [list(row) for row in record[field]]
+                for x, y, value in change:
+                    grid[x][y] = value
+                new_record[field] = grid
+        elif isinstance(change, dict) and isinstance(record.get(field), dict):
+            merged = dict(record[field])
+            merged.update(change)
+            new_record[field] = merged
         else:
-            logging.error(f"Archivo JSON no encontrado: {JSON_FILE}")
+            new_record[field] = change
+    return new_record
+
+
+class DeltaTrajectory:
+    """
+    Pasos guardados como keyframes + diferencias (ver ``encode_delta_steps`` en simulation_data/trajectory.py).
+    Reconstruye cualquier paso desde el keyframe más cercano; recuerda el último paso
+    reconstruido para que las lecturas secuenciales apliquen una sola diferencia.
+    """
+
+    def __init__(self, entries):
+        self.entries = entries
+        # Índice del keyframe más cercano (hacia atrás) de cada paso
+        self.keyframe_index = []
+        last_keyframe = 0
+        for index, entry in enumerate(entries):
+            if 'keyframe' in entry:
+                last_keyframe = index
+            self.keyframe_index.append(last_keyframe)
+        self._cursor = (None, None)  # (índice, registro) del último paso reconstruido
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __getitem__(self, index):
+        keyframe = self.keyframe_index[index]
+        cursor_index, cursor_record = self._cursor
+        if cursor_index is not None and keyframe <= cursor_index <= index:
+            position, record = cursor_index, cursor_record
+        else:
+            position, record = keyframe, self.entries[keyframe]['keyframe']
+        while position < index:
+            position += 1
+            record = apply_delta(record, self.entries[position]['delta'])
+        self._cursor = (index, record)
+        return record
+
+
+# Códigos de estado del formato binario (ver WALL_STATE_CODES / DOOR_STATE_CODES en simulation_data/trajectory.py)
+WALL_STATE_NAMES = ("okay", "damaged", "destroyed")
+DOOR_STATE_NAMES = ("closed", "open", "removed")
+
+
+def mmap_npz(path):
+    """
+    Abre un .npz sin compresión regresando cada arreglo como np.memmap de solo lectura.
+    ``np.load(..., mmap_mode='r')`` ignora el memory-map dentro de un .npz, así que aquí
+    se localiza el inicio de cada .npy dentro del zip y se mapea directamente.
+    """
+    import numpy as np  # Solo se necesita para el formato binario
+
+    arrays = {}
+    with zipfile.ZipFile(path) as archive, open(path, 'rb') as file:
+        for info in archive.infolist():
+            if info.compress_type != zipfile.ZIP_STORED:
+                raise ValueError(f"{path}: '{info.filename}' está comprimido y no se puede mapear")
+            # Encabezado local del zip: 30 bytes + nombre + campo extra
+            file.seek(info.header_offset)
+            local_header = file.read(30)
+            name_length, extra_length = struct.unpack('<HH', local_header[26:30])
+            file.seek(info.header_offset + 30 + name_length + extra_length)
+            version = np.lib.format.read_magic(file)
+            if version == (1, 0):
+                shape, fortran_order, dtype = np.lib.format.read_array_header_1_0(file)
+            else:
+                shape, fortran_order, dtype = np.lib.format.read_array_header_2_0(file)
+            name = info.filename[:-4] if info.filename.endswith('.npy') else info.filename
+            if 0 in shape or not shape:
+                # memmap no acepta arreglos vacíos ni escalares; son diminutos, se leen completos
+                file.seek(info.header_offset + 30 + name_length + extra_length)
+                arrays[name] = np.lib.format.read_array(file)
+                continue
+            arrays[name] = np.memmap(path, dtype=dtype, mode='r', offset=file.tell(), shape=shape,
+                                     order='F' if fortran_order else 'C')
+    return arrays
+
+
+class BinaryTrajectory:
+    """
+    Pasos guardados en el .npz de ``BinarySink`` (simulation_data/trajectory.py).
+    Cada paso se arma leyendo solo su rebanada de los arreglos mapeados en memoria,
+    con el mismo formato de registro que el JSON completo.
+    """
+
+    GRID_FIELDS = ('grid_doors_entries', 'grid_walls', 'grid_poi', 'grid_threat_markers', 'grid_agents')
+
+    def __init__(self, path):
+        self.arrays = mmap_npz(path)
+        self.wall_keys = [str(((int(x1), int(y1)), (int(x2), int(y2)))) for x1, y1, x2, y2 in self.arrays['wall_edges']]
+        self.door_keys = [str(((int(x1), int(y1)), (int(x2), int(y2)))) for x1, y1, x2, y2 in self.arrays['door_edges']]
+
+    def __len__(self):
+        return len(self.arrays['step'])
+
+    def __getitem__(self, index):
+        arrays = self.arrays
+        record = {"step": int(arrays['step'][index])}
+        for field in self.GRID_FIELDS:
+            record[field] = arrays[field][index].tolist()
+        record["agents_info"] = [
+            {"position": [int(agent['x']), int(agent['y'])], "value": int(agent['value']),
+             "carrying_victim": bool(agent['carrying_victim'])}
+            for agent in arrays['agents'][index]
+        ]
+        record["wall_states"] = {key: WALL_STATE_NAMES[code] for key, code in zip(self.wall_keys, arrays['wall_states'][index].tolist())}
+        record["door_states"] = {key: DOOR_STATE_NAMES[code] for key, code in zip(self.door_keys, arrays['door_states'][index].tolist())}
+        record["collapsed_building"] = bool(arrays['collapsed_building'][index])
+        record["saved_victims"] = int(arrays['saved_victims'][index])
+        record["lost_victims"] = int(arrays['lost_victims'][index])
+        return record
+
+
+class NdjsonTrajectory(list):
+    """
+    Pasos de un archivo NDJSON (ver ``NdjsonSink`` en simulation_data/trajectory.py) que
+    puede seguir creciendo mientras la simulación corre. Solo se leen líneas completas;
+    ``read_more`` regresa las líneas nuevas desde el último desplazamiento leído.
+    """
+
+    def __init__(self, path, inode):
+        super().__init__()
+        self.path = path
+        self.inode = inode
+        self.offset = 0  # Bytes ya consumidos (siempre al final de una línea)
+        self.summary = None  # Última línea {"summary": {...}} cuando la corrida terminó
+        self.extend(self.read_more())
+
+    def can_extend(self, signature):
+        """True si el archivo es el mismo y solo creció desde la última lectura."""
+        return signature is not None and signature[0] == self.inode and signature[2] >= self.offset
+
+    def read_more(self):
+        """
+        Lee las líneas completas agregadas al archivo y regresa sus pasos sin agregarlos:
+        quien llama extiende primero sus cachés por paso y al final la lista, porque los
+        lectores de otros hilos toman el número de pasos de ``len`` de esta lista.
+        """
+        with open(self.path, 'rb') as file:
+            file.seek(self.offset)
+            data = file.read()
+        end = data.rfind(b'\n')
+        if end < 0:
             return []
+        self.offset += end + 1
+        added = []
+        for line in data[:end + 1].splitlines():
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            if 'summary' in record and 'step' not in record:
+                self.summary = record['summary']
+            else:
+                added.append(record)
+        return added
+
+
+def entity_tag(data):
+    """ETag fuerte (entre comillas) con el hash de ``data``."""
+    return '"' + hashlib.blake2b(data, digest_size=16).hexdigest() + '"'
+
+
+def etag_matches(if_none_match, etag):
+    """True si la cabecera If-None-Match incluye ``etag`` o es ``*`` (comparación débil: se ignora W/)."""
+    for candidate in if_none_match.split(','):
+        candidate = candidate.strip()
+        if candidate == '*' or candidate.removeprefix('W/') == etag:
+            return True
+    return False
+
+
+def not_modified_since(if_modified_since, last_modified):
+    """True si ``last_modified`` (fecha HTTP) no es posterior a la cabecera If-Modified-Since."""
+    if if_modified_since is None or last_modified is None:
+        return False
+    try:
+        return parsedate_to_datetime(last_modified) <= parsedate_to_datetime(if_modified_since)
+    except (TypeError, ValueError):
+        return False  # Fecha inválida: se ignora la cabecera
+
+
+class SimulationStore:
+    """
+    Almacén de pasos de la simulación compartido por todo el proceso.
+    - Lee y parsea el JSON una sola vez y guarda cada paso ya serializado en bytes.
+    - En formato "delta" reconstruye cada paso la primera vez que se pide y guarda sus bytes.
+    - En formato binario (.npz) no guarda nada: cada paso se lee del memory-map al pedirlo,
+      para servir trayectorias enormes con poca memoria.
+    - En formato NDJSON (.ndjson) sigue el archivo mientras crece: solo lee las líneas nuevas.
+    - Se invalida cuando cambia el archivo (inodo, mtime o tamaño).
+    - Da un ETag por paso (hash del contenido, calculado una vez por paso salvo en binario),
+      así que un paso que no cambió conserva su ETag aunque el archivo se reescriba o crezca.
+    - Lleva contadores de aciertos (hits), fallos (misses), recargas (reloads) y respuestas
+      304 (not_modified).
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._signature = None  # (inodo, mtime_ns, tamaño) del archivo cargado
+        self._last_modified = (None, None)  # (firma, fecha HTTP) para no formatearla en cada solicitud
+        # (registros, bytes por paso, fragmentos por campo, ETags por paso); se reemplaza completo al recargar
+        self._data = ([], [], [], [])
+        self.hits = 0  # Consultas resueltas con los datos ya cargados
+        self.misses = 0  # Consultas que tuvieron que (re)cargar el archivo
+        self.reloads = 0  # Recargas provocadas por un cambio en el archivo
+        self.tails = 0  # Lecturas incrementales de un NDJSON que creció
+        self.not_modified = 0  # Respuestas 304 porque el cliente ya tenía el paso o rango
+
+    def _file_signature(self):
+        """Regresa (inodo, mtime_ns, tamaño) del archivo o None si no existe."""
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return None
+        return (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+
+    def _load(self, signature):
+        """
+        Parsea el archivo. Regresa (registros, pasos, campos, etags): los registros por paso,
+        los bytes del paso completo, por paso un diccionario campo -> fragmento
+        '"campo": valor' ya serializado para armar subconjuntos, y el ETag de cada paso.
+        En formato completo los pasos se pre-serializan aquí; en formato delta se llenan
+        bajo demanda, igual que los ETags; en formato binario no hay caché (pasos, campos
+        y etags son None).
+        """
+        if signature is None:
+            logging.error(f"Archivo de simulación no encontrado: {self.path}")
+            return [], [], [], []
+        if self.path.endswith('.npz'):
+            return BinaryTrajectory(self.path), None, None, None
+        if self.path.endswith('.ndjson'):
+            records = NdjsonTrajectory(self.path, signature[0])
+            return records, [None] * len(records), [None] * len(records), [None] * len(records)
+        with open(self.path, 'r') as file:
+            document = json.load(file)
+        simulation_data = document.get('simulation_data', [])
+        if document.get('format') == 'delta':
+            records = DeltaTrajectory(simulation_data)
+            return records, [None] * len(records), [None] * len(records), [None] * len(records)
+        steps = [json.dumps(step).encode('utf-8') for step in simulation_data]
+        fields = [self._serialize_fields(step) for step in simulation_data]
+        return simulation_data, steps, fields, [None] * len(steps)
+
+    @staticmethod
+    def _serialize_fields(record):
+        return {key: (json.dumps(key) + ': ' + json.dumps(value)).encode('utf-8') for key, value in record.items()}
+
+    def _materialize(self, data, index):
+        """Serializa el paso ``index`` si aún no está en caché."""
+        records, steps, fields, _ = data
+        if steps[index] is None:
+            record = records[index]
+            fields[index] = self._serialize_fields(record)
+            steps[index] = json.dumps(record).encode('utf-8')
+
+    def _step_bytes(self, data, index):
+        records, steps, _, _ = data
+        if steps is None:
+            return json.dumps(records[index]).encode('utf-8')
+        self._materialize(data, index)
+        return steps[index]
+
+    def _step_fields(self, data, index):
+        records, _, fields, _ = data
+        if fields is None:
+            return self._serialize_fields(records[index])
+        self._materialize(data, index)
+        return fields[index]
+
+    def _step_etag(self, data, index):
+        """ETag del paso: hash de sus bytes, calculado una sola vez salvo en formato binario."""
+        etags = data[3]
+        if etags is None:
+            return entity_tag(self._step_bytes(data, index))
+        if etags[index] is None:
+            etags[index] = entity_tag(self._step_bytes(data, index))
+        return etags[index]
+
+    def refresh(self):
+        """Recarga los pasos si el archivo cambió desde la última lectura."""
+        signature = self._file_signature()
+        if signature == self._signature and self._signature is not None:
+            self.hits += 1
+            return
+        with self._lock:
+            # Otro hilo pudo haber recargado mientras esperábamos el candado.
+            if signature == self._signature and self._signature is not None:
+                self.hits += 1
+                return
+            records, steps, fields, etags = self._data
+            if isinstance(records, NdjsonTrajectory) and records.can_extend(signature):
+                # El NDJSON solo creció: leer las líneas nuevas sin volver a parsear todo
+                self.tails += 1
+                added = records.read_more()
+                steps.extend([None] * len(added))
+                fields.extend([None] * len(added))
+                etags.extend([None] * len(added))
+                records.extend(added)  # Al final: un lector que ve el paso nuevo ya tiene su caché
+                self._signature = signature
+                return
+            self.misses += 1
+            if self._signature is not None:
+                self.reloads += 1
+            self._data = self._load(signature)
+            self._signature = signature
+
+    def __len__(self):
+        return len(self._data[0])
+
+    def get_step(self, index):
+        """Regresa los bytes del paso (índice base 0) o None si no existe."""
+        entry = self.get_step_entry(index)
+        return entry[0] if entry is not None else None
+
+    def get_step_entry(self, index):
+        """Regresa (bytes, ETag) del paso (índice base 0) o None si no existe."""
+        self.refresh()
+        data = self._data  # Misma versión para los bytes y el ETag aunque otro hilo recargue
+        if 0 <= index < len(data[0]):
+            return self._step_bytes(data, index), self._step_etag(data, index)
+        return None
+
+    def get_range(self, start, stop, fields=None):
+        """
+        Regresa la lista de bytes de los pasos [start, stop) (índices base 0).
+        - fields: lista opcional de campos; cada paso se arma concatenando sus
+          fragmentos pre-serializados, sin volver a serializar nada.
+        Lanza KeyError si algún campo solicitado no existe.
+        """
+        return self.get_range_entry(start, stop, fields)[0]
+
+    def get_range_entry(self, start, stop, fields=None):
+        """
+        Como get_range, pero regresa (lista de bytes, ETag). El ETag del rango sale de los
+        ETags de sus pasos y de los campos pedidos, sin volver a leer el cuerpo completo.
+        """
+        self.refresh()
+        data = self._data  # Misma versión aunque otro hilo recargue
+        start, stop = max(start, 0), min(stop, len(data[0]))
+        indices = range(start, stop)
+        etag = entity_tag(json.dumps(fields).encode('utf-8')
+                          + b''.join(self._step_etag(data, index).encode('ascii') for index in indices))
+        if fields is None:
+            return [self._step_bytes(data, index) for index in indices], etag
+        items = []
+        for index in indices:
+            step_fields = self._step_fields(data, index)
+            items.append(b'{' + b', '.join(step_fields[field] for field in fields) + b'}')
+        return items, etag
+
+    @property
+    def last_modified(self):
+        """Fecha HTTP de la última modificación del archivo cargado, o None si no hay archivo."""
+        signature = self._signature
+        if signature is None:
+            return None
+        cached_signature, text = self._last_modified
+        if cached_signature != signature:
+            text = formatdate(signature[1] / 1e9, usegmt=True)
+            self._last_modified = (signature, text)
+        return text
+
+    def stats(self):
+        """Regresa los contadores del almacén."""
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "reloads": self.reloads,
+            "tails": self.tails,
+            "not_modified": self.not_modified,
+            "steps": len(self),
+        }
+
+
+# Tamaño aproximado de cada bloque al transmitir rangos con chunked encoding
+CHUNK_SIZE = 64 * 1024
+
+# Almacén único para todo el proceso
+STORE = SimulationStore(JSON_FILE)
+
+
+class SimulationServer(BaseHTTPRequestHandler):
+
+    store = STORE
+
+    # Cache-Control de los pasos y rangos: por defecto el cliente o el proxy pueden guardarlos,
+    # pero revalidan con el ETag en cada uso (un 304 sin cuerpo). Ver run(max_age=...).
+    cache_control = 'public, no-cache'
 
     # Establecer cabeceras de respuesta
-    def _set_response(self, content_type='application/json'):
-        self.send_response(200)
+    def _set_response(self, content_type='application/json', status=200, content_length=None, headers=()):
+        self.send_response(status)
         self.send_header('Content-type', content_type)
+        if content_length is not None:
+            self.send_header('Content-Length', str(content_length))
+        for name, value in headers:
+            self.send_header(name, value)
         self.end_headers()
 
-    # Manejar solicitudes GET (puede usarse para debug)
+    # Enviar un cuerpo JSON ya serializado
+    def _send_json(self, body, status=200, headers=()):
+        self._set_response(status=status, content_length=len(body), headers=headers)
+        self.wfile.write(body)
+
+    # Enviar un arreglo JSON armado con pasos pre-serializados
+    def _send_json_array(self, items, headers=()):
+        """
+        Envía ``[item, item, ...]`` sin construir el cuerpo completo.
+        Con HTTP/1.1 usa Transfer-Encoding: chunked agrupando pasos en bloques de
+        ~CHUNK_SIZE bytes; con HTTP/1.0 (sin chunked) envía el cuerpo con Content-Length.
+        """
+        if self.request_version != 'HTTP/1.1' or self.protocol_version != 'HTTP/1.1':
+            self._send_json(b'[' + b','.join(items) + b']', headers=headers)
+            return
+
+        self.send_response(200)
+        self.send_header('Content-type', 'application/json')
+        self.send_header('Transfer-Encoding', 'chunked')
+        for name, value in headers:
+            self.send_header(name, value)
+        self.end_headers()
+
+        chunk, size = [b'['], 1
+        for index, item in enumerate(items):
+            if index:
+                chunk.append(b',')
+                size += 1
+            chunk.append(item)
+            size += len(item)
+            if size >= CHUNK_SIZE:
+                self._write_chunk(b''.join(chunk))
+                chunk, size = [], 0
+        chunk.append(b']')
+        self._write_chunk(b''.join(chunk))
+        self.wfile.write(b'0\r\n\r\n')
+
+    def _write_chunk(self, data):
+        self.wfile.write(b'%x\r\n%s\r\n' % (len(data), data))
+
+    # Cabeceras de validación y caché de un paso o rango
+    def _validators(self, etag):
+        headers = [('ETag', etag), ('Cache-Control', self.cache_control)]
+        last_modified = self.store.last_modified
+        if last_modified is not None:
+            headers.append(('Last-Modified', last_modified))
+        return headers
+
+    # Responder 304 si el cliente ya tiene esta versión
+    def _send_not_modified(self, etag, headers):
+        """
+        Responde 304 (sin cuerpo) si If-None-Match incluye ``etag`` o, sin If-None-Match y
+        solo en GET, si el archivo no cambió desde If-Modified-Since. Regresa True si respondió.
+        Los POST de pasos solo leen, así que también aceptan If-None-Match con 304 (y no 412)
+        para que Unity pueda revalidar los pasos que ya tiene.
+        """
+        if_none_match = self.headers.get('If-None-Match')
+        if if_none_match is not None:
+            fresh = etag_matches(if_none_match, etag)
+        else:
+            fresh = self.command == 'GET' and not_modified_since(self.headers.get('If-Modified-Since'),
+                                                                 self.store.last_modified)
+        if not fresh:
+            return False
+        self.store.not_modified += 1
+        self.send_response(304)
+        for name, value in headers:
+            self.send_header(name, value)
+        self.end_headers()
+        return True
+
+    # Responder un paso (base 1) con sus validadores
+    def _send_step(self, step):
+        entry = self.store.get_step_entry(step - 1)
+        if entry is None:
+            self._send_json(json.dumps({"error": "Step no encontrado"}).encode('utf-8'), status=404)
+            return
+        body, etag = entry
+        headers = self._validators(etag)
+        if not self._send_not_modified(etag, headers):
+            self._send_json(body, headers=headers)
+
+    # Responder una solicitud de rango {"from": n, "to": m, "fields": [...]}
+    def _handle_range(self, request_body):
+        first, last = request_body['from'], request_body.get('to', request_body['from'])
+        fields = request_body.get('fields')
+        if (not isinstance(first, int) or not isinstance(last, int) or last < first
+                or (fields is not None and not isinstance(fields, list))
+                or (fields is not None and not all(isinstance(field, str) for field in fields))):
+            self._send_json(json.dumps({"error": "Rango inválido"}).encode('utf-8'), status=400)
+            return
+        try:
+            # Rango base 1 e inclusivo, convertido a índices [first - 1, last)
+            items, etag = self.store.get_range_entry(first - 1, last, fields)
+        except KeyError as e:
+            self._send_json(json.dumps({"error": f"Campo desconocido: {e.args[0]}"}).encode('utf-8'), status=400)
+            return
+        if not items:
+            self._send_json(json.dumps({"error": "Step no encontrado"}).encode('utf-8'), status=404)
+            return
+        headers = self._validators(etag)
+        if not self._send_not_modified(etag, headers):
+            self._send_json_array(items, headers)
+
+    # Manejar solicitudes GET: /stats, /steps/<n>, /steps?from=n&to=m&fields=a,b
+    # (los GET de pasos y rangos se pueden guardar en la caché de un proxy; los POST no)
     def do_GET(self):
-        self._set_response('text/html')
-        self.wfile.write("Servidor activo y esperando datos.".encode('utf-8'))
+        url = urlsplit(self.path)
+        if url.path == '/stats':
+            self._send_json(json.dumps(self.store.stats()).encode('utf-8'))
+            return
+        if url.path.startswith('/steps'):
+            self._handle_steps_get(url)
+            return
+        body = "Servidor activo y esperando datos.".encode('utf-8')
+        self._set_response('text/html', content_length=len(body))
+        self.wfile.write(body)
+
+    def _handle_steps_get(self, url):
+        try:
+            step = url.path[len('/steps'):].strip('/')
+            if step:
+                self._send_step(int(step))
+                return
+            query = parse_qs(url.query)
+            request_body = {'from': int(query['from'][0])}
+            if 'to' in query:
+                request_body['to'] = int(query['to'][0])
+            if 'fields' in query:
+                request_body['fields'] = query['fields'][0].split(',')
+        except (KeyError, ValueError):
+            self._send_json(json.dumps({"error": "Solicitud inválida"}).encode('utf-8'), status=400)
+            return
+        self._handle_range(request_body)
 
     # Manejar solicitudes POST (envío de pasos de la simulación)
     def do_POST(self):
         try:
-            # Cargar los datos de la simulación
-            simulation_data = self.load_simulation_data()
-            
             # Extraer el paso desde los parámetros de la solicitud
             content_length = int(self.headers['Content-Length'])
             post_data = self.rfile.read(content_length)
             request_body = json.loads(post_data.decode('utf-8'))
 
-            # Validar el paso solicitado
-            step = request_body.get('step', 1) - 1  # Paso base 1 (convertido a índice)
-            if 0 <= step < len(simulation_data):
-                response_data = simulation_data[step]
-                self._set_response()
-                self.wfile.write(json.dumps(response_data).encode('utf-8'))
-            else:
-                self.send_response(404)
-                self.wfile.write(json.dumps({"error": "Step no encontrado"}).encode('utf-8'))
+            # Solicitud de un rango de pasos
+            if 'from' in request_body:
+                self._handle_range(request_body)
+                return
+
+            # Paso solicitado (base 1)
+            self._send_step(request_body.get('step', 1))
         except Exception as e:
             logging.error(f"Error procesando solicitud POST: {e}")
-            self.send_response(500)
-            self.wfile.write(json.dumps({"error": "Error interno del servidor"}).encode('utf-8'))
+            self._send_json(json.dumps({"error": "Error interno del servidor"}).encode('utf-8'), status=500)
+
+
+class KeepAliveSimulationServer(SimulationServer):
+    """
+    Variante del manejador que habla HTTP/1.1 para mantener la conexión abierta
+    entre pasos. Todas las respuestas llevan Content-Length, así que el cliente
+    puede reutilizar el mismo socket.
+    """
+    protocol_version = 'HTTP/1.1'
+
+    # Cabeceras y cuerpo salen en escrituras separadas; sin esto Nagle + ACK
+    # retrasado agregan ~40 ms a cada respuesta en una conexión reutilizada.
+    disable_nagle_algorithm = True
 
+    # Segundos que una solicitud a medias (ya con bytes recibidos) puede ocupar un hilo del pool
+    timeout = 15
 
-def run(server_class=HTTPServer, handler_class=SimulationServer, port=8585):
+
+class PooledHTTPServer(HTTPServer):
+    """
+    Servidor HTTP que atiende cada *solicitud* en un pool acotado de hilos.
+    A diferencia de ThreadingHTTPServer, nunca crea más de ``workers`` hilos. Una conexión
+    keep-alive inactiva no ocupa un hilo: espera en un selector (hilo ``poller``) y vuelve
+    al pool solo cuando llega su siguiente solicitud, así que más clientes que hilos se
+    turnan por solicitud en lugar de esperar a que otro cliente se desconecte.
+    Las conexiones inactivas más de ``idle_timeout`` segundos se cierran.
+    """
+
+    idle_timeout = 15
+
+    def __init__(self, server_address, handler_class, workers=8):
+        super().__init__(server_address, handler_class)
+        self.workers = workers
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='simulation-server')
+        self._selector = selectors.DefaultSelector()
+        # Los hilos del pool dejan aquí los manejadores que esperan su siguiente solicitud;
+        # solo el poller toca el selector, y un byte en _wakeup lo despierta.
+        self._parked = []
+        self._parked_lock = threading.Lock()
+        self._wakeup_read, self._wakeup_write = socket.socketpair()
+        self._wakeup_read.setblocking(False)
+        self._selector.register(self._wakeup_read, selectors.EVENT_READ)
+        self._closing = False
+        self._poller = threading.Thread(target=self._poll_idle, daemon=True, name='simulation-server-poller')
+        self._poller.start()
+
+    def process_request(self, request, client_address):
+        self._executor.submit(self._open_connection, request, client_address)
+
+    def _open_connection(self, request, client_address):
+        """Prepara el manejador de una conexión nueva (sin el ciclo de handle) y atiende su primera solicitud."""
+        handler = self.RequestHandlerClass.__new__(self.RequestHandlerClass)
+        handler.request, handler.client_address, handler.server = request, client_address, self
+        try:
+            handler.setup()
+        except Exception:
+            self.handle_error(request, client_address)
+            self.shutdown_request(request)
+            return
+        self._serve_requests(handler)
+
+    def _serve_requests(self, handler):
+        """
+        Atiende una solicitud de la conexión (y las que el cliente ya haya mandado detrás)
+        y después la cierra o la deja esperando en el selector.
+        """
+        try:
+            while True:
+                handler.close_connection = True
+                handler.handle_one_request()
+                if handler.close_connection:
+                    break
+                if not self._has_buffered_request(handler):
+                    self._park(handler)
+                    return
+        except Exception:
+            self.handle_error(handler.request, handler.client_address)
+        self._close_connection(handler)
+
+    @staticmethod
+    def _has_buffered_request(handler):
+        """True si ya hay bytes de otra solicitud en el buffer de lectura (el selector no los vería)."""
+        connection = handler.connection
+        connection.settimeout(0)
+        try:
+            return bool(handler.rfile.peek(1))
+        except OSError:
+            return False
+        finally:
+            connection.settimeout(handler.timeout)
+
+    def _park(self, handler):
+        with self._parked_lock:
+            if self._closing:
+                closing = True
+            else:
+                closing = False
+                self._parked.append(handler)
+        if closing:
+            self._close_connection(handler)
+        else:
+            self._wakeup_write.send(b'\0')
+
+    def _close_connection(self, handler):
+        try:
+            handler.finish()
+        except Exception:
+            pass
+        self.shutdown_request(handler.request)
+
+    def _poll_idle(self):
+        """Espera a que alguna conexión inactiva reciba una solicitud y la manda al pool."""
+        selector = self._selector
+        while True:
+            deadlines = [key.data[1] for key in selector.get_map().values() if key.data is not None]
+            timeout = max(0.0, min(deadlines) - time.monotonic()) if deadlines else None
+            for key, _ in selector.select(timeout):
+                if key.data is None:
+                    # Despertador: registrar las conexiones que dejaron los hilos del pool
+                    try:
+                        while self._wakeup_read.recv(4096):
+                            pass
+                    except (BlockingIOError, OSError):
+                        pass
+                    with self._parked_lock:
+                        parked, self._parked = self._parked, []
+                        closing = self._closing
+                    if closing:
+                        for handler in parked:
+                            self._close_connection(handler)
+                        self._close_idle(list(selector.get_map().values()))
+                        return
+                    deadline = time.monotonic() + self.idle_timeout
+                    for handler in parked:
+                        selector.register(handler.connection, selectors.EVENT_READ, (handler, deadline))
+                else:
+                    selector.unregister(key.fileobj)
+                    self._executor.submit(self._serve_requests, key.data[0])
+            now = time.monotonic()
+            self._close_idle([key for key in selector.get_map().values()
+                              if key.data is not None and key.data[1] <= now])
+
+    def _close_idle(self, keys):
+        for key in keys:
+            if key.data is not None:
+                self._selector.unregister(key.fileobj)
+                self._close_connection(key.data[0])
+
+    def server_close(self):
+        super().server_close()
+        with self._parked_lock:
+            self._closing = True
+        self._wakeup_write.send(b'\0')
+        self._poller.join(timeout=5)
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        self._selector.close()
+        self._wakeup_read.close()
+        self._wakeup_write.close()
+
+
+# Modos de servicio disponibles: (clase del servidor, clase del manejador)
+SERVER_MODES = {
+    'single': (HTTPServer, SimulationServer),
+    'threaded': (PooledHTTPServer, KeepAliveSimulationServer),
+}
+
+DEFAULT_WORKERS = 8
+
+
+def make_server(port=8585, mode='single', workers=DEFAULT_WORKERS, host=''):
+    """Construye el servidor HTTP para el modo indicado sin arrancarlo."""
+    server_class, handler_class = SERVER_MODES[mode]
+    if server_class is PooledHTTPServer:
+        return server_class((host, port), handler_class, workers=workers)
+    return server_class((host, port), handler_class)
+
+
+def run(port=8585, mode='single', workers=DEFAULT_WORKERS, data_file=None, max_age=0):
+    """
+    Sirve los pasos hasta Ctrl+C. Con ``max_age`` > 0 los clientes y proxies pueden usar un
+    paso guardado durante ``max_age`` segundos sin revalidarlo (solo para corridas terminadas
+    cuyo archivo ya no se reescribe); con 0 siempre revalidan con el ETag.
+    """
     logging.basicConfig(level=logging.INFO)
-    server_address = ('', port)
-    httpd = server_class(server_address, handler_class)
-    logging.info("Servidor iniciado en el puerto %d...\n", port)
+    STORE.path = data_file if data_file is not None else default_data_file()
+    if max_age > 0:
+        SimulationServer.cache_control = f'public, max-age={max_age}'
+    httpd = make_server(port=port, mode=mode, workers=workers)
+    logging.info("Servidor iniciado en el puerto %d (modo %s) sirviendo %s...\n", port, mode, STORE.path)
     try:
         httpd.serve_forever()
     except KeyboardInterrupt:
         pass
     httpd.server_close()
-    logging.info("Servidor detenido.\n")
+    logging.info("Servidor detenido. Estadísticas del almacén: %s\n", STORE.stats())
 
 
-if __name__ == '__main__':
-    from sys import argv
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Servidor de pasos de la simulación FlashPoint.")
+    parser.add_argument('port', nargs='?', type=int, default=8585, help="Puerto de escucha (8585 por defecto).")
+    parser.add_argument('--mode', choices=sorted(SERVER_MODES), default='single',
+                        help="single: una conexión a la vez; threaded: pool de hilos por solicitud con keep-alive.")
+    parser.add_argument('--workers', type=int, default=DEFAULT_WORKERS,
+                        help="Tamaño del pool de hilos en modo threaded.")
+    parser.add_argument('--data', default=None,
+                        help="Trayectoria a servir: JSON (completo o delta), .ndjson o .npz binario "
+                             "(por defecto, la salida más reciente de flashpoint.py).")
+    parser.add_argument('--max-age', type=int, default=0,
+                        help="Segundos que un cliente o proxy puede usar un paso sin revalidarlo (0 = siempre revalida).")
+    return parser.parse_args(argv)
+
 
-    if len(argv) == 2:
-        run(port=int(argv[1]))
-    else:
-        run()
+if __name__ == '__main__':
+    args = parse_args()
+    run(port=args.port, mode=args.mode, workers=args.workers, data_file=args.data, max_age=args.max_age)
@@ -0,0 +1,145 @@
+# -----------------------------------------------------------------------------------------------------------
+# IMPORTS
+# -----------------------------------------------------------------------------------------------------------
+
+# Importamos el siguiente paquete para el mejor manejo de valores numéricos.
+import numpy as np
+
+# Agente base de Mesa.
+from mesa import Agent
+
+# -----------------------------------------------------------------------------------------------------------
+# ALMACÉN DE AGENTES
+# -----------------------------------------------------------------------------------------------------------
+
+class AgentStore:
+    """
+    Estado de todos los agentes de un modelo como arreglos de NumPy (uno por atributo,
+    indexados por el número de agente), en lugar de atributos sueltos en cada objeto.
+    Los agentes (StoredAgent) son vistas delgadas: cada atributo lee y escribe su casilla.
+    Así los recorridos sobre todos los agentes (por ejemplo, quién está sobre goo) son
+    operaciones de NumPy.
+    """
+
+    def __init__(self, capacity):
+        self.agents = []  # Agente de cada índice, en orden de creación
+        self.kind = np.zeros(capacity, dtype=np.uint8)  # Bit del agente en board (EMPLOYEE, LOOTBUG)
+        self.x = np.full(capacity, -1, dtype=np.int32)  # Posición (-1 fuera del grid)
+        self.y = np.full(capacity, -1, dtype=np.int32)
+        self.ap = np.zeros(capacity, dtype=np.int16)  # Puntos de acción
+        self.remaining_ap = np.zeros(capacity, dtype=np.int16)
+        self.carrying = np.zeros(capacity, dtype=np.bool_)  # Lleva una víctima
+        self.finished = np.zeros(capacity, dtype=np.bool_)  # Terminó su turno
+        self.goal = np.zeros(capacity, dtype=np.int8)  # GOAL_POI, GOAL_EXIT o 0 sin objetivo
+        self.extinguished = np.zeros(capacity, dtype=np.bool_)
+        self.moved = np.zeros(capacity, dtype=np.bool_)
+        self.state = np.zeros(capacity, dtype=np.int8)  # Estado del LootBug (índice en sus estados)
+        self.cargo = np.zeros(capacity, dtype=np.int8)  # POI que carga el LootBug (0 ninguno)
+        self.target_x = np.full(capacity, -1, dtype=np.int32)  # POI objetivo del LootBug
+        self.target_y = np.full(capacity, -1, dtype=np.int32)
+
+    # Arreglos del almacén, en el orden en que se guardan en un snapshot.
+    FIELDS = ("kind", "x", "y", "ap", "remaining_ap", "carrying", "finished", "goal", "extinguished", "moved",
+              "state", "cargo", "target_x", "target_y")
+
+    def snapshot(self):
+        """Copia de todos los arreglos del almacén."""
+        return {name: getattr(self, name).copy() for name in self.FIELDS}
+
+    def load_snapshot(self, snapshot):
+        """Sobrescribe los arreglos con los de ``snapshot`` (de la misma capacidad)."""
+        for name in self.FIELDS:
+            getattr(self, name)[:] = snapshot[name]
+
+    def add(self, agent):
+        """Reserva el siguiente índice para ``agent`` y regresa ese índice."""
+        index = len(self.agents)
+        if index == len(self.kind):
+            raise ValueError(f"El almacén de agentes está lleno ({index} agentes)")
+        self.agents.append(agent)
+        self.kind[index] = agent.board_bit
+        return index
+
+    def on_bits(self, board, kind, bits):
+        """
+        Índices (en orden de creación) de los agentes de tipo ``kind`` cuya celda tiene
+        alguno de ``bits`` en el tablero; por ejemplo, los empleados sobre goo.
+        """
+        # Los agentes fuera del grid (-1) leen la última celda, pero la máscara los descarta.
+        cells = board[self.x, self.y]
+        hits = (self.kind == kind) & (self.x >= 0) & ((cells & bits) != 0)
+        return np.flatnonzero(hits).tolist()
+
+class Stored:
+    """Atributo de un StoredAgent guardado en ``AgentStore.<field>[index]``."""
+
+    def __init__(self, field, empty=None):
+        """
+        - field: Nombre del arreglo en AgentStore.
+        - empty: Valor que se lee como None (y que se escribe al asignar None).
+        """
+        self.field = field
+        self.empty = empty
+
+    def __get__(self, agent, owner):
+        if agent is None:
+            return self
+        value = agent.store.__dict__[self.field].item(agent.index)
+        if self.empty is not None and value == self.empty:
+            return None
+        return value
+
+    def __set__(self, agent, value):
+        agent.store.__dict__[self.field][agent.index] = self.empty if value is None else value
+
+class StoredName:
+    """Atributo de texto de un StoredAgent guardado como su índice en ``names``."""
+
+    def __init__(self, field, names):
+        self.field = field
+        self.names = tuple(names)
+        self.codes = {name: code for code, name in enumerate(self.names)}
+
+    def __get__(self, agent, owner):
+        if agent is None:
+            return self
+        return self.names[agent.store.__dict__[self.field].item(agent.index)]
+
+    def __set__(self, agent, value):
+        agent.store.__dict__[self.field][agent.index] = self.codes[value]
+
+class StoredPair:
+    """Atributo (x, y) de un StoredAgent guardado en dos arreglos; (-1, -1) se lee como None."""
+
+    def __init__(self, x_field, y_field):
+        self.x_field = x_field
+        self.y_field = y_field
+
+    def __get__(self, agent, owner):
+        if agent is None:
+            return self
+        arrays = agent.store.__dict__
+        x = arrays[self.x_field].item(agent.index)
+        if x < 0:
+            return None
+        return (x, arrays[self.y_field].item(agent.index))
+
+    def __set__(self, agent, value):
+        x, y = (-1, -1) if value is None else value
+        arrays = agent.store.__dict__
+        arrays[self.x_field][agent.index] = x
+        arrays[self.y_field][agent.index] = y
+
+class StoredAgent(Agent):
+    """
+    Agente de Mesa cuyo estado vive en el AgentStore del modelo (``model.agent_store``).
+    Las subclases declaran sus atributos con Stored/StoredPair y un ``board_bit``.
+    """
+
+    pos = StoredPair("x", "y")
+
+    def __init__(self, unique_id, model):
+        # El índice se reserva antes de Agent.__init__, que ya asigna self.pos.
+        self.store = model.agent_store
+        self.index = self.store.add(self)
+        super().__init__(unique_id, model)
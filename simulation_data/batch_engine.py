@@ -0,0 +1,684 @@
+# -----------------------------------------------------------------------------------------------------------
+# IMPORTS
+# -----------------------------------------------------------------------------------------------------------
+
+# Importamos el siguiente paquete para el mejor manejo de valores numéricos.
+import numpy as np
+
+from board import GOO, DROPLET, FALSE_POI, VICTIM, EXIT, THREAT, POI, AGENTS, POI_BITS
+from goo import promote_droplets_batch
+from flashpoint import (ModeloEdificio, DIRECTIONS, NO_EDGE, WALL_OKAY, WALL_DAMAGED, WALL_DESTROYED,
+                        DOOR_CLOSED, DOOR_OPEN, DOOR_REMOVED)
+
+# -----------------------------------------------------------------------------------------------------------
+# MOTOR POR LOTES
+# -----------------------------------------------------------------------------------------------------------
+
+# Distancia "infinita" de los campos de distancia (int32). Las sumas de costos a lo largo de
+# una fila o columna se hacen en int64, así que ni H ni W aristas infinitas se desbordan.
+INF = 1 << 30
+
+def _crossing_cost(carrying, breakable, door, wall):
+    """Costo de cruzar una arista con ese estado (ver ModeloEdificio.crossing_costs)."""
+    cost = (2 if carrying else 1) + (door == DOOR_CLOSED)
+    if door == NO_EDGE and wall in (WALL_OKAY, WALL_DAMAGED):
+        cost = cost + (4 if wall == WALL_OKAY else 2) if breakable else INF
+    return cost
+
+# Tabla de costos indexada por (lleva víctima · 2 + paredes rompibles) · 16 + (puerta + 1) · 4 + (pared + 1).
+CROSSING_COSTS = np.array([
+    _crossing_cost(carrying, breakable, door, wall)
+    for carrying in (False, True) for breakable in (False, True)
+    for door in range(-1, 3) for wall in range(-1, 3)
+], dtype=np.int64)
+
+# Estados del LootBug (los mismos índices que LootBugAgent.state).
+BUG_CAPTURE, BUG_PLACE, BUG_RETURN = 0, 1, 2
+
+# Campos de distancia de cada juego: hacia POIs sin víctima y hacia salidas cargando una.
+FIELD_POI, FIELD_EXIT = 0, 1
+
+# Razones de fin, en el orden de BatchEngine.end_reason_codes.
+END_REASONS = ("unfinished", "victory", "collapse", "victims_lost")
+
+class BatchEngine:
+    """
+    Juega B partidas del mismo edificio a la vez con arreglos de NumPy: el tablero de bits
+    (ver board.py) de todos los juegos es un arreglo (B, H·W), los estados de paredes y
+    puertas son (B, aristas) y los agentes (B, agentes). Cada step() hace una activación del
+    agente en turno en todos los juegos que siguen corriendo, con las mismas reglas que
+    ModeloEdificio en modo "action": las fases (acción del empleado, avance del goo,
+    explosiones y ondas, efectos secundarios, knocked_down, reposición de POIs y LootBug) se
+    aplican a todos los juegos que las necesitan con máscaras, no juego por juego.
+
+    Usa su propio generador (numpy.random.Generator), así que una partida no repite a la
+    de ModeloEdificio con la misma semilla; tampoco los desempates entre caminos del mismo
+    costo. Las fases deterministas coinciden exactamente con el modelo y las partidas
+    completas siguen la misma distribución de resultados (ver benchmarks/bench_batch.py).
+    """
+
+    def __init__(self, template, games, seed=None):
+        """
+        - template: ModeloEdificio del que se toma la geometría del edificio (y, con
+          from_scenario/from_models, el estado inicial).
+        - games: Número de juegos del lote.
+        - seed: Semilla del generador del lote.
+        """
+        self.games = games
+        self.rng = np.random.default_rng(seed)
+        self.height, self.width = template.height, template.width
+        self.cells = self.height * self.width
+        self.edges = template.edge_count
+        self.nest = self.flat(template.lootbug_nest)
+        self.entry_points = np.array([self.flat(pos) for pos in template.entry_points], dtype=np.intp)
+        self.employees = template.employee_agents
+        self.agents = self.employees + template.lootbug_agents
+        self.lootbug = self.employees  # Índice (y turno) del LootBug
+        self.max_threat_markers = template.max_threat_markers
+        self.build_tables(template)
+
+        # Estado de los juegos. La última columna de board (una celda centinela siempre vacía)
+        # y de wall/door (una arista centinela sin pared ni puerta) permite leer vecinos fuera
+        # del tablero sin casos especiales.
+        self.board = np.zeros((games, self.cells + 1), dtype=np.uint8)
+        self.wall = np.full((games, self.edges + 1), NO_EDGE, dtype=np.int8)
+        self.door = np.full((games, self.edges + 1), NO_EDGE, dtype=np.int8)
+        self.threat_markers = np.zeros(games, dtype=np.int32)
+        self.poi_total = np.zeros(games, dtype=np.int32)
+        self.poi_false = np.zeros(games, dtype=np.int32)
+        self.poi_real = np.zeros(games, dtype=np.int32)
+        self.poi_in_building = np.zeros(games, dtype=np.int32)
+        self.damage = np.zeros(games, dtype=np.int32)
+        self.saved = np.zeros(games, dtype=np.int32)
+        self.lost = np.zeros(games, dtype=np.int32)
+        self.collapsed = np.zeros(games, dtype=np.bool_)
+        self.running = np.ones(games, dtype=np.bool_)
+        self.steps = np.zeros(games, dtype=np.int64)  # Activaciones (pasos en modo "action")
+        self.turn = np.zeros(games, dtype=np.intp)
+
+        # Agentes: celda (índice plano), AP y víctima cargada; estado y carga (bits) del LootBug.
+        self.pos = np.zeros((games, self.agents), dtype=np.intp)
+        self.ap = np.zeros((games, self.agents), dtype=np.int16)
+        self.carrying = np.zeros((games, self.agents), dtype=np.bool_)
+        self.bug_state = np.zeros(games, dtype=np.int8)
+        self.bug_cargo = np.zeros(games, dtype=np.uint8)
+
+        # Campos de distancia en caché por juego; valid se apaga cuando cambian paredes,
+        # puertas o (para FIELD_POI) los POIs de ese juego.
+        self.fields = np.full((games, 2, self.cells + 1), INF, dtype=np.int32)
+        self.fields_valid = np.zeros((games, 2), dtype=np.bool_)
+
+    def flat(self, pos):
+        """Índice plano de una celda (x, y)."""
+        return pos[0] * self.width + pos[1]
+
+    def build_tables(self, template):
+        """
+        Tablas fijas del edificio por celda plana: las cuatro vecinas (en el orden de
+        DIRECTIONS) con la arista que las separa, y la ventana de Moore de 3x3.
+        Fuera del tablero se usan la celda y la arista centinela.
+        """
+        cells, edges = self.cells, self.edges
+        self.neighbor = np.full((cells, 4), cells, dtype=np.intp)
+        self.neighbor_edge = np.full((cells, 4), edges, dtype=np.intp)
+        self.moore = np.full((cells, 9), cells, dtype=np.intp)
+        for x in range(self.height):
+            for y in range(self.width):
+                cell = self.flat((x, y))
+                slots = []
+                for (nx, ny), edge in template.neighbor_edges[(x, y)]:
+                    slot = DIRECTIONS.index((nx - x, ny - y))
+                    self.neighbor[cell, slot] = self.flat((nx, ny))
+                    self.neighbor_edge[cell, slot] = edge
+                    slots.append(slot)
+                if slots != sorted(slots):
+                    raise ValueError("El orden de vecinos del grid no coincide con DIRECTIONS")
+                window = [self.flat((wx, wy))
+                          for wx in range(x - 1, x + 2) for wy in range(y - 1, y + 2)
+                          if 0 <= wx < self.height and 0 <= wy < self.width]
+                self.moore[cell, :len(window)] = window
+        self.neighbor_valid = self.neighbor < cells
+
+        # Aristas que tocan el nido: nadie entra al nido ni pasa por él.
+        self.nest_edges = self.neighbor_edge[self.nest][self.neighbor_valid[self.nest]]
+        self.row_edges = template.row_edges
+
+    # -------------------------------------------------------------------------------------------------------
+    # CONSTRUCCIÓN
+    # -------------------------------------------------------------------------------------------------------
+
+    @classmethod
+    def from_scenario(cls, scenario, games, seed=None):
+        """
+        Lote de ``games`` juegos nuevos del escenario. Lo único aleatorio al crear un
+        ModeloEdificio es el punto de entrada de cada empleado (los POIs iniciales salen del
+        escenario), así que se copia un modelo plantilla y se sortean solo las entradas.
+        """
+        template = ModeloEdificio.from_scenario(scenario, seed=0, record_trajectory=False)
+        engine = cls(template, games, seed)
+        engine.load_model(slice(None), template)
+        entries = engine.rng.integers(len(engine.entry_points), size=(games, engine.employees))
+        engine.pos[:, :engine.employees] = engine.entry_points[entries]
+        return engine
+
+    @classmethod
+    def from_models(cls, models, seed=None):
+        """Lote con el estado actual de cada modelo (todos del mismo edificio), para compararlos."""
+        engine = cls(models[0], len(models), seed)
+        for game, model in enumerate(models):
+            engine.load_model(game, model)
+        return engine
+
+    def load_model(self, games, model):
+        """Copia el estado de ``model`` a los juegos indicados (un índice, un slice o un arreglo)."""
+        store = model.agent_store
+        self.board[games, :self.cells] = model.board.ravel() & (0xFF ^ AGENTS)
+        self.wall[games, :self.edges] = model.wall_code
+        self.door[games, :self.edges] = model.door_code
+        self.threat_markers[games] = model.current_threat_markers
+        self.poi_total[games] = model.poi_total_count
+        self.poi_false[games] = model.poi_false_alarm
+        self.poi_real[games] = model.poi_real_victim
+        self.poi_in_building[games] = model.poi_in_building
+        self.damage[games] = model.damage_counter
+        self.saved[games] = model.saved_victims
+        self.lost[games] = model.lost_victims
+        self.collapsed[games] = model.collapsed_building
+        self.running[games] = model.running
+        self.steps[games] = model.steps
+        self.turn[games] = model.turn
+        self.pos[games] = store.x[:self.agents] * self.width + store.y[:self.agents]
+        self.ap[games] = store.ap[:self.agents]
+        self.carrying[games] = store.carrying[:self.agents]
+        self.bug_state[games] = store.state[self.lootbug]
+        self.bug_cargo[games] = POI_BITS[int(store.cargo[self.lootbug])]
+        self.fields_valid[games] = False
+
+    # -------------------------------------------------------------------------------------------------------
+    # CORRIDA
+    # -------------------------------------------------------------------------------------------------------
+
+    def step(self, max_steps=None):
+        """
+        Una activación del agente en turno en cada juego que sigue corriendo (y que no ha
+        llegado a ``max_steps``). Regresa cuántos juegos se activaron.
+        """
+        active = self.running if max_steps is None else self.running & (self.steps < max_steps)
+        games = np.flatnonzero(active)
+        if len(games):
+            self.steps[games] += 1
+            turn = self.turn[games]
+            bug = turn == self.lootbug
+            self.employee_step(games[~bug], turn[~bug])
+            self.lootbug_step(games[bug])
+        return len(games)
+
+    def run(self, max_steps):
+        """Juega hasta que todos los juegos terminen o lleguen a ``max_steps`` activaciones."""
+        while self.step(max_steps):
+            pass
+
+    def end_reason_codes(self):
+        """Índice en END_REASONS de cada juego (con la prioridad de ModeloEdificio.end_reason)."""
+        codes = np.zeros(self.games, dtype=np.int8)
+        codes[self.lost >= 4] = 3
+        codes[self.collapsed] = 2
+        codes[self.saved >= 7] = 1
+        return codes
+
+    def results(self):
+        """Resumen de cada juego, con las llaves de batch_runner.play_game (``seed`` es el índice del juego)."""
+        reasons = self.end_reason_codes()
+        return [
+            {
+                "seed": game,
+                "steps": int(self.steps[game]),
+                "end_reason": END_REASONS[reasons[game]],
+                "collapsed_building": bool(self.collapsed[game]),
+                "saved_victims": int(self.saved[game]),
+                "lost_victims": int(self.lost[game]),
+            }
+            for game in range(self.games)
+        ]
+
+    def end_game(self, games):
+        """ModeloEdificio.end_game para los juegos indicados (todos corriendo)."""
+        damage = self.damage[games]
+        self.collapsed[games] |= damage <= 0
+        over = (self.saved[games] >= 7) | (damage <= 0) | (self.lost[games] >= 4)
+        self.running[games[over]] = False
+
+    # -------------------------------------------------------------------------------------------------------
+    # PAREDES, PUERTAS Y CAMPOS DE DISTANCIA
+    # -------------------------------------------------------------------------------------------------------
+
+    def passable(self, games, edges):
+        """Si se puede cruzar cada arista: sin puerta cerrada ni pared intacta o dañada."""
+        wall = self.wall[games, edges]
+        return (self.door[games, edges] != DOOR_CLOSED) & ((wall == NO_EDGE) | (wall == WALL_DESTROYED))
+
+    def crossing_costs(self, games, edges, carrying):
+        """
+        ModeloEdificio.crossing_costs de ``edges`` (una fila de aristas por juego, o una sola
+        fila para todos) en AP, con INF si no se puede cruzar. ``carrying`` es un arreglo por juego.
+        """
+        breakable = self.damage[games] > 6
+        index = (carrying.astype(np.intp) * 2 + breakable)[:, None] * 16
+        index = index + (self.door[games[:, None], edges] + 1) * 4 + (self.wall[games[:, None], edges] + 1)
+        return CROSSING_COSTS[index]
+
+    def distance_fields(self, games, kind):
+        """
+        Campos de distancia (fila por juego, INF sin camino) hacia POIs (FIELD_POI, sin
+        víctima) o salidas (FIELD_EXIT, cargando una), como ModeloEdificio.distance_field.
+        Solo se recalculan los juegos cuyo campo en caché ya no es válido, todos a la vez
+        (ver sweep_distances).
+        """
+        stale = ~self.fields_valid[games, kind]
+        if stale.any():
+            games_stale, kind_stale = games[stale], kind[stale]
+            carrying = kind_stale == FIELD_EXIT
+            costs = self.crossing_costs(games_stale, np.arange(self.edges)[None], carrying)
+            costs[:, self.nest_edges] = INF
+            board = self.board[games_stale, :self.cells]
+            targets = np.where(carrying[:, None], board & EXIT, board & POI) != 0
+            targets[:, self.nest] = False
+            self.fields[games_stale, kind_stale, :self.cells] = self.sweep_distances(costs, targets)
+            self.fields_valid[games_stale, kind_stale] = True
+        return self.fields[games, kind]
+
+    def sweep_distances(self, costs, targets):
+        """
+        Distancia mínima desde cada celda hasta alguna de ``targets`` (n, H·W) con los costos
+        por arista ``costs`` (n, aristas), por barridos: en una fila, de izquierda a derecha,
+        d[y] = min(d[y], d[k] + costo de k a y) para toda k < y, que con la suma acumulada P
+        de los costos es P[y] + min.accumulate(d - P). Cada ronda barre filas y columnas en
+        ambos sentidos; se repite (solo en los juegos que cambiaron) hasta que nada baja, así
+        que hacen falta tantas rondas como vueltas tenga el camino más largo, no tantas como pasos.
+        """
+        n, height, width = len(costs), self.height, self.width
+        vertical = costs[:, :self.row_edges].reshape(n, height - 1, width).astype(np.int64)
+        horizontal = costs[:, self.row_edges:].reshape(n, height, width - 1).astype(np.int64)
+        prefix_down = np.zeros((n, height, width), dtype=np.int64)
+        np.cumsum(vertical, axis=1, out=prefix_down[:, 1:])
+        prefix_right = np.zeros((n, height, width), dtype=np.int64)
+        np.cumsum(horizontal, axis=2, out=prefix_right[:, :, 1:])
+
+        dist = np.where(targets, 0, INF).astype(np.int64).reshape(n, height, width)
+        rows = np.arange(n)  # Juegos que todavía cambian
+        while len(rows):
+            current = dist[rows]
+            updated = current.copy()
+            for prefix, axis in ((prefix_right[rows], 2), (prefix_down[rows], 1)):
+                forward = np.minimum.accumulate(updated - prefix, axis=axis) + prefix
+                backward = np.flip(np.minimum.accumulate(np.flip(updated + prefix, axis), axis=axis), axis) - prefix
+                np.minimum(updated, np.minimum(forward, backward), out=updated)
+            np.minimum(updated, INF, out=updated)
+            changed = (updated != current).any(axis=(1, 2))
+            dist[rows] = updated
+            rows = rows[changed]
+        return dist.reshape(n, self.cells)
+
+    def set_doors(self, games, edges, state):
+        self.door[games, edges] = state
+        self.fields_valid[games] = False
+
+    def damage_walls(self, games, edges):
+        """Un daño a la pared de cada arista (intacta a dañada, dañada a destruida)."""
+        self.wall[games, edges] += 1
+        self.damage[games] -= 1
+        self.fields_valid[games] = False
+
+    # -------------------------------------------------------------------------------------------------------
+    # EMPLEADOS
+    # -------------------------------------------------------------------------------------------------------
+
+    def employee_step(self, games, agent):
+        """EmployeeAgent.step del empleado ``agent`` (arreglo) en cada juego de ``games``."""
+        if not len(games):
+            return
+        rows = np.arange(len(games))
+        pos = self.pos[games, agent]
+        ap = self.ap[games, agent].astype(np.int32)
+        carrying = self.carrying[games, agent].copy()
+        finished = np.zeros(len(games), dtype=np.bool_)
+
+        # Con AP: revisar el objetivo y luego extinguir aquí, extinguir una vecina o moverse.
+        acting = ap >= 1
+        self.check_reached_goal(games, pos, carrying, finished, acting)
+        acting &= ~finished
+
+        here = acting & ((self.board[games, pos] & THREAT) != 0)
+        self.extinguish(games[here], pos[here])
+        ap[here] -= 1
+
+        rest = acting & ~here
+        neighbors = self.neighbor[pos]
+        edges = self.neighbor_edge[pos]
+        open_neighbors = self.neighbor_valid[pos] & self.passable(games[:, None], edges)
+        threatened = open_neighbors & ((self.board[games[:, None], neighbors] & THREAT) != 0)
+        nearby = rest & threatened.any(axis=1)
+        first = threatened.argmax(axis=1)
+        self.extinguish(games[nearby], neighbors[nearby, first[nearby]])
+        ap[nearby] -= 1
+
+        moving = np.flatnonzero(rest & ~nearby)
+        if len(moving):
+            self.move_towards_goal(games, moving, pos, ap, carrying, finished, neighbors, edges, open_neighbors)
+
+        self.pos[games, agent] = pos
+        self.ap[games, agent] = ap
+        self.carrying[games, agent] = carrying
+        ending = (ap <= 0) | finished
+        self.end_employee_turn(games[ending], agent[ending])
+
+    def check_reached_goal(self, games, pos, carrying, finished, mask):
+        """EmployeeAgent.check_reached_goal en las filas de ``mask``; actualiza los arreglos recibidos."""
+        cell = self.board[games, pos]
+        save = mask & carrying & ((cell & EXIT) != 0)
+        saved = games[save]
+        self.saved[saved] += 1
+        self.poi_real[saved] -= 1
+        self.poi_total[saved] -= 1
+        self.poi_in_building[saved] -= 1
+        carrying[save] = False
+        finished[save] = True
+
+        reveal = mask & ~save & ~carrying & ((cell & POI) != 0)
+        false_alarm = reveal & ((cell & FALSE_POI) != 0)
+        removed = games[false_alarm]
+        self.poi_false[removed] -= 1
+        self.poi_total[removed] -= 1
+        self.poi_in_building[removed] -= 1
+        carrying[reveal & ((cell & VICTIM) != 0)] = True
+        revealed = games[reveal]
+        self.board[revealed, pos[reveal]] &= 0xFF ^ POI
+        self.fields_valid[revealed, FIELD_POI] = False
+
+    def extinguish(self, games, cells):
+        """Goo a droplet, o droplet a vacío (un threat marker menos)."""
+        cell = self.board[games, cells]
+        goo = (cell & GOO) != 0
+        self.board[games, cells] = np.where(goo, (cell & (0xFF ^ GOO)) | DROPLET, cell & (0xFF ^ THREAT))
+        self.threat_markers[games[~goo]] -= 1
+
+    def move_towards_goal(self, games, rows, pos, ap, carrying, finished, neighbors, edges, open_neighbors):
+        """
+        Rama de movimiento de perform_single_action para las filas ``rows``: un paso por el
+        camino más barato hacia el objetivo (abriendo puertas o dañando paredes), o un paso
+        aleatorio si no hay objetivo alcanzable; después, check_reached_goal otra vez.
+        """
+        sub = games[rows]
+        kind = carrying[rows].astype(np.intp)  # FIELD_EXIT si lleva una víctima
+        dist = self.distance_fields(sub, kind)
+        local = np.arange(len(rows))
+        here = dist[local, pos[rows]].astype(np.int64)
+        has_goal = here < INF
+        finished[rows[has_goal & (here == 0)]] = True
+
+        walking = has_goal & (here > 0)
+        wander = ~has_goal
+        if walking.any():
+            walk = rows[walking]
+            games_walk, local_walk = games[walk], local[walking]
+            costs = self.crossing_costs(games_walk, edges[walk], carrying[walk])
+            costs[~self.neighbor_valid[pos[walk]]] = INF
+            reach = dist[local_walk[:, None], neighbors[walk]].astype(np.int64) + costs
+            direction = (reach == here[walking, None]).argmax(axis=1)
+            edge = edges[walk, direction]
+            target = neighbors[walk, direction]
+            door = self.door[games_walk, edge]
+            wall = self.wall[games_walk, edge]
+
+            has_door = door != NO_EDGE
+            opening = has_door & (door == DOOR_CLOSED)
+            self.set_doors(games_walk[opening], edge[opening], DOOR_OPEN)
+            ap[walk[opening]] -= 1
+
+            through = (has_door & ~opening) | (~has_door & ((wall == NO_EDGE) | (wall == WALL_DESTROYED)))
+            blocked = ~has_door & ~through
+            random_step = blocked & (self.damage[games_walk] <= 6)
+            breaking = blocked & ~random_step & (ap[walk] >= 2)
+            self.damage_walls(games_walk[breaking], edge[breaking])
+            ap[walk[breaking]] -= 2
+            finished[walk[blocked & ~random_step & ~breaking]] = True
+
+            self.move_agents_to(walk[through], target[through], pos, ap, carrying, finished)
+            wander[local_walk[random_step]] = True
+
+        if wander.any():
+            self.move_random(games, rows[wander], pos, ap, carrying, finished, open_neighbors)
+        goal_rows = np.zeros(len(games), dtype=np.bool_)
+        goal_rows[rows[has_goal]] = True
+        self.check_reached_goal(games, pos, carrying, finished, goal_rows)
+
+    def move_random(self, games, rows, pos, ap, carrying, finished, open_neighbors):
+        """EmployeeAgent.move_random: una vecina cruzable al azar (nunca el nido)."""
+        candidates = open_neighbors[rows] & (self.neighbor[pos[rows]] != self.nest)
+        choice, found = self.choose(candidates)
+        finished[rows[~found]] = True
+        moved = rows[found]
+        self.move_agents_to(moved, self.neighbor[pos[moved], choice[found]], pos, ap, carrying, finished)
+
+    def move_agents_to(self, rows, targets, pos, ap, carrying, finished):
+        """EmployeeAgent.move_agent_to: 1 AP, o 2 cargando una víctima (si no alcanza, se mueve y termina)."""
+        pos[rows] = targets
+        light = ~carrying[rows]
+        heavy = ~light & (ap[rows] >= 2)
+        ap[rows[light]] -= 1
+        ap[rows[heavy]] -= 2
+        finished[rows[~light & ~heavy]] = True
+
+    def end_employee_turn(self, games, agent):
+        """EmployeeAgent.end_turn: avance del goo y efectos secundarios, AP del siguiente turno y cambio de turno."""
+        self.end_game(games)
+        keep = self.running[games]
+        games, agent = games[keep], agent[keep]
+        if not len(games):
+            return
+        self.advance_goo(games)
+        self.promote_droplets(games)
+        self.knocked_down(games)
+        self.replenish_pois(games)
+        self.ap[games, agent] = 4 + np.minimum(self.ap[games, agent], 4)
+        self.end_game(games)
+        games = games[self.running[games]]
+        self.turn[games] += 1
+
+    # -------------------------------------------------------------------------------------------------------
+    # GOO
+    # -------------------------------------------------------------------------------------------------------
+
+    def advance_goo(self, games, cells=None):
+        """
+        ModeloEdificio.advance_goo en cada juego: una celda al azar (o ``cells``) recibe un
+        droplet, o goo si hay goo a su alrededor; un droplet pasa a goo y el goo explota.
+        """
+        if cells is None:
+            cells = self.rng.integers(self.cells, size=len(games))
+        can = self.threat_markers[games] <= self.max_threat_markers
+        can &= cells != self.nest
+        games, cells = games[can], cells[can]
+        cell = self.board[games, cells]
+
+        empty = (cell & THREAT) == 0
+        goo_nearby = ((self.board[games[:, None], self.moore[cells]] & GOO) != 0).any(axis=1)
+        self.board[games, cells] = np.where(empty, cell | np.where(goo_nearby, GOO, DROPLET),
+                                            np.where((cell & DROPLET) != 0, (cell & (0xFF ^ THREAT)) | GOO, cell))
+        self.threat_markers[games[empty]] += 1
+        exploding = (cell & GOO) != 0
+        self.explosion(games[exploding], cells[exploding])
+
+    def explosion(self, games, cells):
+        """
+        ModeloEdificio.explosion en cada juego: hacia cada vecina (en orden), quita puertas,
+        daña paredes, pone goo o lanza una onda expansiva si la vecina ya tenía goo.
+        """
+        can = self.threat_markers[games] <= self.max_threat_markers
+        games, cells = games[can], cells[can]
+        for direction in range(4):
+            neighbor = self.neighbor[cells, direction]
+            hit = self.neighbor_valid[cells, direction] & (neighbor != self.nest)
+            sub, target, edge = games[hit], neighbor[hit], self.neighbor_edge[cells[hit], direction]
+
+            door = self.door[sub, edge]
+            self.set_doors(sub[door == DOOR_CLOSED], edge[door == DOOR_CLOSED], DOOR_REMOVED)
+            self.set_doors(sub[door == DOOR_OPEN], edge[door == DOOR_OPEN], DOOR_REMOVED)
+            go = door != DOOR_CLOSED
+            wall = self.wall[sub, edge]
+            wall_hit = go & ((wall == WALL_OKAY) | (wall == WALL_DAMAGED))
+            self.damage_walls(sub[wall_hit], edge[wall_hit])
+            go &= ~wall_hit
+
+            cell = self.board[sub, target]
+            goo = go & ((cell & GOO) != 0)
+            spread = go & ~goo
+            self.threat_markers[sub[spread & ((cell & THREAT) == 0)]] += 1
+            self.board[sub[spread], target[spread]] = (cell[spread] & (0xFF ^ THREAT)) | GOO
+            self.shockwave(sub[goo], target[goo], direction)
+
+    def shockwave(self, games, cells, direction):
+        """
+        ModeloEdificio.shockwave en cada juego: avanza en ``direction`` sobre el goo hasta
+        romper una puerta o pared, convertir un droplet o llenar una celda vacía.
+        """
+        can = self.threat_markers[games] <= self.max_threat_markers
+        games, cells = games[can], cells[can]
+        while len(games):
+            target = self.neighbor[cells, direction]
+            inside = self.neighbor_valid[cells, direction] & (target != self.nest)
+            games, edge, target = games[inside], self.neighbor_edge[cells[inside], direction], target[inside]
+
+            door = self.door[games, edge]
+            closed = door == DOOR_CLOSED
+            self.set_doors(games[closed], edge[closed], DOOR_REMOVED)
+            self.set_doors(games[door == DOOR_OPEN], edge[door == DOOR_OPEN], DOOR_REMOVED)
+            wall = self.wall[games, edge]
+            wall_hit = ~closed & ((wall == WALL_OKAY) | (wall == WALL_DAMAGED))
+            self.damage_walls(games[wall_hit], edge[wall_hit])
+
+            go = ~closed & ~wall_hit
+            cell = self.board[games, target]
+            goo = go & ((cell & GOO) != 0)
+            fill = go & ~goo
+            self.threat_markers[games[fill & ((cell & DROPLET) == 0)]] += 1
+            self.board[games[fill], target[fill]] = (cell[fill] & (0xFF ^ THREAT)) | GOO
+            games, cells = games[goo], target[goo]
+
+    def promote_droplets(self, games):
+        """ModeloEdificio.check_secondary_effects (goo.promote_droplets_batch) en cada juego."""
+        boards = self.board[games, :self.cells].reshape(len(games), self.height, self.width)
+        promote_droplets_batch(boards)
+        self.board[games, :self.cells] = boards.reshape(len(games), self.cells)
+
+    # -------------------------------------------------------------------------------------------------------
+    # EFECTOS SOBRE EMPLEADOS Y POIS
+    # -------------------------------------------------------------------------------------------------------
+
+    def knocked_down(self, games, entries=None):
+        """
+        EmployeeAgent.knocked_down en cada juego: los empleados sobre goo pierden su víctima
+        y vuelven a una entrada al azar (o ``entries``, índice por juego y empleado); los
+        POIs sobre goo se pierden.
+        """
+        employees = self.pos[games, :self.employees]
+        hit = (self.board[games[:, None], employees] & GOO) != 0
+        if hit.any():
+            if entries is None:
+                entries = self.rng.integers(len(self.entry_points), size=hit.shape)
+            carrying = self.carrying[games, :self.employees]
+            lost = (hit & carrying).sum(axis=1)
+            self.poi_total[games] -= lost
+            self.poi_real[games] -= lost
+            self.lost[games] += lost
+            self.carrying[games, :self.employees] = carrying & ~hit
+            self.pos[games, :self.employees] = np.where(hit, self.entry_points[entries], employees)
+
+        board = self.board[games, :self.cells]
+        burned = (board & GOO) != 0
+        victims = (burned & ((board & VICTIM) != 0)).sum(axis=1)
+        false_alarms = (burned & ((board & FALSE_POI) != 0)).sum(axis=1)
+        self.poi_total[games] -= victims + false_alarms
+        self.poi_in_building[games] -= victims + false_alarms
+        self.poi_real[games] -= victims
+        self.lost[games] += victims
+        self.poi_false[games] -= false_alarms
+        changed = (victims + false_alarms) > 0
+        self.board[games[changed], :self.cells] = np.where(burned[changed], board[changed] & (0xFF ^ POI), board[changed])
+        self.fields_valid[games[changed], FIELD_POI] = False
+
+    def replenish_pois(self, games):
+        """ModeloEdificio.replenish_pois: POIs nuevos en celdas sin POI hasta tener min(3, total) en el edificio."""
+        while len(games):
+            remaining = self.poi_false[games] + self.poi_real[games]
+            need = (self.poi_in_building[games] < np.minimum(3, self.poi_total[games])) & (remaining > 0)
+            games, remaining = games[need], remaining[need]
+            cell, found = self.choose((self.board[games, :self.cells] & POI) == 0)
+            games, cell, remaining = games[found], cell[found], remaining[found]
+            if not len(games):
+                return
+
+            threat = (self.board[games, cell] & THREAT) != 0
+            self.board[games, cell] &= 0xFF ^ THREAT
+            self.threat_markers[games[threat]] -= 1
+
+            false_alarm = self.rng.integers(remaining) < self.poi_false[games]
+            employee_present = (self.pos[games, :self.employees] == cell[:, None]).any(axis=1)
+            discarded = employee_present & false_alarm
+            self.poi_false[games[discarded]] -= 1
+            self.poi_total[games[discarded]] -= 1
+            placed = ~discarded
+            self.board[games[placed], cell[placed]] |= np.where(false_alarm[placed], FALSE_POI, VICTIM).astype(np.uint8)
+            self.poi_in_building[games[placed]] += 1
+            self.fields_valid[games[placed], FIELD_POI] = False
+
+    # -------------------------------------------------------------------------------------------------------
+    # LOOTBUG
+    # -------------------------------------------------------------------------------------------------------
+
+    def lootbug_step(self, games):
+        """LootBugAgent.step: capturar un POI al azar, dejarlo en una celda libre y volver al nido."""
+        if not len(games):
+            return
+        self.end_game(games)
+        games = games[self.running[games]]
+        bug = self.lootbug
+        state = self.bug_state[games]
+
+        capture = games[state == BUG_CAPTURE]
+        cell, found = self.choose((self.board[capture, :self.cells] & POI) != 0)
+        self.turn[capture[~found]] = 0
+        capture, cell = capture[found], cell[found]
+        self.pos[capture, bug] = cell
+        self.bug_cargo[capture] = self.board[capture, cell] & POI
+        self.board[capture, cell] &= 0xFF ^ POI
+        self.fields_valid[capture, FIELD_POI] = False
+        self.bug_state[capture] = BUG_PLACE
+
+        place = games[state == BUG_PLACE]
+        occupied = np.zeros((len(place), self.cells + 1), dtype=np.bool_)
+        occupied[np.arange(len(place))[:, None], self.pos[place]] = True
+        free = ((self.board[place, :self.cells] & POI) == 0) & ~occupied[:, :self.cells]
+        cell, found = self.choose(free)
+        place, cell = place[found], cell[found]
+        threat = (self.board[place, cell] & THREAT) != 0
+        self.threat_markers[place[threat]] -= 1
+        self.board[place, cell] = (self.board[place, cell] & (0xFF ^ THREAT)) | self.bug_cargo[place]
+        self.pos[place, bug] = cell
+        self.bug_cargo[place] = 0
+        self.fields_valid[place, FIELD_POI] = False
+        self.bug_state[place] = BUG_RETURN
+
+        back = games[state == BUG_RETURN]
+        self.pos[back, bug] = self.nest
+        self.bug_state[back] = BUG_CAPTURE
+        self.turn[back] = 0
+
+    def choose(self, candidates):
+        """
+        Una columna al azar entre las True de cada fila de ``candidates`` (uniforme).
+        Regresa (columna, encontrada); sin candidatas la columna no importa.
+        """
+        keys = self.rng.random(candidates.shape)
+        keys[~candidates] = -1.0
+        return keys.argmax(axis=1), candidates.any(axis=1)
@@ -0,0 +1,136 @@
+# -----------------------------------------------------------------------------------------------------------
+# IMPORTS
+# -----------------------------------------------------------------------------------------------------------
+
+import argparse
+import json
+import os
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+
+import flashpoint
+from batch_engine import BatchEngine
+
+# -----------------------------------------------------------------------------------------------------------
+# JUEGOS
+# -----------------------------------------------------------------------------------------------------------
+
+# Escenario del proceso trabajador; se recibe una sola vez en el inicializador del pool.
+_worker_scenario = None
+
+def end_reason(model):
+    """Regresa por qué terminó el juego: victory, collapse, victims_lost o unfinished (ver ModeloEdificio.end_reason)."""
+    return model.end_reason
+
+def play_game(scenario, seed, max_steps, step_mode="action"):
+    """
+    Juega una partida sin recolectar pasos y regresa solo su resumen.
+    - scenario: Scenario regresado por flashpoint.load_scenario.
+    - step_mode: Granularidad de cada paso ("action", "turn" o "round"); max_steps cuenta esos pasos.
+    """
+    model = flashpoint.ModeloEdificio.from_scenario(scenario, seed=seed, record_trajectory=False, step_mode=step_mode)
+    while model.running and model.steps < max_steps:
+        model.step()
+    return {
+        "seed": seed,
+        "steps": model.steps,
+        "end_reason": end_reason(model),
+        "collapsed_building": model.collapsed_building,
+        "saved_victims": model.saved_victims,
+        "lost_victims": model.lost_victims,
+    }
+
+def _init_worker(scenario):
+    global _worker_scenario
+    _worker_scenario = scenario
+
+def _play_seed(args):
+    seed, max_steps, step_mode = args
+    return play_game(_worker_scenario, seed, max_steps, step_mode)
+
+# -----------------------------------------------------------------------------------------------------------
+# LOTES
+# -----------------------------------------------------------------------------------------------------------
+
+def run_batch(scenario, games, base_seed=0, max_steps=200, workers=None, chunksize=None, step_mode="action"):
+    """
+    Juega ``games`` partidas en paralelo y regresa la lista de resúmenes en orden.
+    Cada partida usa una semilla hija independiente de ``base_seed`` (ver spawn_seeds),
+    así que el lote completo es reproducible sin importar cuántos procesos se usen.
+    El escenario ya parseado se envía una vez a cada proceso, no en cada partida.
+    """
+    workers = workers or os.cpu_count() or 1
+    tasks = [(seed, max_steps, step_mode) for seed in flashpoint.spawn_seeds(base_seed, games)]
+    if workers == 1:
+        return [play_game(scenario, *task) for task in tasks]
+    chunksize = chunksize or max(1, games // (workers * 4))
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(scenario,)) as executor:
+        return list(executor.map(_play_seed, tasks, chunksize=chunksize))
+
+def run_batch_engine(scenario, games, base_seed=0, max_steps=200):
+    """
+    Juega ``games`` partidas en un solo proceso con BatchEngine (todas a la vez con NumPy)
+    y regresa sus resúmenes. Solo avanza por acciones (step_mode "action"), y las
+    partidas no repiten a las de run_batch con la misma semilla.
+    """
+    engine = BatchEngine.from_scenario(scenario, games, seed=base_seed)
+    engine.run(max_steps)
+    return engine.results()
+
+def aggregate(results):
+    """Resume las distribuciones de resultados de un lote."""
+    games = len(results)
+    reasons = Counter(result["end_reason"] for result in results)
+    saved = Counter(result["saved_victims"] for result in results)
+    lost = Counter(result["lost_victims"] for result in results)
+    return {
+        "games": games,
+        "win_rate": reasons["victory"] / games if games else 0.0,
+        "end_reasons": {reason: count / games for reason, count in sorted(reasons.items())},
+        "collapsed_rate": sum(result["collapsed_building"] for result in results) / games if games else 0.0,
+        "mean_steps": sum(result["steps"] for result in results) / games if games else 0.0,
+        "mean_saved_victims": sum(result["saved_victims"] for result in results) / games if games else 0.0,
+        "mean_lost_victims": sum(result["lost_victims"] for result in results) / games if games else 0.0,
+        "saved_victims_distribution": {str(value): count for value, count in sorted(saved.items())},
+        "lost_victims_distribution": {str(value): count for value, count in sorted(lost.items())},
+    }
+
+# -----------------------------------------------------------------------------------------------------------
+# INICIALIZAR
+# -----------------------------------------------------------------------------------------------------------
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Corre muchas partidas de ModeloEdificio en paralelo y agrega sus resultados.")
+    parser.add_argument("--games", type=int, default=1000, help="Número de partidas.")
+    parser.add_argument("--seed", type=int, default=0, help="Semilla base del lote.")
+    parser.add_argument("--steps", type=int, default=200, help="Pasos máximos por partida.")
+    parser.add_argument("--workers", type=int, default=None, help="Procesos (por defecto, todos los núcleos).")
+    parser.add_argument("--scenario", default=flashpoint.DEFAULT_SCENARIO, help="Archivo del escenario.")
+    parser.add_argument("--output", default=None, help="Archivo JSON opcional con el resumen agregado.")
+    parser.add_argument("--step-mode", choices=flashpoint.STEP_MODES, default="action",
+                        help="Qué cuenta como un paso: una acción, un turno o una ronda.")
+    parser.add_argument("--engine", choices=("model", "batch"), default="model",
+                        help="ModeloEdificio en varios procesos o BatchEngine (todas las partidas a la vez).")
+    args = parser.parse_args(argv)
+    if args.engine == "batch" and args.step_mode != "action":
+        parser.error("--engine batch solo avanza por acciones (--step-mode action)")
+
+    scenario = flashpoint.load_scenario(args.scenario)
+    start = time.perf_counter()
+    if args.engine == "batch":
+        results = run_batch_engine(scenario, args.games, base_seed=args.seed, max_steps=args.steps)
+    else:
+        results = run_batch(scenario, args.games, base_seed=args.seed, max_steps=args.steps, workers=args.workers,
+                            step_mode=args.step_mode)
+    elapsed = time.perf_counter() - start
+
+    summary = aggregate(results)
+    summary["seconds"] = elapsed
+    print(json.dumps(summary, indent=4))
+    if args.output:
+        with open(args.output, "w") as outfile:
+            json.dump(summary, outfile, indent=4)
+
+if __name__ == "__main__":
+    main()
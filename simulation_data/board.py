@@ -0,0 +1,92 @@
+# -----------------------------------------------------------------------------------------------------------
+# IMPORTS
+# -----------------------------------------------------------------------------------------------------------
+
+# Importamos el siguiente paquete para el mejor manejo de valores numéricos.
+import numpy as np
+
+# -----------------------------------------------------------------------------------------------------------
+# TABLERO POR BITS
+# -----------------------------------------------------------------------------------------------------------
+
+# Cada celda del tablero es un uint8 con un bit por característica (ver ModeloEdificio.board).
+GOO = 1 << 0
+DROPLET = 1 << 1
+FALSE_POI = 1 << 2
+VICTIM = 1 << 3
+EMPLOYEE = 1 << 4
+LOOTBUG = 1 << 5
+EXIT = 1 << 6
+NEST = 1 << 7
+
+# Grupos de bits.
+THREAT = GOO | DROPLET
+POI = FALSE_POI | VICTIM
+AGENTS = EMPLOYEE | LOOTBUG
+
+# Bits para cada valor de threat_markers (0 vacío, 1 droplet, 2 goo) y de poi_placement
+# (0 vacío, 3 falsa alarma, 4 víctima), los valores que usan los agentes y el JSON.
+THREAT_BITS = {0: 0, 1: DROPLET, 2: GOO}
+POI_BITS = {0: 0, 3: FALSE_POI, 4: VICTIM}
+
+# Tablas de 256 entradas: valor de cada capa para cada byte posible del tablero.
+# Indexar una tabla con el tablero completo reconstruye la capa en una sola operación.
+THREAT_LAYER = np.array([2 if cell & GOO else 1 if cell & DROPLET else 0 for cell in range(256)], dtype=np.int8)
+POI_LAYER = np.array([4 if cell & VICTIM else 3 if cell & FALSE_POI else 0 for cell in range(256)], dtype=np.int8)
+EXIT_LAYER = np.array([16 if cell & EXIT else 0 for cell in range(256)], dtype=np.int8)
+
+# Las mismas tablas como listas, para leer una sola celda sin pasar por NumPy.
+THREAT_VALUE = THREAT_LAYER.tolist()
+POI_VALUE = POI_LAYER.tolist()
+
+def clear_bits(cell, bits):
+    """Regresa ``cell`` (un byte del tablero) sin los bits indicados."""
+    return int(cell) & (0xFF ^ bits)
+
+# -----------------------------------------------------------------------------------------------------------
+# CONJUNTOS DE CELDAS
+# -----------------------------------------------------------------------------------------------------------
+
+class CellSet:
+    """
+    Conjunto de celdas con alta, baja y muestreo aleatorio en O(1): las celdas viven en
+    una lista y un diccionario guarda el índice de cada una. Al quitar una celda, la última
+    de la lista ocupa su lugar.
+    """
+
+    def __init__(self, cells=()):
+        self.cells = list(dict.fromkeys(cells))  # Sin duplicados, en el orden dado
+        self.index = {cell: position for position, cell in enumerate(self.cells)}
+
+    def add(self, cell):
+        if cell not in self.index:
+            self.index[cell] = len(self.cells)
+            self.cells.append(cell)
+
+    def discard(self, cell):
+        position = self.index.pop(cell, None)
+        if position is None:
+            return
+        last = self.cells.pop()
+        if position < len(self.cells):
+            self.cells[position] = last
+            self.index[last] = position
+
+    def copy(self):
+        """Copia con el mismo orden interno (el muestreo con la misma semilla da las mismas celdas)."""
+        return CellSet(self.cells)
+
+    def choice(self, rng):
+        """Celda al azar con el generador ``rng`` (por ejemplo ``model.random``); None si está vacío."""
+        if not self.cells:
+            return None
+        return self.cells[rng.randrange(len(self.cells))]
+
+    def __contains__(self, cell):
+        return cell in self.index
+
+    def __len__(self):
+        return len(self.cells)
+
+    def __iter__(self):
+        return iter(self.cells)
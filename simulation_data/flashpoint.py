@@ -11,34 +11,44 @@ Original file is located at
 
 #!pip install mesa==2.3.1 --quiet
 
-# Importamos las clases que se requieren para manejar los agentes (Agent) y su entorno (Model).
-from mesa import Agent, Model
+# Importamos la clase que se requiere para manejar el entorno (Model); los agentes heredan de StoredAgent.
+from mesa import Model
 
 # Usamos ''MultiGrid'' para representar una cuadrícula donde cada celda puede contener como máximo un agente.
 from mesa.space import MultiGrid
 
-# ''DataCollector'' nos permite recolectar y almacenar datos en cada paso de la simulación para su análisis posterior.
-from mesa.datacollection import DataCollector
+# ''TrajectoryRecorder'' recolecta cada paso en buffers de NumPy; los sinks lo guardan en disco.
+from trajectory import TrajectoryRecorder, JsonSink, DeltaJsonSink, BinarySink, StreamingJsonSink, NdjsonSink, SummarySink
+from trajectory import WALL_STATE_CODES, DOOR_STATE_CODES, WALL_STATE_NAMES, DOOR_STATE_NAMES
 
-# Con ''RandomActivation'', activamos a todos los agentes en cada paso.
-from mesa.time import RandomActivation
+# Con ''TurnScheduler'' solo se activa al agente en turno (una acción, un turno o una ronda por paso).
+from scheduler import TurnScheduler, STEP_MODES
 
-# Importamos cityblock para calcular la distancia Manhattan entre dos puntos.
-from scipy.spatial.distance import cityblock
+# ''DistanceField'' calcula distancias en AP hacia POIs y salidas considerando puertas y paredes.
+from pathfinding import DistanceField
 
-# Usamos matplotlib para generar animaciones y visualizar el progreso de la simulación en cada paso.
-# %matplotlib inline
-import matplotlib
-import matplotlib.pyplot as plt
-import matplotlib.animation as animation
-from matplotlib.colors import ListedColormap
-plt.rcParams["animation.html"] = "jshtml"
-matplotlib.rcParams['animation.embed_limit'] = 2**128
+# ''PhaseProfiler'' mide tiempo, llamadas y memoria por fase de step() (solo si se pide con --profile).
+from profiling import PhaseProfiler
+
+# ''promote_droplets'' propaga el goo sobre todo el tablero con operaciones de NumPy.
+from goo import promote_droplets
+
+# El estado de cada celda se guarda como bits en un uint8 (goo, droplet, POIs, agentes, salida, nido).
+from board import (GOO, EMPLOYEE, LOOTBUG, EXIT, NEST, THREAT, POI, AGENTS,
+                   THREAT_BITS, POI_BITS, THREAT_LAYER, POI_LAYER, EXIT_LAYER, THREAT_VALUE, POI_VALUE, clear_bits,
+                   CellSet)
+
+# El estado de los agentes vive en arreglos de NumPy; los agentes son vistas sobre ellos.
+from agent_store import AgentStore, StoredAgent, Stored, StoredName, StoredPair
 
 # Importamos los siguientes paquetes para el mejor manejo de valores numéricos.
 import numpy as np
-import pandas as pd
-import random
+
+# ''argparse'' y ''os'' para la línea de comandos y las rutas de los escenarios.
+import argparse
+import os
+import pickle
+from collections import namedtuple
 
 # ''seaborn'' nos permite crear gráficos estadísticos.
 # import seaborn as sns
@@ -47,11 +57,44 @@ import random
 import time
 import datetime
 
+# Códigos de estado por arista (los mismos del formato binario); NO_EDGE = no hay pared/puerta.
+NO_EDGE = -1
+WALL_OKAY, WALL_DAMAGED, WALL_DESTROYED = (WALL_STATE_CODES[name] for name in ("okay", "damaged", "destroyed"))
+DOOR_CLOSED, DOOR_OPEN, DOOR_REMOVED = (DOOR_STATE_CODES[name] for name in ("closed", "open", "removed"))
+
+# Direcciones de Von Neumann en el orden de get_neighborhood: arriba, izquierda, derecha, abajo.
+DIRECTIONS = ((-1, 0), (0, -1), (0, 1), (1, 0))
+
+DIRECTION_INDEX = {direction: index for index, direction in enumerate(DIRECTIONS)}
+
+# Cada cambio del tablero en ModeloEdificio.events es una tupla (kind, where, state):
+# - kind: "threat" (state 0, 1 o 2), "poi" (state 0, 3 o 4), "wall" o "door" (state con el nombre del estado).
+# - where: celda (x, y), o la arista ((x1, y1), (x2, y2)) como en las llaves del JSON.
+
+# Versión del formato de ModeloEdificio.snapshot (cambia si cambian sus llaves).
+SNAPSHOT_VERSION = 1
+
+# Objetivos de EmployeeAgent.goal y de los campos de distancia del modelo.
+GOAL_POI = 1
+GOAL_EXIT = 16
+
 """#EmployeeAgent"""
 
-class EmployeeAgent(Agent):
+class EmployeeAgent(StoredAgent):
     """Clase que representa a un empleado que salva víctimas en el edificio de Lethal Company."""
 
+    grid_value = 6  # Valor del agente en la grid de agentes
+    board_bit = EMPLOYEE  # Bit del agente en ModeloEdificio.board
+
+    # Atributos guardados en model.agent_store (ver agent_store.py).
+    ap = Stored("ap")
+    remaining_AP = Stored("remaining_ap")
+    carrying_victim = Stored("carrying")
+    finished_turn = Stored("finished")
+    goal = Stored("goal", empty=0)
+    extinguished = Stored("extinguished")
+    moved = Stored("moved")
+
     def __init__(self, id, model):
         """
         Inicializa las propiedades del agente.
@@ -62,7 +105,6 @@ class EmployeeAgent(Agent):
         self.ap = 4  # Puntos de acción disponibles
         self.carrying_victim = False  # Estado de transporte de víctima
         self.finished_turn = False  # Estado del turno del agente
-        self.next_cell = None  # Próxima celda a la que se moverá el agente
         self.remaining_AP = 0 # Puntos de acción restantes
 
     def step(self):
@@ -97,7 +139,7 @@ class EmployeeAgent(Agent):
 
         if not self.finished_turn:
             # Si hay goo o droplets en la celda actual, lo extingue.
-            if self.model.threat_markers[self.pos] in [1, 2]:
+            if self.model.board[self.pos] & THREAT:
                 self.extinguish()
 
             else:
@@ -116,7 +158,7 @@ class EmployeeAgent(Agent):
                 for valid_neighbor_pos in valid_neighbors:
                     x, y = valid_neighbor_pos
                     # Si encuentra goo o droplets en la celda vecina, lo extingue.
-                    if self.model.threat_markers[(x, y)] in [1, 2]:
+                    if self.model.board[x, y] & THREAT:
                         self.extinguish((x, y))
                         self.extinguished = True
                         break
@@ -125,7 +167,7 @@ class EmployeeAgent(Agent):
                 if not self.extinguished:
 
                     # Si lleva una víctima, busca la salida más cercana; de lo contrario, busca una víctima.
-                    self.goal = 16 if self.carrying_victim else 1
+                    self.goal = GOAL_EXIT if self.carrying_victim else GOAL_POI
                     goal_position = self.search_goal_position(self.goal)
 
                     if goal_position:
@@ -147,8 +189,8 @@ class EmployeeAgent(Agent):
         valid_neighbors = [pos for pos in valid_neighbors if pos != (0, 0)]
 
         if valid_neighbors:
-            # Selecciona un vecino aleatorio.
-            target_position = random.choice(valid_neighbors)
+            # Selecciona un vecino aleatorio con el generador del modelo (reproducible con la semilla).
+            target_position = self.random.choice(valid_neighbors)
 
             self.move_agent_to(target_position)  # Mueve al agente a la posición seleccionada.
 
@@ -160,32 +202,10 @@ class EmployeeAgent(Agent):
         """
         Busca vecinos válidos donde no haya paredes o puertas que impidan adyacencias.
         """
-        # Lista para almacenar los vecinos válidos.
-        valid_neighbors = []
-
-        # Obtiene las posiciones vecinas.
-        neighbor_positions = self.model.grid.get_neighborhood(self.pos, moore=False, include_center=False)
-
-        for neighbor_pos in neighbor_positions:
-            x, y = neighbor_pos
-
-            # Verificar si hay una puerta cerrada entre la celda actual y la vecina.
-            current_pos = self.pos
-            door = tuple(sorted([current_pos, neighbor_pos]))
-            if door in self.model.door_states and self.model.door_states[door] == "closed":
-                continue  # Puerta cerrada, no es vecino válido.
-
-            # Verifica si hay una pared entre la celda actual y la vecina.
-            wall = tuple(sorted([current_pos, neighbor_pos]))
-            if wall in self.model.wall_states:
-                wall_state = self.model.wall_states[wall]
-                if wall_state in ["okay", "damaged"]:
-                    continue  # Hay una pared, no es vecino válido.
-
-            # Si pasa las verificaciones, es un vecino válido.
-            valid_neighbors.append(neighbor_pos)
-
-        return valid_neighbors
+        # Un vecino es válido si la arista que los separa no tiene una puerta cerrada
+        # ni una pared intacta o dañada (ver ModeloEdificio.passable).
+        passable = self.model.passable
+        return [neighbor_pos for neighbor_pos, edge in self.model.neighbor_edges[self.pos] if passable[edge]]
 
     def end_turn(self):
         """
@@ -221,7 +241,7 @@ class EmployeeAgent(Agent):
           return
 
         # Pasa el turno al siguiente agente.
-        self.model.turn += 1
+        self.model.schedule.end_turn()
 
     def extinguish(self, position=None):
         """
@@ -231,13 +251,14 @@ class EmployeeAgent(Agent):
             position = self.pos
 
         # Si es goo, cambia de goo a droplet.
-        if self.model.threat_markers[position] == 2:
-            self.model.threat_markers[position] = 1
+        threat = self.model.threat_at(position)
+        if threat == 2:
+            self.model.set_threat(position, 1)
             self.ap -= 1
 
         # Si es droplet, cambia a vacío.
-        elif self.model.threat_markers[position] == 1:
-            self.model.threat_markers[position] = 0
+        elif threat == 1:
+            self.model.set_threat(position, 0)
             self.model.current_threat_markers -= 1  # Actualizar el contador
             self.ap -= 1
             
@@ -249,7 +270,7 @@ class EmployeeAgent(Agent):
         - Salvar a una víctima.
         - Detectar un punto de interés (POI).
         """
-        if self.carrying_victim and self.model.entry_points_location[self.pos] == 16:
+        if self.carrying_victim and self.model.board[self.pos] & EXIT:
             # Si lleva una víctima y llega a la salida.
             self.model.saved_victims += 1
             self.model.poi_real_victim -= 1
@@ -258,7 +279,7 @@ class EmployeeAgent(Agent):
 
             self.carrying_victim = False
             self.finished_turn = True
-        elif not self.carrying_victim and self.model.poi_placement[self.pos] in [3, 4]:
+        elif not self.carrying_victim and self.model.board[self.pos] & POI:
             # Si encuentra un POI válido.
             self.reveal_poi()
 
@@ -268,74 +289,40 @@ class EmployeeAgent(Agent):
         Si el POI es una falsa alarma, se elimina y se actualizan los contadores correspondientes.
         Si el POI representa a una víctima, el agente la recoge.
         """
-        if self.model.poi_placement[self.pos] == 3:  # Si el POI es una falsa alarma.
-            self.model.poi_placement[self.pos] = 0  # Elimina el POI de la celda.
+        poi = self.model.poi_at(self.pos)
+        if poi == 3:  # Si el POI es una falsa alarma.
+            self.model.set_poi(self.pos, 0)  # Elimina el POI de la celda.
             self.model.poi_false_alarm -= 1 # Reduce el contador de falsas alarmas.
             self.model.poi_total_count -= 1 # Reduce el total de POIs.
             self.model.poi_in_building -= 1 # Reduce el total de POIs dentro del edificio.
-        elif self.model.poi_placement[self.pos] == 4 and not self.carrying_victim:
+        elif poi == 4 and not self.carrying_victim:
             # Si el POI representa a una víctima y el agente no está transportando una.
             self.carrying_victim = True # El agente recoge a la víctima.
-            self.model.poi_placement[self.pos] = 0
+            self.model.set_poi(self.pos, 0)
 
     def search_goal_position(self, goal):
         """
-        Busca la posición más cercana al objetivo indicado:
+        Busca la posición más cercana al objetivo indicado, en AP y no en línea recta:
         - goal = 1: Busca un POI (valores 3 o 4) más cercano.
         - goal = 16: Busca la salida más cercana.
-        - si no hay posición objetivo válida, se mueve aleatoriamente para apaagr fuego.**
-        Retorna la posición objetivo más cercana.
-        """
-
-        # Buscar POIs más cercanos (víctimas o falsas alarmas).
-        if self.goal == 1:
-            min_distance = float("inf")
-            nearest_position = None
-            for x in range(self.model.grid.width):
-                for y in range(self.model.grid.height):
-                    if self.model.poi_placement[(x, y)] in [3, 4]:
-                        # Calcula distancia Manhattan.
-                        distance = cityblock(self.pos, (x, y))
-                        if distance < min_distance:
-                            min_distance = distance
-                            nearest_position = (x, y)
-
-        # Buscar la salida más cercana
-        if self.goal == 16:
-            min_distance = float("inf")
-            nearest_position = None
-            for x in range(self.model.grid.width):
-                for y in range(self.model.grid.height):
-                    if self.model.entry_points_location[(x, y)] == goal:
-                        # Calcula distancia Manhattan.
-                        distance = cityblock(self.pos, (x, y))
-                        if distance < min_distance:
-                            min_distance = distance
-                            nearest_position = (x, y)
-        return nearest_position
+        Retorna la posición objetivo más cercana, o None si ninguna es alcanzable
+        (entonces el agente se mueve aleatoriamente).
+        """
+        return self.model.distance_field(goal, self.carrying_victim).target_of(self.pos)
 
     def go_to_goal_position(self, goal_position):
         """
-        Mueve al agente hacia la posición objetivo especificada.
-        Considera paredes y puertas como posibles obstáculos.
-        """
-        goal_x, goal_y = goal_position
-        current_x, current_y = self.pos
-
-        # Determina la dirección del movimiento hacia el objetivo.
-        if current_x < goal_x:
-            new_pos = (current_x + 1, current_y)
-        elif current_x > goal_x:
-            new_pos = (current_x - 1, current_y)
-        elif current_y < goal_y:
-            new_pos = (current_x, current_y + 1)
-        elif current_y > goal_y:
-            new_pos = (current_x, current_y - 1)
-        else:
+        Avanza un paso hacia la posición objetivo siguiendo el camino más barato en AP.
+        Las puertas y paredes del camino se abren o dañan en move_to_new_position.
+        """
+        if self.pos == goal_position:
             # Si ya está en la posición objetivo, marca el turno como finalizado.
             self.finished_turn = True
             return
 
+        # Siguiente celda del camino según el campo de distancia del objetivo.
+        new_pos = self.model.distance_field(self.goal, self.carrying_victim).next_step(self.pos)
+
         # Intenta moverse hacia la nueva posición verificando obstáculos.
         self.move_to_new_position(new_pos)
 
@@ -344,32 +331,27 @@ class EmployeeAgent(Agent):
         Intenta mover al agente a la nueva posición indicada.
         Considera si hay puertas o paredes entre la celda actual y la nueva posición.
         """
-        current_x, current_y = self.pos
-        new_x, new_y = new_position
+        # Arista entre la posición actual y la nueva posición.
+        edge = self.model.edge_between(self.pos, new_position)
+        door_state = self.model.door_code[edge] if edge != NO_EDGE else NO_EDGE
 
         # Verificar si hay una puerta entre la posición actual y la nueva posición.
-        door = tuple(sorted([(current_x, current_y), (new_x, new_y)]))
-        has_door = door in self.model.door_states
-
-        if has_door:
-            door_state = self.model.door_states[door]
-            if door_state == "closed":
+        if door_state != NO_EDGE:
+            if door_state == DOOR_CLOSED:
                 # Si la puerta está cerrada, intenta abrirla.
                 if self.ap >= 1:
-                    self.open_door(door)
+                    self.open_door(edge)
                 else:
                     self.finished_turn = True
-            elif door_state == "open" or door_state == "removed":
-                # Si la puerta está abierta, se mueve a través de ella.
+            else:
+                # Si la puerta está abierta o removida, se mueve a través de ella.
                 self.move_agent_to(new_position)
         else:
             # Verifica si hay una pared entre la celda actual y la nueva posición.
-            wall = tuple(sorted([(current_x, current_y), (new_x, new_y)]))
-            has_wall = wall in self.model.wall_states
+            wall_state = self.model.wall_code[edge] if edge != NO_EDGE else NO_EDGE
 
-            if has_wall:
-                wall_state = self.model.wall_states[wall]
-                if wall_state == "destroyed":
+            if wall_state != NO_EDGE:
+                if wall_state == WALL_DESTROYED:
                     # Si la pared está destruida, se mueve a través de ella.
                     self.move_agent_to(new_position)
                 else:
@@ -379,54 +361,36 @@ class EmployeeAgent(Agent):
                         self.move_random()
                         return
                     elif self.ap >= 2:
-                        self.damage_wall(wall)
+                        self.damage_wall(edge)
                     else:
                         self.finished_turn = True
             else:
                 # Si no hay paredes ni puertas, se mueve directamente.
                 self.move_agent_to(new_position)
 
-    def open_door(self, door):
+    def open_door(self, edge):
         """
         Abre una puerta cerrada entre dos celdas.
+        - edge: Id de la arista de la puerta (ver ModeloEdificio.edge_between).
         - Actualiza el estado de la puerta a "open".
         - Reduce los puntos de acción (AP) del agente en 1.
         """
-        self.model.door_states[door] = "open"
+        self.model.set_door_state(edge, DOOR_OPEN)
         self.ap -= 1
 
-    def damage_wall(self, wall_position):
+    def damage_wall(self, edge):
         """
-        Daña o destruye una pared en la posición especificada.
+        Daña o destruye la pared de la arista especificada.
         - Si la pared está en estado "okay", la daña.
         - Si la pared ya está dañada, la destruye.
         - Actualiza los contadores y el estado de las paredes.
         """
 
-        # Obtener el estado actual de la pared
-        wall_state = self.model.wall_states[wall_position]
-
-        if wall_state == "okay":
-            # Si la pared está intacta, se daña.
-            self.model.wall_states[wall_position] = "damaged"
-            self.ap -= 2
-            self.model.damage_counter -= 1
-            
-        elif wall_state == "damaged":
-            # Si la pared ya está dañada, se destruye.
-            self.model.wall_states[wall_position] = "destroyed"
-            self.ap -= 2
-            self.model.damage_counter -= 1
-            
-            # Determinar qué pared fue destruida.
-            (pos1, pos2) = wall_position
-            x1, y1 = pos1
-            x2, y2 = pos2
-
-            # Actualiza la matriz de paredes para reflejar el estado destruido.
-            self.model.update_wall_matrix(wall_position, "destroyed")
-
         # Si la pared ya está destruida, no realiza ninguna acción.
+        wall_state = self.model.wall_code[edge]
+        if wall_state == WALL_OKAY or wall_state == WALL_DAMAGED:
+            self.model.damage_wall(edge)
+            self.ap -= 2
 
     def move_agent_to(self, new_position):
         """
@@ -444,7 +408,7 @@ class EmployeeAgent(Agent):
         if (0 <= new_position[0] < self.model.grid.width and
             0 <= new_position[1] < self.model.grid.height):
             # Mueve al agente a la nueva posición.
-            self.model.grid.move_agent(self, new_position)
+            self.model.move_agent(self, new_position)
 
             # Reduce los puntos de acción (AP) según el estado del agente.
             if not self.carrying_victim:
@@ -460,49 +424,41 @@ class EmployeeAgent(Agent):
 
     def knocked_down(self):
         """Revisar si algún empleado o víctima resultó herido al estar en una celda con goo."""
-        # Iterar sobre los agentes en el modelo
-        for agent in self.model.schedule.agents:
-            # Verificar si el agente es un EmployeeAgent
-            if isinstance(agent, EmployeeAgent):
-                x, y = agent.pos  # Obtener la posición del empleado
-                # Verificar si la celda contiene goo
-                if self.model.threat_markers[x, y] == 2:
-                    # Manejar el efecto de goo sobre el empleado
-                    # Si el agente lleva una víctima, se pierde
-                    if agent.carrying_victim:
-                        self.model.poi_total_count -= 1
-                        self.model.poi_real_victim -= 1
-                        agent.carrying_victim = False
-                        self.model.lost_victims += 1
-
-                    # Terminar el turno del agente
-                    agent.finished_turn = True
-
-                    # Eliminar al agente del grid
-                    self.model.grid.remove_agent(agent)
-
-                    # Elegir un punto de entrada aleatorio
-                    random_entry_point = self.random.choice(self.model.entry_points)
-
-                    # Colocar al agente en el punto de entrada
-                    self.model.grid.place_agent(agent, random_entry_point)
-                    agent.pos = random_entry_point  # Actualizar posición del agente
+        # Empleados sobre goo, en orden de turno (una sola consulta sobre el almacén de agentes)
+        store = self.model.agent_store
+        for index in store.on_bits(self.model.board, EMPLOYEE, GOO):
+            agent = store.agents[index]
+            # Manejar el efecto de goo sobre el empleado
+            # Si el agente lleva una víctima, se pierde
+            if agent.carrying_victim:
+                self.model.poi_total_count -= 1
+                self.model.poi_real_victim -= 1
+                agent.carrying_victim = False
+                self.model.lost_victims += 1
+
+            # Terminar el turno del agente
+            agent.finished_turn = True
+
+            # Elegir un punto de entrada aleatorio
+            random_entry_point = self.random.choice(self.model.entry_points)
+
+            # Mover al agente al punto de entrada
+            self.model.move_agent(agent, random_entry_point)
                     
-        # Revisar si hay POIs en celdas con goo
-        for x in range(self.model.height):
-            for y in range(self.model.width):
-                # Si la celda contiene goo y un POI
-                if self.model.threat_markers[x, y] == 2 and self.model.poi_placement[x, y] in [3, 4]:
-                    poi_type = self.model.poi_placement[x, y]
-                    self.model.poi_placement[x, y] = 0  # Eliminar el POI del grid
-                    self.model.poi_total_count -= 1
-                    self.model.poi_in_building -= 1
-
-                    if poi_type == 4:  # Si era una víctima
-                        self.model.poi_real_victim -= 1
-                        self.model.lost_victims += 1
-                    elif poi_type == 3:  # Si era una falsa alarma
-                        self.model.poi_false_alarm -= 1
+        # Revisar si hay POIs en celdas con goo (solo se recorren las celdas con POI, por filas)
+        board = self.model.board
+        burned = sorted(pos for pos in self.model.poi_cells if board[pos] & GOO)
+        for x, y in burned:
+            poi_type = self.model.poi_at((x, y))
+            self.model.set_poi((x, y), 0)  # Eliminar el POI del grid
+            self.model.poi_total_count -= 1
+            self.model.poi_in_building -= 1
+
+            if poi_type == 4:  # Si era una víctima
+                self.model.poi_real_victim -= 1
+                self.model.lost_victims += 1
+            elif poi_type == 3:  # Si era una falsa alarma
+                self.model.poi_false_alarm -= 1
 
     def check_if_turn_finished(self):
         """
@@ -515,8 +471,17 @@ class EmployeeAgent(Agent):
 
 """# LootBugAgent"""
 
-class LootBugAgent(Agent):
+class LootBugAgent(StoredAgent):
     """Clase que representa a un Lootbug. Este se encarga de mover a los POIs para elevar el juego."""
+
+    grid_value = 7  # Valor del agente en la grid de agentes
+    board_bit = LOOTBUG  # Bit del agente en ModeloEdificio.board
+
+    # Atributos guardados en model.agent_store (ver agent_store.py).
+    state = StoredName("state", ("capturar_poi", "colocar_poi", "volver_origen"))
+    poi_cargado = Stored("cargo", empty=0)
+    target_poi = StoredPair("target_x", "target_y")
+
     def __init__(self, id, model):
         super().__init__(id, model)
         """
@@ -524,13 +489,12 @@ class LootBugAgent(Agent):
         - id: Identificador único del agente.
         - model: Referencia al modelo.
         """
-        self.cargando_poi = False  # Indica si el agente está cargando un POI.
         self.poi_cargado = None  # Almacena el tipo de POI que lleva cargado.
         self.state = "capturar_poi"  # Estado inicial del agente.
 
     def teleport(self, target):
         """Teletransportar al agente a una posición específica."""
-        self.model.grid.move_agent(self, target)
+        self.model.move_agent(self, target)
 
     def step(self):
         """
@@ -549,18 +513,17 @@ class LootBugAgent(Agent):
                 - Encuentra un POI disponible en la cuadrícula.
                 - Se teletransporta al POI y lo recoge.
                 """
-                poi_positions = [(x, y) for x in range(self.model.height) for y in range(self.model.width)
-                                if self.model.poi_placement[x, y] in [3, 4]]
+                target = self.model.poi_cells.choice(self.random)
 
                 # Si hay POIs disponibles.
-                if poi_positions:
-                    self.target_poi = self.random.choice(poi_positions)
+                if target is not None:
+                    self.target_poi = target
                     self.teleport(self.target_poi)
 
                     # Recoger el POI.
                     x, y = self.pos
-                    self.poi_cargado = self.model.poi_placement[x, y]
-                    self.model.poi_placement[x, y] = 0
+                    self.poi_cargado = self.model.poi_at((x, y))
+                    self.model.set_poi((x, y), 0)
                     self.state = "colocar_poi"
                 else:
                     # Finaliza el turno si no hay POIs.
@@ -572,21 +535,19 @@ class LootBugAgent(Agent):
                 - Busca una celda libre y se teletransporta a ella.
                 - Coloca el POI en la nueva posición.
                 """
-                valid_cells = [(x, y) for x in range(self.model.height) for y in range(self.model.width)
-                              if self.model.poi_placement[x, y] == 0  # Celda libre en el grid de POIs
-                              and not self.model.grid.get_cell_list_contents((x, y))]  # Celda libre en el grid de agentes
-                if valid_cells:
+                # Celda aleatoria sin POI y sin agentes
+                new_position = self.model.free_cells.choice(self.random)
+                if new_position is not None:
                     # Si hay celdas válidas.
-                    new_position = self.random.choice(valid_cells) # Selecciona una celda aleatoria.
                     nx, ny = new_position
 
                     # Verifica si la celda seleccionada contiene marcadores de amenaza y los elimina.
-                    if self.model.threat_markers[nx, ny] in [2, 1]:
-                      self.model.threat_markers[nx, ny] = 0
+                    if self.model.board[nx, ny] & THREAT:
+                      self.model.set_threat((nx, ny), 0)
                       self.model.current_threat_markers -= 1  # Actualizar el contador
 
                     self.teleport(new_position)  # Se teletransporta a la celda seleccionada.
-                    self.model.poi_placement[nx][ny] = self.poi_cargado # Deja el POI.
+                    self.model.set_poi((nx, ny), self.poi_cargado) # Deja el POI.
                     self.poi_cargado = None # Vacía su carga de POI.
                     self.state = "volver_origen" # Cambia al estado para regresar al origen.
 
@@ -602,120 +563,48 @@ class LootBugAgent(Agent):
 
     def end_turn(self):
         """
-        Finaliza el turno del LootBug.
-        - Incrementa el turno del modelo.
-        - Si supera el total de agentes, reinicia el contador de turnos.
+        Finaliza el turno del LootBug; el schedule pasa al siguiente agente
+        (y, si era el último, reinicia la ronda).
         """
-        self.model.turn += 1
-        if self.model.turn >= len(self.model.schedule.agents):
-            # Reinicia el turno si sobrepasa el total
-            self.model.turn = 0
-
-"""# Grid 1 - Puertas y puntos de entrada"""
-
-def get_grid_doors_entries(model):
-    """Crea una representación de las puertas y puntos de entrada del edificio."""
-    # Copiar la matriz base (puertas) para superponer información adicional
-    combined_grid = np.copy(model.doors)
-
-    # Superponer los puntos de entrada en la matriz combinada
-    for x, y in model.entry_points:
-        combined_grid[x, y] = max(combined_grid[x, y], 16)
-
-    # Superponer el lootbug nest en la matriz combinada
-    if hasattr(model, "lootbug_nest"):  # Verifica que el atributo lootbug_nest exista
-        nest_x, nest_y = model.lootbug_nest
-        combined_grid[nest_x, nest_y] = max(combined_grid[nest_x, nest_y], 32)  # Usamos 32 para lootbug nest
+        self.model.schedule.end_turn()
 
+"""#Model"""
 
-
-    return combined_grid
-
-"""# Grid 2 - Paredes"""
-
-def get_grid_walls(model):
-    """Crea una representación de las paredes del edificio."""
-    grid = model.walls.copy()
-
-    return grid
-
-"""#Grid 3 - POI"""
-
-def get_grid_poi(model):
-    """Crea una representación de los POI en el edificio."""
-    grid = model.poi_placement.copy()
-
-    return grid
-
-"""#Grid 4 - Threatmarkers
-
-
-
-"""
-
-def get_grid_threat_markers(model):
-    """Crea una representación de los threath markers en el edificio."""
-    grid = model.threat_markers.copy()
-
-    return grid
-
-"""#Grid 5 - Agents"""
-
-def get_grid(model):
-    """Crea una representación de los agentes en el edificio."""
-    grid = np.zeros((model.grid.width, model.grid.height))
-
-    # Iterar sobre todas las celdas del grid
-    for content, (x, y) in model.grid.coord_iter():
-        for agent in content:
-            if isinstance(agent, EmployeeAgent):
-                grid[x][y] = 6  # Representar el agente con el valor 6
-            if isinstance(agent, LootBugAgent):
-                grid[x][y] = 7  # Representar el agente con el valor 7
-
-
-    return grid
-
-def get_agents_positions(model):
+def spawn_seeds(seed, count):
     """
-    Devuelve un diccionario con las posiciones, el valor correspondiente (6 o 7) en la grid,
-    y el estado de transporte de víctimas para cada agente.
+    Genera ``count`` semillas hijas independientes a partir de ``seed`` con SeedSequence,
+    para repartir corridas paralelas sin que sus flujos aleatorios se traslapen.
     """
-    agents_info = []  # Lista para almacenar la información de los agentes
-
-    # Iterar sobre todos los agentes en el modelo
-    for agent in model.schedule.agents:
-        if isinstance(agent, EmployeeAgent) or isinstance(agent, LootBugAgent):  # Verificar tipo de agente
-            # Obtener el valor correspondiente (6 para EmployeeAgent, 7 para LootBugAgent)
-            agent_value = 6 if isinstance(agent, EmployeeAgent) else 7
-            
-            # Crear el diccionario con la información del agente
-            agent_data = {
-                "position": agent.pos,  # Obtener la posición directamente
-                "value": agent_value,  # Valor en la grid (6 o 7)
-                "carrying_victim": getattr(agent, "carrying_victim", False),  # Estado de transporte
-            }
-            agents_info.append(agent_data)  # Agregar la información del agente a la lista
-
-    return agents_info
-
-
-"""#Model"""
+    children = np.random.SeedSequence(seed).spawn(count)
+    return [int(child.generate_state(1, dtype=np.uint64)[0]) for child in children]
 
 class ModeloEdificio(Model):
     """Modelo del edificio Lethal company."""
-    def __init__(self, wall_data, poi_data, goo_data, doors_data, entry_points_data):
+    def __init__(self, wall_data, poi_data, goo_data, doors_data, entry_points_data, seed=None, record_trajectory=True,
+                 step_mode="action"):
+        """
+        - seed: Semilla del generador aleatorio del modelo (Mesa la toma en Model.__new__).
+          El orden de los turnos es fijo (ver scheduler.py); lo aleatorio (spawns de POIs,
+          dados del goo, puntos de entrada y movimientos al azar de empleados y LootBug)
+          usa ``self.random``, así que la misma semilla reproduce la partida.
+        - record_trajectory: Si es False no se recolectan pasos (solo importan los contadores finales).
+        - step_mode: Qué avanza cada step(): "action" (una acción del agente en turno), "turn"
+          (el turno completo) o "round" (una ronda de todos los agentes). Ver scheduler.py.
+        """
         super().__init__()
 
+        # Semilla efectiva (Mesa elige una al azar si no se dio)
+        self.seed = self._seed
+
         # Agentes
-        self.turn = 0
         self.employee_agents = 6
         self.lootbug_agents = 1
-        self.schedule = RandomActivation(self)
+        self.schedule = TurnScheduler(self, step_mode)
+        self.agent_store = AgentStore(self.employee_agents + self.lootbug_agents)
 
-        # Dimensiones del modelo
-        self.height = 6
-        self.width = 8
+        # Dimensiones del modelo (las da la matriz de paredes del escenario)
+        self.height = len(wall_data)
+        self.width = len(wall_data[0])
 
         # Grid del modelo
         self.grid = MultiGrid(self.height, self.width, torus=False)
@@ -738,29 +627,39 @@ class ModeloEdificio(Model):
         self.collapsed_building = False
         self.lootbug_nest = (0,0)
 
+        # Cambios del tablero (kind, where, state) del último paso; step() lo reinicia.
+        self.events = []
+
         # Diccionario para rastrear estados de POIs ('closes' o 'open').
         self.poi_states = {}
 
-        # Diccionario para rastrear estados de puertas.
-        # Tuplas de posiciones adyacentes, y los valores son 'closed' o 'open'.
-        self.door_states = {}
+        # Índice de aristas entre celdas vecinas con los estados de puertas y paredes
+        # como códigos en arreglos de NumPy (wall_states/door_states son vistas derivadas).
+        self.build_edge_index()
+
+        # Campos de distancia en caché por (objetivo, lleva víctima); se actualizan cuando
+        # cambian puertas, paredes o POIs (ver distance_field).
+        self.distance_fields = {}
+        self.distance_fields_breakable = True
 
-        # Diccionario para rastrear estados de paredes.
-        # Clave: ((x1, y1), (x2, y2)), Valor: "okay", "damaged", "destroyed".
-        self.wall_states = {}
+        # Tablero por bits: un uint8 por celda con goo, droplet, POIs, agentes, salida y nido
+        # (ver board.py). threat_markers, poi_placement y entry_points_location son vistas
+        # derivadas; una foto completa del tablero es board.copy() o board.tobytes().
+        self.board = np.zeros((self.height, self.width), dtype=np.uint8)
+        self.board[self.lootbug_nest] |= NEST
 
-        # Matrices para representar el estado del edificio.
-        self.entry_points_location = np.zeros((self.height, self.width))
+        # Índices de celdas que se mantienen al cambiar los bits de POIs y agentes (ver index_cell):
+        # celdas con POI, celdas sin POI y celdas sin POI ni agentes.
+        cells = [(x, y) for x in range(self.height) for y in range(self.width)]
+        self.poi_cells = CellSet()
+        self.poi_free_cells = CellSet(cells)
+        self.free_cells = CellSet(cells)
 
         # Paredes: cada celda contiene un entero donde cada bit representa una dirección:
         # Bit 0: Arriba, Bit 1: Derecha, Bit 2: Abajo, Bit 3: Izquierda
         self.walls = np.zeros((self.height, self.width), dtype=int)
         self.doors = np.zeros((self.height, self.width), dtype=int)
 
-        # Matrices para objetos
-        self.threat_markers = np.zeros((self.height, self.width)) # goo y droplets
-        self.poi_placement = np.zeros((self.height, self.width)) # POIs
-
         # Colocar elementos iniciales
         self.place_walls(wall_data)    # Colocar paredes
         self.place_poi(poi_data)      # Colocar los POIs respetando el número por tipo
@@ -772,23 +671,371 @@ class ModeloEdificio(Model):
         self.place_employees()
         self.place_lootbug()
 
-        # Inicializar recolector de datos
-        self.datacollector = DataCollector(
-            model_reporters={
-                "Grid 1 Puertas y salidas": get_grid_doors_entries,
-                "Grid 2 Paredes": get_grid_walls,
-                "Grid 3 POI": get_grid_poi,
-                "Grid 4 Threatmarkers": get_grid_threat_markers,
-                "Grid 5 Agents": get_grid,
-                "Agentes": get_agents_positions,
-                "Estados Paredes": lambda model: model.wall_states,
-                "Estados Puertas": lambda model: model.door_states,
-                "Steps": lambda model: model.steps,
-                "Edificio colapsado": lambda model: model.collapsed_building,
-                "Victimas salvadas": lambda model: model.saved_victims,
-                "Victimas perdidas": lambda model: model.lost_victims,
-            }
-        )
+        # Inicializar recolector de la trayectoria
+        self.recorder = TrajectoryRecorder(self) if record_trajectory else None
+
+    def build_edge_index(self):
+        """
+        Numera cada arista entre dos celdas vecinas (Von Neumann) y prepara sus arreglos de estado.
+        - Aristas entre filas ((x, y), (x + 1, y)): id = x * width + y.
+        - Aristas entre columnas ((x, y), (x, y + 1)): id = row_edges + x * (width - 1) + y.
+        """
+        self.row_edges = (self.height - 1) * self.width
+        self.edge_count = self.row_edges + self.height * (self.width - 1)
+
+        # Celdas de cada arista como tupla ordenada ((x1, y1), (x2, y2)), igual que las llaves del JSON.
+        self.edge_cells = [None] * self.edge_count
+        for x in range(self.height):
+            for y in range(self.width):
+                if x < self.height - 1:
+                    self.edge_cells[x * self.width + y] = ((x, y), (x + 1, y))
+                if y < self.width - 1:
+                    self.edge_cells[self.row_edges + x * (self.width - 1) + y] = ((x, y), (x, y + 1))
+
+        # Estados por arista (NO_EDGE si no hay pared/puerta) y si un agente puede cruzarla.
+        self.wall_code = np.full(self.edge_count, NO_EDGE, dtype=np.int8)
+        self.door_code = np.full(self.edge_count, NO_EDGE, dtype=np.int8)
+        self.passable = np.ones(self.edge_count, dtype=bool)
+
+        # Aristas con pared/puerta en el orden en que se colocaron (orden de la exportación).
+        self.wall_edges = []
+        self.door_edges = []
+
+        # Vecinos de cada celda, en el orden de get_neighborhood, con la arista que los separa.
+        self.neighbor_edges = {}
+        for x in range(self.height):
+            for y in range(self.width):
+                neighbors = self.grid.get_neighborhood((x, y), moore=False, include_center=False)
+                self.neighbor_edges[(x, y)] = [(pos, self.edge_between((x, y), pos)) for pos in neighbors]
+
+        # Vecina y arista en cada una de DIRECTIONS (None fuera del grid), para resolve_blast.
+        self.direction_edges = {}
+        for (x, y), neighbors in self.neighbor_edges.items():
+            steps = [None] * len(DIRECTIONS)
+            for (nx, ny), edge in neighbors:
+                steps[DIRECTION_INDEX[(nx - x, ny - y)]] = ((nx, ny), edge)
+            self.direction_edges[(x, y)] = tuple(steps)
+
+    def edge_between(self, pos1, pos2):
+        """Regresa el id de la arista entre dos celdas, o NO_EDGE si no son vecinas."""
+        (x1, y1), (x2, y2) = (pos1, pos2) if pos1 <= pos2 else (pos2, pos1)
+        if y1 == y2 and x2 == x1 + 1 and 0 <= x1 < self.height - 1 and 0 <= y1 < self.width:
+            return x1 * self.width + y1
+        if x1 == x2 and y2 == y1 + 1 and 0 <= x1 < self.height and 0 <= y1 < self.width - 1:
+            return self.row_edges + x1 * (self.width - 1) + y1
+        return NO_EDGE
+
+    def update_passable(self, edge):
+        """Se puede cruzar si no hay puerta cerrada ni pared intacta o dañada."""
+        wall_state = self.wall_code[edge]
+        self.passable[edge] = self.door_code[edge] != DOOR_CLOSED and (wall_state == NO_EDGE or wall_state == WALL_DESTROYED)
+
+    def set_wall_state(self, edge, state):
+        """Cambia el código de estado de la pared de una arista (y la matriz walls si se destruye)."""
+        self.wall_code[edge] = state
+        self.update_passable(edge)
+        self.update_distance_fields(edge)
+        self.events.append(("wall", self.edge_cells[edge], WALL_STATE_NAMES[state]))
+        if state == WALL_DESTROYED:
+            self.update_wall_matrix(self.edge_cells[edge], "destroyed")
+
+    def set_door_state(self, edge, state):
+        """Cambia el código de estado de la puerta de una arista (y la matriz doors si se quita)."""
+        self.door_code[edge] = state
+        self.update_passable(edge)
+        self.update_distance_fields(edge)
+        self.events.append(("door", self.edge_cells[edge], DOOR_STATE_NAMES[state]))
+        if state == DOOR_REMOVED:
+            self.update_door_matrix(self.edge_cells[edge], "removed")
+
+    def damage_wall(self, edge):
+        """Un daño a una pared intacta (queda dañada) o dañada (queda destruida); resta un damage_counter."""
+        self.set_wall_state(edge, WALL_DAMAGED if self.wall_code[edge] == WALL_OKAY else WALL_DESTROYED)
+        self.damage_counter -= 1
+
+    def update_distance_fields(self, edge):
+        """
+        Actualiza los campos de distancia en caché después de cambiar una arista.
+        Si la arista se abarató (puerta abierta, pared dañada) el campo se corrige localmente;
+        si se encareció, se descarta y se recalcula cuando se vuelva a pedir.
+        """
+        cell_a, cell_b = self.edge_cells[edge]
+        for key, field in list(self.distance_fields.items()):
+            cost = self.crossing_costs(key[1], [edge])[0]
+            if cost < field.costs[edge]:
+                field.lower_edge(edge, cell_a, cell_b, cost)
+            elif cost > field.costs[edge]:
+                del self.distance_fields[key]
+
+    @property
+    def turn(self):
+        """unique_id del agente en turno (los agentes se agregan al schedule en orden de unique_id)."""
+        return self.schedule.turn
+
+    @property
+    def threat_markers(self):
+        """Vista (H, W) de solo lectura: 0 vacío, 1 droplet, 2 goo."""
+        return THREAT_LAYER[self.board]
+
+    @property
+    def poi_placement(self):
+        """Vista (H, W) de solo lectura: 0 vacío, 3 falsa alarma, 4 víctima."""
+        return POI_LAYER[self.board]
+
+    @property
+    def entry_points_location(self):
+        """Vista (H, W) de solo lectura: 16 en los puntos de entrada."""
+        return EXIT_LAYER[self.board]
+
+    def threat_at(self, pos):
+        """Threat marker de una celda: 0 vacío, 1 droplet, 2 goo."""
+        return THREAT_VALUE[self.board[pos]]
+
+    def set_threat(self, pos, value):
+        """Cambia el threat marker de una celda (0 vacío, 1 droplet, 2 goo)."""
+        self.board[pos] = clear_bits(self.board[pos], THREAT) | THREAT_BITS[value]
+        self.events.append(("threat", pos, value))
+
+    def poi_at(self, pos):
+        """POI de una celda: 0 vacío, 3 falsa alarma, 4 víctima."""
+        return POI_VALUE[self.board[pos]]
+
+    def place_agent(self, agent, pos):
+        """Coloca un agente en el grid y marca su bit en el tablero."""
+        self.grid.place_agent(agent, pos)
+        self.update_agent_bits(pos)
+
+    def move_agent(self, agent, pos):
+        """Mueve un agente en el grid y actualiza los bits de agentes de ambas celdas."""
+        previous = agent.pos
+        self.grid.move_agent(agent, pos)
+        self.update_agent_bits(previous)
+        self.update_agent_bits(pos)
+
+    def update_agent_bits(self, pos):
+        """Recalcula los bits EMPLOYEE/LOOTBUG de una celda a partir de los agentes que tiene."""
+        bits = 0
+        for agent in self.grid[pos]:
+            bits |= agent.board_bit
+        self.board[pos] = clear_bits(self.board[pos], AGENTS) | bits
+        self.index_cell(pos)
+
+    def index_cell(self, pos):
+        """Actualiza poi_cells, poi_free_cells y free_cells según los bits actuales de la celda."""
+        cell = self.board[pos]
+        if cell & POI:
+            self.poi_cells.add(pos)
+            self.poi_free_cells.discard(pos)
+            self.free_cells.discard(pos)
+        else:
+            self.poi_cells.discard(pos)
+            self.poi_free_cells.add(pos)
+            if cell & AGENTS:
+                self.free_cells.discard(pos)
+            else:
+                self.free_cells.add(pos)
+
+    def set_poi(self, pos, value):
+        """
+        Cambia el POI de una celda y actualiza los campos de distancia hacia POIs:
+        un POI nuevo se agrega como objetivo; si se quita uno, los campos se descartan.
+        """
+        previous = self.poi_at(pos)
+        if previous == value:
+            return
+        self.board[pos] = clear_bits(self.board[pos], POI) | POI_BITS[value]
+        self.index_cell(pos)
+        self.events.append(("poi", pos, value))
+        was_target, is_target = previous in (3, 4), value in (3, 4)
+        if was_target == is_target:
+            return
+        for key in [key for key in self.distance_fields if key[0] == GOAL_POI]:
+            if is_target:
+                self.distance_fields[key].add_target(pos)
+            else:
+                del self.distance_fields[key]
+
+    def crossing_costs(self, carrying=False, edges=slice(None)):
+        """
+        Costo en AP de cruzar cada arista (o solo ``edges``), como lo haría un EmployeeAgent:
+        - Moverse cuesta 1 AP, o 2 si lleva una víctima.
+        - Una puerta cerrada suma 1 AP para abrirla; si hay puerta, se ignora la pared.
+        - Una pared suma 2 AP por cada daño (4 si está intacta, 2 si ya está dañada).
+          Con damage_counter <= 6 los empleados ya no dañan paredes, así que no se puede cruzar.
+        """
+        door_code = self.door_code[edges]
+        wall_code = self.wall_code[edges]
+        costs = np.full(len(door_code), 2.0 if carrying else 1.0)
+        no_door = door_code == NO_EDGE
+        costs[door_code == DOOR_CLOSED] += 1
+        intact = no_door & (wall_code == WALL_OKAY)
+        damaged = no_door & (wall_code == WALL_DAMAGED)
+        if self.damage_counter <= 6:
+            costs[intact | damaged] = np.inf
+        else:
+            costs[intact] += 4
+            costs[damaged] += 2
+        return costs.tolist()
+
+    def distance_field(self, goal, carrying=False):
+        """
+        Regresa el DistanceField hacia todos los POIs (goal = 1) o todas las salidas (goal = 16).
+        Se calcula solo cuando no está en caché; set_wall_state, set_door_state y set_poi lo
+        mantienen al día. Cuando damage_counter llega a 6 las paredes dejan de poder cruzarse
+        y todos los campos se recalculan.
+        """
+        breakable_walls = self.damage_counter > 6
+        if breakable_walls != self.distance_fields_breakable:
+            self.distance_fields.clear()
+            self.distance_fields_breakable = breakable_walls
+
+        key = (goal, carrying)
+        field = self.distance_fields.get(key)
+        if field is None:
+            if goal == GOAL_POI:
+                targets = sorted(self.poi_cells)  # Orden por filas, para desempates estables
+            else:
+                targets = self.entry_points
+            field = DistanceField(self.neighbor_edges, self.crossing_costs(carrying), targets, blocked={self.lootbug_nest})
+            self.distance_fields[key] = field
+        return field
+
+    @property
+    def wall_states(self):
+        """Vista {((x1, y1), (x2, y2)): "okay" | "damaged" | "destroyed"} para la exportación."""
+        return {self.edge_cells[edge]: WALL_STATE_NAMES[self.wall_code[edge]] for edge in self.wall_edges}
+
+    @property
+    def door_states(self):
+        """Vista {((x1, y1), (x2, y2)): "closed" | "open" | "removed"} para la exportación."""
+        return {self.edge_cells[edge]: DOOR_STATE_NAMES[self.door_code[edge]] for edge in self.door_edges}
+
+    @classmethod
+    def from_scenario(cls, scenario, **kwargs):
+        """Crea un modelo a partir de un Scenario (ver load_scenario); kwargs van a __init__."""
+        return cls(*scenario, **kwargs)
+
+    # Atributos escalares, arreglos y conjuntos de celdas que guarda un snapshot.
+    SNAPSHOT_COUNTERS = (
+        "seed", "running", "steps", "current_id", "employee_agents", "lootbug_agents",
+        "max_threat_markers", "current_threat_markers", "poi_total_count", "poi_false_alarm", "poi_real_victim",
+        "poi_in_building", "damage_counter", "door_markers", "start_point", "saved_victims", "lost_victims",
+        "collapsed_building", "distance_fields_breakable",
+    )
+    SNAPSHOT_ARRAYS = ("board", "walls", "doors", "wall_code", "door_code", "passable")
+    SNAPSHOT_CELL_SETS = ("poi_cells", "poi_free_cells", "free_cells")
+
+    def snapshot(self):
+        """
+        Regresa el estado completo del juego como un diccionario independiente del modelo
+        (los arreglos y diccionarios se copian): tableros, estados de paredes y puertas,
+        contadores, agentes y su orden en cada celda, turno del schedule, campos de distancia
+        en caché y estado del generador aleatorio. No incluye la trayectoria recolectada.
+        Con restore (o save_checkpoint/load_checkpoint) la partida sigue exactamente igual.
+        """
+        store = self.agent_store
+        occupied = sorted({agent.pos for agent in store.agents if agent.pos is not None})
+        return {
+            "version": SNAPSHOT_VERSION,
+            "layout": {
+                "height": self.height,
+                "width": self.width,
+                "lootbug_nest": self.lootbug_nest,
+                "entry_points": list(self.entry_points),
+                "wall_edges": list(self.wall_edges),
+                "door_edges": list(self.door_edges),
+            },
+            "counters": {name: getattr(self, name) for name in self.SNAPSHOT_COUNTERS},
+            "arrays": {name: getattr(self, name).copy() for name in self.SNAPSHOT_ARRAYS},
+            "poi_states": dict(self.poi_states),
+            "cell_sets": {name: list(getattr(self, name).cells) for name in self.SNAPSHOT_CELL_SETS},
+            "distance_fields": {key: field.snapshot() for key, field in self.distance_fields.items()},
+            "agents": {
+                "unique_ids": [agent.unique_id for agent in store.agents],
+                "store": store.snapshot(),
+                "turn_order": [agent.index for agent in self.schedule.agents],
+                # Orden de los agentes dentro de cada celda (el grid de agentes muestra el último).
+                "grid": [(pos, [agent.index for agent in self.grid[pos]]) for pos in occupied],
+            },
+            "schedule": self.schedule.snapshot(),
+            "random": self.random.getstate(),
+        }
+
+    @classmethod
+    def restore(cls, snapshot, record_trajectory=False):
+        """
+        Crea un modelo nuevo en el estado de ``snapshot`` (ver snapshot); el snapshot no se
+        modifica, así que puede restaurarse varias veces para ramificar la partida.
+        - record_trajectory: Si es True, el modelo restaurado recolecta pasos desde ese punto.
+        """
+        return cls._from_snapshot(snapshot, record_trajectory)
+
+    def clone(self, record_trajectory=False):
+        """
+        Copia independiente de la partida en su estado actual. Solo comparte con el original
+        el índice de aristas (edge_cells, neighbor_edges), que no cambia durante el juego.
+        """
+        return type(self)._from_snapshot(self.snapshot(), record_trajectory, layout_from=self)
+
+    @classmethod
+    def _from_snapshot(cls, snapshot, record_trajectory=False, layout_from=None):
+        """Construye el modelo de restore/clone sin pasar por __init__ (no coloca nada ni sortea)."""
+        if snapshot.get("version") != SNAPSHOT_VERSION:
+            raise ValueError(f"Versión de snapshot no soportada: {snapshot.get('version')} (se esperaba {SNAPSHOT_VERSION})")
+        counters = snapshot["counters"]
+        model = cls.__new__(cls, seed=counters["seed"])
+        Model.__init__(model)
+
+        # Geometría fija del edificio
+        layout = snapshot["layout"]
+        model.height, model.width = layout["height"], layout["width"]
+        model.lootbug_nest = tuple(layout["lootbug_nest"])
+        model.entry_points = [tuple(pos) for pos in layout["entry_points"]]
+        model.grid = MultiGrid(model.height, model.width, torus=False)
+        if layout_from is None:
+            model.build_edge_index()
+        else:
+            for name in ("row_edges", "edge_count", "edge_cells", "neighbor_edges", "direction_edges"):
+                setattr(model, name, getattr(layout_from, name))
+        model.wall_edges = list(layout["wall_edges"])
+        model.door_edges = list(layout["door_edges"])
+
+        # Estado del juego
+        for name, value in counters.items():
+            setattr(model, name, value)
+        for name, array in snapshot["arrays"].items():
+            setattr(model, name, array.copy())
+        model.poi_states = dict(snapshot["poi_states"])
+        model.events = []
+        for name, cells in snapshot["cell_sets"].items():
+            setattr(model, name, CellSet(cells))
+        model.distance_fields = {
+            key: DistanceField.from_snapshot(model.neighbor_edges, field)
+            for key, field in snapshot["distance_fields"].items()
+        }
+
+        # Agentes: se crean en el orden del almacén y después se cargan sus arreglos
+        agents = snapshot["agents"]
+        store_state = agents["store"]
+        model.agent_store = AgentStore(len(store_state["kind"]))
+        model.schedule = TurnScheduler(model, snapshot["schedule"]["step_mode"])
+        classes = {EmployeeAgent.board_bit: EmployeeAgent, LootBugAgent.board_bit: LootBugAgent}
+        created = [
+            classes[int(kind)](unique_id, model)
+            for unique_id, kind in zip(agents["unique_ids"], store_state["kind"])
+        ]
+        model.agent_store.load_snapshot(store_state)
+        for index in agents["turn_order"]:
+            model.schedule.add(created[index])
+        model.schedule.load_snapshot(snapshot["schedule"])
+        for pos, indices in agents["grid"]:
+            for index in indices:
+                created[index].pos = None  # place_agent vuelve a asignar la misma posición
+                model.grid.place_agent(created[index], tuple(pos))
+
+        model.random.setstate(snapshot["random"])
+        model.recorder = TrajectoryRecorder(model) if record_trajectory else None
+        return model
 
     def place_lootbug(self):
         """Coloca agentes en puntos de entrada seleccionados aleatoriamente."""
@@ -798,7 +1045,7 @@ class ModeloEdificio(Model):
             agent = LootBugAgent(self.employee_agents, self)
 
             # Colocar el agente en el punto de entrada
-            self.grid.place_agent(agent, self.lootbug_nest)
+            self.place_agent(agent, self.lootbug_nest)
 
             # Agregar el agente al schedule
             self.schedule.add(agent)
@@ -813,7 +1060,7 @@ class ModeloEdificio(Model):
             agent = EmployeeAgent(i, self)
 
             # Colocar el agente en el punto de entrada
-            self.grid.place_agent(agent, random_entry_point)
+            self.place_agent(agent, random_entry_point)
 
             # Agregar el agente al schedule
             self.schedule.add(agent)
@@ -828,23 +1075,25 @@ class ModeloEdificio(Model):
                 # Definir las paredes basadas en los bits (arriba, derecha, abajo, izquierda).
                 if wall_value & 8:  # Pared arriba (bit 3)
                     if i > 0:
-                        wall_pos = ((i, j), (i - 1, j))
-                        self.wall_states[tuple(sorted(wall_pos))] = "okay"
+                        self.add_wall(self.edge_between((i, j), (i - 1, j)))
 
                 if wall_value & 4:  # Pared derecha (bit 2)
                     if j < self.width - 1:
-                        wall_pos = ((i, j), (i, j + 1))
-                        self.wall_states[tuple(sorted(wall_pos))] = "okay"
+                        self.add_wall(self.edge_between((i, j), (i, j + 1)))
 
                 if wall_value & 2:  # Pared abajo (bit 1)
                     if i < self.height - 1:
-                        wall_pos = ((i, j), (i + 1, j))
-                        self.wall_states[tuple(sorted(wall_pos))] = "okay"
+                        self.add_wall(self.edge_between((i, j), (i + 1, j)))
 
                 if wall_value & 1:  # Pared izquierda (bit 0)
                     if j > 0:
-                        wall_pos = ((i, j), (i, j - 1))
-                        self.wall_states[tuple(sorted(wall_pos))] = "okay"
+                        self.add_wall(self.edge_between((i, j), (i, j - 1)))
+
+    def add_wall(self, edge):
+        """Registra una pared intacta en la arista (una pared se lee desde las dos celdas)."""
+        if self.wall_code[edge] == NO_EDGE:
+            self.wall_edges.append(edge)
+        self.set_wall_state(edge, WALL_OKAY)
 
     def place_poi(self, poi_data):
         """Coloca POIs en posiciones específicas respetando el número por tipo y actualiza las variables."""
@@ -870,7 +1119,7 @@ class ModeloEdificio(Model):
             if 0 <= adjusted_x < self.height and 0 <= adjusted_y < self.width:
                 # Determinar el valor de POI basado en tipo ('v' -> verdadero, 'f' -> falso).
                 value = 4 if poi_type == 'v' else 3
-                self.poi_placement[adjusted_x][adjusted_y] = value
+                self.set_poi((adjusted_x, adjusted_y), value)
 
                 # Inicializar estado como "cerrado".
                 self.poi_states[(adjusted_x, adjusted_y)] = "closed"
@@ -884,8 +1133,8 @@ class ModeloEdificio(Model):
 
             # Asegúrate de que las posiciones ajustadas estén dentro de los límites.
             if 0 <= adjusted_x < self.height and 0 <= adjusted_y < self.width:
-                if self.threat_markers[adjusted_x][adjusted_y] == 0:  # Solo colocar si la celda está vacía
-                    self.threat_markers[adjusted_x][adjusted_y] = 2  # Representar el goo con un valor de 2
+                if self.threat_at((adjusted_x, adjusted_y)) == 0:  # Solo colocar si la celda está vacía
+                    self.set_threat((adjusted_x, adjusted_y), 2)  # Representar el goo con un valor de 2
                     self.current_threat_markers += 1  # Incrementa el contador de fichas en el tablero
                     
 
@@ -912,13 +1161,15 @@ class ModeloEdificio(Model):
                     self.doors[adjusted_row1, adjusted_col1] |= 2
                     self.doors[adjusted_row2, adjusted_col2] |= 8
 
-                # Crear una tupla de posiciones ordenadas
-                pos1 = (adjusted_row1, adjusted_col1)
-                pos2 = (adjusted_row2, adjusted_col2)
-                door = tuple(sorted([pos1, pos2]))
+                # Arista entre las dos celdas (las puertas solo existen entre celdas vecinas)
+                edge = self.edge_between((adjusted_row1, adjusted_col1), (adjusted_row2, adjusted_col2))
+                if edge == NO_EDGE:
+                    continue
 
                 # Inicializar el estado de la puerta como "closed"
-                self.door_states[door] = "closed"
+                if self.door_code[edge] == NO_EDGE:
+                    self.door_edges.append(edge)
+                self.set_door_state(edge, DOOR_CLOSED)
 
     def place_start_point(self, entry_points_data):
         """Coloca puntos de entrada en posiciones específicas y las guarda en una lista."""
@@ -928,7 +1179,7 @@ class ModeloEdificio(Model):
             adjusted_x, adjusted_y = x - 1, y - 1
             # Asegúrate de que las posiciones ajustadas estén dentro de los límites
             if 0 <= adjusted_x < self.height and 0 <= adjusted_y < self.width:
-                self.entry_points_location[adjusted_x][adjusted_y] = 16  # Representar el punto de entrada con un valor de 16
+                self.board[adjusted_x, adjusted_y] |= EXIT  # Marcar el punto de entrada (16 en entry_points_location)
                 self.entry_points.append((adjusted_x, adjusted_y))  # Agregar punto de entrada a la lista
 
     def replenish_pois(self):
@@ -939,43 +1190,37 @@ class ModeloEdificio(Model):
                 # No quedan más POIs para colocar.
                 break
 
-            # Elegir un espacio aleatorio en el grid
-            x = self.random.randint(0, self.height - 1)
-            y = self.random.randint(0, self.width - 1)
-
-            # Verificar las condiciones para colocar un POI
-            if self.poi_placement[x, y] == 0:
-
-                if self.threat_markers[x, y] in [2, 1]:
-                    self.threat_markers[x, y] = 0
-                    self.current_threat_markers -= 1  # Decrementar el contador de threat markers
-
-                # Elegir el nuevo POI (aleatoriamente entre 3 y 4)
-                poi_types = (
-                    [3] * self.poi_false_alarm +  # POIs falsos
-                    [4] * self.poi_real_victim    # POIs reales
-                )
-
-                # Barajar aleatoriamente los tipos de POIs
-                new_poi = self.random.choice(poi_types)
-
-                # Verificar si hay un agente en la celda
-                cell_agents = self.grid.get_cell_list_contents((x, y))
-                employee_present = any(isinstance(agent, EmployeeAgent) for agent in cell_agents)
-
-                if employee_present:
-                    self.poi_placement[x, y] = new_poi
-                    self.poi_in_building += 1
-                    if new_poi == 3:  # Falsa alarma
-                        self.poi_placement[x, y] = 0
-                        self.poi_false_alarm -= 1
-                        self.poi_total_count -= 1
-                        self.poi_in_building -= 1
-                    # else es 4: Víctima
-                else:
-                    # Colocar el nuevo POI en la celda
-                    self.poi_placement[x, y] = new_poi
-                    self.poi_in_building += 1
+            # Elegir una celda aleatoria sin POI (sin reintentos sobre celdas ocupadas)
+            position = self.poi_free_cells.choice(self.random)
+            if position is None:
+                # No hay dónde colocar otro POI.
+                break
+            x, y = position
+
+            if self.board[x, y] & THREAT:
+                self.set_threat((x, y), 0)
+                self.current_threat_markers -= 1  # Decrementar el contador de threat markers
+
+            # Elegir el nuevo POI (aleatoriamente entre 3 y 4, con el peso de cada contador)
+            pick = self.random.randrange(self.poi_false_alarm + self.poi_real_victim)
+            new_poi = 3 if pick < self.poi_false_alarm else 4
+
+            # Verificar si hay un agente en la celda
+            employee_present = self.board[x, y] & EMPLOYEE
+
+            if employee_present:
+                self.set_poi((x, y), new_poi)
+                self.poi_in_building += 1
+                if new_poi == 3:  # Falsa alarma
+                    self.set_poi((x, y), 0)
+                    self.poi_false_alarm -= 1
+                    self.poi_total_count -= 1
+                    self.poi_in_building -= 1
+                # else es 4: Víctima
+            else:
+                # Colocar el nuevo POI en la celda
+                self.set_poi((x, y), new_poi)
+                self.poi_in_building += 1
 
     def can_place_threat_marker(self):
         """
@@ -1040,187 +1285,109 @@ class ModeloEdificio(Model):
         if not self.can_place_threat_marker():
             return
 
-        # Obtener una lista de todas las posiciones en threat_markers
-        threat_markers_positions = [(x, y) for x in range(self.height) for y in range(self.width)]
-
-        # Elegir una posición aleatoria
-        target_position = self.random.choice(threat_markers_positions)
-        x, y = target_position
+        # Elegir una posición aleatoria (mismo sorteo que random.choice sobre todas las celdas)
+        x, y = divmod(self.random.randrange(self.height * self.width), self.width)
 
         # Verificar si la celda es el lootbug nest (0, 0)
         if (x, y) == (0, 0):
             return
 
         # Verificar si la celda está vacía
-        if self.threat_markers[x, y] == 0:
+        if self.threat_at((x, y)) == 0:
 
-            # Obtener las celdas adyacentes (vecindad de Moore)
-            neighbors = self.grid.get_neighborhood((x, y), moore=True, include_center=False)
-
-            # Verificar si no hay goo en las celdas adyacentes
-            no_goo_nearby = all(
-                self.threat_markers[nx, ny] != 2 for nx, ny in neighbors if 0 <= nx < self.height and 0 <= ny < self.width
-            )
+            # Verificar si no hay goo en las celdas adyacentes (ventana de Moore; la celda misma está vacía)
+            no_goo_nearby = not (self.board[max(x - 1, 0):x + 2, max(y - 1, 0):y + 2] & GOO).any()
 
             if no_goo_nearby:
                 # Colocar droplet en la celda seleccionada
-                self.threat_markers[x, y] = 1
+                self.set_threat((x, y), 1)
                 self.current_threat_markers += 1
             elif not no_goo_nearby:
                 # Colocar goo en la celda seleccionada
-                self.threat_markers[x, y] = 2
+                self.set_threat((x, y), 2)
                 self.current_threat_markers += 1
 
         # Si la celda ya contiene un droplet
-        elif self.threat_markers[x, y] == 1:
-            self.threat_markers[x, y] = 2  # Colocar goo
+        elif self.threat_at((x, y)) == 1:
+            self.set_threat((x, y), 2)  # Colocar goo
 
         # Si la celda ya contiene goo
-        elif self.threat_markers[x, y] == 2:
+        elif self.threat_at((x, y)) == 2:
             self.explosion(x, y)
 
     def explosion(self, x, y):
-        """Genera explosión de goo, afectando celdas adyacentes."""
+        """Genera explosión de goo, afectando celdas adyacentes (ver resolve_blast)."""
 
         # Verificar si quedan threat markers disponibles
         if not self.can_place_threat_marker():
             return
 
-        # Obtener las celdas adyacentes (vecindad de Von Neumann)
-        neighbors = self.grid.get_neighborhood((x, y), moore=False, include_center=False)
-
-        for nx, ny in neighbors:
-            # Verificar si la celda está dentro de los límites
-            if 0 <= nx < self.height and 0 <= ny < self.width:
-
-                # Verificar si es el lootbug nest
-                if (nx, ny) == (0, 0):
-                    continue
-
-                # Eliminar puertas entre la celda actual y la vecina
-                door = tuple(sorted([(x, y), (nx, ny)]))
-                if door in self.door_states:
-                    if self.door_states[door] == "closed":
-                        self.door_states[door] = "removed"
-                        self.update_door_matrix(door, "removed")
-                        continue # Detener la propagación en esta dirección
-                    elif self.door_states[door] == "open":
-                        self.door_states[door] = "removed"
-                        self.update_door_matrix(door, "removed")
-
-                # Identificar y dañar paredes entre la celda actual y la vecina
-                wall = tuple(sorted([(x, y), (nx, ny)]))
-                if wall in self.wall_states:
-                    current_state = self.wall_states[wall]
-                    if current_state == "okay":
-                        self.wall_states[wall] = "damaged"
-                        self.damage_counter -= 1
-                        continue
-                    elif current_state == "damaged":
-                        self.wall_states[wall] = "destroyed"
-                        self.damage_counter -= 1
-
-                        # Actualizar la matriz de paredes para reflejar el estado destruido
-                        self.update_wall_matrix(wall, "destroyed")
-                        continue  # Detener la propagación en esta dirección
-
-
-                # Si la celda contiene goo, comenzar shockwave.
-                if self.threat_markers[nx, ny] == 2:
-                    dx, dy = nx - x, ny - y  # Calcular la dirección
-                    self.shockwave(nx, ny, direction=(dx, dy))
-                    continue
-
-                # Si la celda contiene un droplet, eliminarlo.
-                if self.threat_markers[nx, ny] == 1:
-                    self.threat_markers[nx, ny] = 0
-                    self.current_threat_markers -= 1
-
-                # Si la celda está vacía o contenía un droplet, colocar goo.
-                if self.threat_markers[nx, ny] == 0:
-                    self.threat_markers[nx, ny] = 2
-                    self.current_threat_markers += 1
+        # Una arista por dirección; la pila se resuelve en el orden de get_neighborhood.
+        self.resolve_blast([((x, y), direction, False) for direction in reversed(range(len(DIRECTIONS)))])
 
     def shockwave(self, x, y, direction):
-        """Propaga una onda expansiva desde la celda especificada."""
+        """Propaga una onda expansiva desde la celda especificada en ``direction`` (dx, dy)."""
 
         # Verificar si quedan threat markers disponibles
         if not self.can_place_threat_marker():
             return
 
-        dx, dy = direction
-        current_x, current_y = x, y
-        while True:
-            # Avanzar en la dirección especificada
-            current_x += dx
-            current_y += dy
+        self.resolve_blast([((x, y), DIRECTION_INDEX[direction], True)])
 
-            # Verificar si está fuera de los límites del grid
-            if not (0 <= current_x < self.height and 0 <= current_y < self.width):
-                break
+    def resolve_blast(self, work):
+        """
+        Resuelve una cadena de explosión completa con una pila de trabajo. Cada elemento
+        (celda, dirección, onda) cruza una arista desde ``celda`` en DIRECTIONS[dirección]
+        (ver direction_edges) y se detiene en la primera de:
+        - Fuera del grid o el lootbug nest.
+        - Una puerta cerrada: se quita. Una puerta abierta se quita y se sigue revisando la arista.
+        - Una pared intacta o dañada: recibe un daño.
+        - Una celda con goo: empieza una onda expansiva en la misma dirección (si quedan
+          threat markers) o, si ya era una onda, la onda sigue avanzando.
+        - Un droplet o una celda vacía: se convierte en goo.
+        Es una pila y no una cola para resolver cada onda antes de la siguiente dirección,
+        en el mismo orden (y con los mismos threat markers disponibles) que las llamadas
+        anidadas de explosion y shockwave.
+        """
+        while work:
+            cell, direction, wave = work.pop()
+            step = self.direction_edges[cell][direction]
+            if step is None or step[0] == self.lootbug_nest:
+                continue
+            target, edge = step
+
+            # Puertas entre la celda actual y la siguiente
+            door_state = self.door_code[edge]
+            if door_state == DOOR_CLOSED or door_state == DOOR_OPEN:
+                self.set_door_state(edge, DOOR_REMOVED)
+                if door_state == DOOR_CLOSED:
+                    continue
 
-            # Verificar si es el lootbug nest
-            if (current_x, current_y) == (0, 0):
-                break
+            # Paredes: un daño detiene la propagación
+            wall_state = self.wall_code[edge]
+            if wall_state == WALL_OKAY or wall_state == WALL_DAMAGED:
+                self.damage_wall(edge)
+                continue
 
-            # Verificar si hay una puerta
-            door = tuple(sorted([((current_x - dx), (current_y - dy)), (current_x, current_y)]))
-            if door in self.door_states:
-                if self.door_states[door] == "closed":
-                    self.door_states[door] = "removed"
-                    self.update_door_matrix(door, "removed")
-                    break
-                elif self.door_states[door] == "open":
-                    self.door_states[door] = "removed"
-                    self.update_door_matrix(door, "removed")
-
-            # Verificar si hay una pared y/o puerta
-            wall = tuple(sorted([((current_x - dx), (current_y - dy)), (current_x, current_y)]))
-            if wall in self.wall_states:
-                current_state = self.wall_states[wall]
-                if current_state == "okay":
-                    self.wall_states[wall] = "damaged"
-                    self.damage_counter -= 1
-                    break  # Detener la propagación en esta dirección
-                elif current_state == "damaged":
-                    self.wall_states[wall] = "destroyed"
-                    self.damage_counter -= 1
-                    self.update_wall_matrix(wall, "destroyed")
-                    break  # La onda no puede pasar paredes destruidas
-
-            # Verificar si es una celda con droplets
-            if self.threat_markers[current_x, current_y] == 1:
-                self.threat_markers[current_x, current_y] = 2
-                break
+            threat = self.threat_at(target)
+            if threat == 2:
+                if wave or self.can_place_threat_marker():
+                    work.append((target, direction, True))
+                continue
 
-            # Si la celda está vacía, colocar goo
-            if self.threat_markers[current_x, current_y] == 0:
-                self.threat_markers[current_x, current_y] = 2
+            # Droplet o celda vacía: pasa a goo (solo la celda vacía suma un threat marker)
+            if threat == 0:
                 self.current_threat_markers += 1
-                break
+            self.set_threat(target, 2)
 
     def check_secondary_effects(self):
-        """Revisar los efectos secundarios después del avance de goo."""
-
-        # Iterar por todas las celdas de la cuadrícula
-        for x in range(self.height):
-            for y in range(self.width):
-                # Verificar si la celda contiene un droplet
-                if self.threat_markers[x, y] == 1:
-                    # Obtener las celdas adyacentes (vecindad de Moore)
-                    neighbors = self.grid.get_neighborhood((x, y), moore=True, include_center=False)
-
-                    # Verificar si alguna celda adyacente contiene goo
-                    goo_nearby = any(
-                        self.threat_markers[nx, ny] == 2
-                        for nx, ny in neighbors
-                        if 0 <= nx < self.height and 0 <= ny < self.width
-                    )
-
-                    if goo_nearby:
-                        # Cambiar el droplet por goo
-                        self.threat_markers[x, y] = 0
-                        self.threat_markers[x, y] = 2
+        """
+        Revisar los efectos secundarios después del avance de goo:
+        cada droplet con goo en su vecindad de Moore se convierte en goo (ver goo.promote_droplets).
+        Cada celda convertida queda en events como cualquier otro cambio de threat marker.
+        """
+        for pos in promote_droplets(self.board):
+            self.events.append(("threat", pos, 2))
 
     def end_game(self):
         """Verifica las condiciones de victoria o derrota y detiene la simulación si es necesario."""
@@ -1229,88 +1396,119 @@ class ModeloEdificio(Model):
         if not self.running:
             return
 
-        if self.damage_counter == 0:
+        # Un mismo evento puede restar varios daños o perder varias víctimas entre dos revisiones,
+        # así que los límites se comparan con <= y >= (con == el juego podía no terminar nunca).
+        if self.damage_counter <= 0:
             self.collapsed_building = True
 
-        if self.saved_victims == 7:
+        if self.saved_victims >= 7:
             self.running = False
 
-        elif self.damage_counter == 0 or self.lost_victims == 4:
+        elif self.damage_counter <= 0 or self.lost_victims >= 4:
             self.running = False
 
+    @property
+    def end_reason(self):
+        """Por qué terminó el juego: victory, collapse, victims_lost o unfinished si sigue corriendo."""
+        if self.saved_victims >= 7:
+            return "victory"
+        if self.collapsed_building:
+            return "collapse"
+        if self.lost_victims >= 4:
+            return "victims_lost"
+        return "unfinished"
+
     def step(self):
         """
         Ejecuta un paso en la simulación si esta está en ejecución.
         - Incrementa el contador de pasos.
         - Recolecta datos del estado actual de la simulación.
-        - Avanza el estado de los agentes programados en el modelo.
+        - Activa al agente en turno: una acción, un turno o una ronda según step_mode.
         """
         if self.running:
             self.steps += 1
+            self.events = []
             self.schedule.step()
-            self.datacollector.collect(self)
-
-# Crear el json
-import json
-def convert_keys_to_str(data):
-    """
-    Convierte las claves de un diccionario a cadenas.
-    """
-    if isinstance(data, dict):
-        return {str(key): convert_keys_to_str(value) for key, value in data.items()}
-    elif isinstance(data, list):
-        return [convert_keys_to_str(element) for element in data]
-    else:
-        return data
-
-def run_model_and_save_to_json(steps: int, model_instance, output_file: str):
+            if self.recorder is not None:
+                self.recorder.collect(self)
+
+# Sinks disponibles por modo de salida (ver trajectory.py).
+OUTPUT_SINKS = {
+    "full": lambda output_file, keyframe_interval: JsonSink(output_file),
+    "delta": lambda output_file, keyframe_interval: DeltaJsonSink(output_file, keyframe_interval),
+    "binary": lambda output_file, keyframe_interval: BinarySink(output_file),
+    "stream": lambda output_file, keyframe_interval: StreamingJsonSink(output_file),
+    "ndjson": lambda output_file, keyframe_interval: NdjsonSink(output_file),
+    "summary": lambda output_file, keyframe_interval: SummarySink(output_file),
+}
+
+def run_model_and_save_to_json(steps: int, model_instance, output_file: str, output_mode: str = "full", keyframe_interval: int = 10, sink=None):
     """
-    Ejecuta el modelo y guarda los datos recolectados en un archivo JSON.
+    Ejecuta el modelo hasta que termine el juego (o hasta ``steps`` pasos) y guarda los
+    datos recolectados. El resumen registra el último paso jugado y la razón de fin.
 
     Args:
-        steps (int): Número de pasos para ejecutar el modelo.
+        steps (int): Número máximo de pasos para ejecutar el modelo.
         model_instance: Instancia del modelo.
         output_file (str): Nombre del archivo donde se guardará el JSON.
+        output_mode (str): "full" guarda cada paso completo; "delta" guarda un keyframe
+            cada ``keyframe_interval`` pasos y solo las celdas que cambiaron entre ellos;
+            "binary" guarda un .npz con arreglos por capa (ver BinarySink);
+            "stream" escribe el mismo JSON que "full" paso a paso y "ndjson" un registro
+            por línea; en ambos el recolector no conserva los pasos en memoria durante
+            la corrida (al terminar vuelve a conservarlos y se desconecta del sink).
+            "summary" guarda solo el resumen y no recolecta pasos (ver SummarySink).
+        keyframe_interval (int): Distancia entre keyframes en modo "delta".
+        sink: Sink propio (ver trajectory.TrajectorySink); si se da, ignora output_mode.
     """
-    # Ejecutar el modelo por el número de pasos especificado
-    for step in range(steps):
-        model_instance.step()  # Avanzar un paso en la simulación
-
-    # Obtener los datos recolectados del DataCollector
-    collected_data = model_instance.datacollector.get_model_vars_dataframe()
-
-    # Formatear los datos en una estructura adecuada para JSON
-    json_data = {
-        "simulation_data": [],
-        "summary": {
-            "steps": steps,
+    if sink is None:
+        if output_mode not in OUTPUT_SINKS:
+            raise ValueError(f"Modo de salida desconocido: {output_mode}")
+        sink = OUTPUT_SINKS[output_mode](output_file, keyframe_interval)
+
+    recorder = model_instance.recorder
+    retain = recorder.retain if recorder is not None else True
+    if not sink.collects:
+        # Nadie lee los pasos: se desactiva la recolección para toda la corrida.
+        model_instance.recorder = None
+    elif recorder is None:
+        raise ValueError("El modelo se creó con record_trajectory=False; solo admite output_mode='summary'")
+    elif sink.streaming:
+        # El sink escribe cada paso al recolectarlo (incluidos los ya recolectados).
+        recorder.add_sink(sink)
+        recorder.retain = False
+
+    try:
+        # Ejecutar el modelo hasta que termine el juego o se alcance el número de pasos
+        for step in range(steps):
+            if not model_instance.running:
+                break
+            model_instance.step()  # Avanzar un paso en la simulación
+
+        summary = {
+            "steps": model_instance.steps,
+            "requested_steps": steps,
+            "end_reason": model_instance.end_reason,
+            "seed": model_instance.seed,
             "collapsed_building": model_instance.collapsed_building,
             "saved_victims": model_instance.saved_victims,
             "lost_victims": model_instance.lost_victims,
         }
-    }
 
-    for index, row in collected_data.iterrows():
-        json_data["simulation_data"].append({
-            "step": row["Steps"],
-            "grid_doors_entries": np.array(row["Grid 1 Puertas y salidas"]).tolist(),
-            "grid_walls": np.array(row["Grid 2 Paredes"]).tolist(),
-            "grid_poi": np.array(row["Grid 3 POI"]).tolist(),
-            "grid_threat_markers": np.array(row["Grid 4 Threatmarkers"]).tolist(),
-            "grid_agents": np.array(row["Grid 5 Agents"]).tolist(),
-            "agents_info": convert_keys_to_str(row["Agentes"]),
-            "wall_states": convert_keys_to_str(row["Estados Paredes"]),  # Convertir claves a cadenas
-            "door_states": convert_keys_to_str(row["Estados Puertas"]),  # Convertir claves a cadenas
-            "collapsed_building": row["Edificio colapsado"],
-            "saved_victims": row["Victimas salvadas"],
-            "lost_victims": row["Victimas perdidas"],
-            
-        })
-
-    # Guardar los datos como un archivo JSON
-    with open(output_file, 'w') as outfile:
-        json.dump(json_data, outfile, indent=4)
-    print(f"Datos de simulación guardados en {output_file}.")
+        # Guardar los pasos recolectados con el sink elegido
+        if sink.collects:
+            recorder.save(sink, summary)
+        else:
+            sink.finish(None, summary)
+    finally:
+        # El modelo conserva su recolector como antes de exportar: sin el sink ya terminado
+        # y guardando sus pasos, así que puede seguir corriendo o clonarse igual que otro.
+        model_instance.recorder = recorder
+        if recorder is not None:
+            if sink in recorder.sinks:
+                recorder.sinks.remove(sink)
+            recorder.retain = retain
+    print(f"Datos de simulación guardados en {getattr(sink, 'output_file', output_file)}.")
 
 
 
@@ -1320,45 +1518,159 @@ def run_model_and_save_to_json(steps: int, model_instance, output_file: str):
 # INICIALIZAR
 # -----------------------------------------------------------------------------------------------------------
 
-# Leer el archivo testCase.txt
-with open("testCase.txt") as file:
-    lines = file.readlines()
+# Escenario por defecto, relativo a este archivo para poder correr desde cualquier directorio
+DEFAULT_SCENARIO = os.path.join(os.path.dirname(os.path.abspath(__file__)), "testCase.txt")
+DEFAULT_OUTPUT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "simulation_output.json")
 
-# Procesar las líneas según la cantidad fija de líneas por sección
-# Sección 1: matrix_walls (6 líneas)
-matrix_walls = [line.split() for line in lines[:6]]
+# Extensión de la salida por modo (server.py elige el formato por la extensión); los demás son .json.
+OUTPUT_EXTENSIONS = {"binary": ".npz", "ndjson": ".ndjson"}
 
-# Sección 2: matrix_poi (3 líneas)
-def process_poi_row(row):
-    return [int(item) if item.isdigit() else item for item in row.split()]
+def default_output(output_mode):
+    """Archivo de salida por defecto de un modo: simulation_output con la extensión que espera server.py."""
+    return os.path.splitext(DEFAULT_OUTPUT)[0] + OUTPUT_EXTENSIONS.get(output_mode, ".json")
 
-matrix_poi = [process_poi_row(line) for line in lines[6:9]]
+# Datos iniciales de una partida, en el orden de los argumentos de ModeloEdificio.
+Scenario = namedtuple("Scenario", ["wall_data", "poi_data", "goo_data", "doors_data", "entry_points_data"])
 
-# Sección 3: matrix_goo (10 líneas)
-matrix_goo = [list(map(int, line.split())) for line in lines[9:19]]
-
-# Sección 4: matrix_doors (8 líneas)
-matrix_doors = [list(map(int, line.split())) for line in lines[19:27]]
-
-# Sección 5: matrix_entry_points (4 líneas)
-matrix_entry_points = [list(map(int, line.split())) for line in lines[27:31]]
+def process_poi_row(row):
+    return [int(item) if item.isdigit() else item for item in row.split()]
 
-# Crear una instancia del modelo
-model = ModeloEdificio(matrix_walls, matrix_poi, matrix_goo, matrix_doors, matrix_entry_points)
+# Secciones del formato de escenario con dimensiones, en orden.
+SCENARIO_SECTIONS = ("walls", "pois", "goo", "doors", "entries")
 
+def load_scenario(path=DEFAULT_SCENARIO):
+    """
+    Lee un archivo de escenario y regresa un Scenario.
+    El resultado se puede reutilizar para crear varios modelos con ModeloEdificio.from_scenario.
+
+    Acepta dos formatos:
+    - Con dimensiones (cualquier tamaño): una línea ``size <alto> <ancho>`` y después las
+      secciones ``walls``, ``pois``, ``goo``, ``doors`` y ``entries``, cada una con su nombre
+      en una línea y tantas filas como haga falta. ``walls`` tiene <alto> filas de <ancho>
+      valores de 4 bits; el resto usa las mismas filas que testCase.txt. Las líneas vacías
+      y lo que sigue a ``#`` se ignoran (ver save_scenario).
+    - El de testCase.txt: 6x8 con un número fijo de líneas por sección.
+    """
+    with open(path) as file:
+        lines = file.readlines()
+
+    content = [line.split("#", 1)[0].strip() for line in lines]
+    content = [line for line in content if line]
+    if content and content[0].split()[0] == "size":
+        return parse_sized_scenario(content, path)
+
+    # Procesar las líneas según la cantidad fija de líneas por sección
+    # Sección 1: matrix_walls (6 líneas)
+    matrix_walls = [line.split() for line in lines[:6]]
+
+    # Sección 2: matrix_poi (3 líneas)
+    matrix_poi = [process_poi_row(line) for line in lines[6:9]]
+
+    # Sección 3: matrix_goo (10 líneas)
+    matrix_goo = [list(map(int, line.split())) for line in lines[9:19]]
+
+    # Sección 4: matrix_doors (8 líneas)
+    matrix_doors = [list(map(int, line.split())) for line in lines[19:27]]
+
+    # Sección 5: matrix_entry_points (4 líneas)
+    matrix_entry_points = [list(map(int, line.split())) for line in lines[27:31]]
+
+    return Scenario(matrix_walls, matrix_poi, matrix_goo, matrix_doors, matrix_entry_points)
+
+def parse_sized_scenario(lines, path):
+    """Interpreta las líneas (sin comentarios ni líneas vacías) de un escenario con dimensiones."""
+    header = lines[0].split()
+    if len(header) != 3:
+        raise ValueError(f"{path}: se esperaba 'size <alto> <ancho>' y se encontró {lines[0]!r}")
+    height, width = int(header[1]), int(header[2])
+
+    sections = {name: [] for name in SCENARIO_SECTIONS}
+    current = None
+    for line in lines[1:]:
+        if line in sections:
+            current = line
+        elif current is None:
+            raise ValueError(f"{path}: línea fuera de una sección: {line!r}")
+        else:
+            sections[current].append(line)
+
+    matrix_walls = [line.split() for line in sections["walls"]]
+    if len(matrix_walls) != height or any(len(row) != width for row in matrix_walls):
+        raise ValueError(f"{path}: 'walls' debe tener {height} filas de {width} valores")
+
+    return Scenario(
+        matrix_walls,
+        [process_poi_row(line) for line in sections["pois"]],
+        [list(map(int, line.split())) for line in sections["goo"]],
+        [list(map(int, line.split())) for line in sections["doors"]],
+        [list(map(int, line.split())) for line in sections["entries"]],
+    )
+
+def save_scenario(scenario, path):
+    """Guarda un Scenario en el formato con dimensiones que lee load_scenario."""
+    walls, pois, goo, doors, entries = scenario
+    rows = {
+        "walls": [" ".join(row) for row in walls],
+        "pois": [" ".join(str(item) for item in row) for row in pois],
+        "goo": [" ".join(map(str, row)) for row in goo],
+        "doors": [" ".join(map(str, row)) for row in doors],
+        "entries": [" ".join(map(str, row)) for row in entries],
+    }
+    with open(path, "w") as file:
+        file.write(f"size {len(walls)} {len(walls[0])}\n")
+        for name in SCENARIO_SECTIONS:
+            file.write(f"{name}\n")
+            for row in rows[name]:
+                file.write(f"{row}\n")
+
+def save_checkpoint(model, path):
+    """Guarda ``model.snapshot()`` en un archivo (pickle) para reanudar la partida con load_checkpoint."""
+    with open(path, "wb") as file:
+        pickle.dump(model.snapshot(), file, protocol=pickle.HIGHEST_PROTOCOL)
+
+def load_checkpoint(path, record_trajectory=False):
+    """
+    Reanuda una partida guardada con save_checkpoint. Usa pickle: solo deben cargarse
+    archivos propios, nunca de fuentes no confiables.
+    """
+    with open(path, "rb") as file:
+        return ModeloEdificio.restore(pickle.load(file), record_trajectory=record_trajectory)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Corre una partida de ModeloEdificio y guarda su trayectoria.")
+    parser.add_argument("--scenario", default=DEFAULT_SCENARIO, help="Archivo del escenario.")
+    parser.add_argument("--steps", type=int, default=200, help="Pasos a simular.")
+    parser.add_argument("--seed", type=int, default=None, help="Semilla de la partida (por defecto, al azar).")
+    parser.add_argument("--output", default=None,
+                        help="Archivo de salida (por defecto simulation_output.json, .ndjson o .npz según el modo).")
+    parser.add_argument("--output-mode", choices=sorted(OUTPUT_SINKS), default="full", help="Formato de la trayectoria.")
+    parser.add_argument("--keyframe-interval", type=int, default=10, help="Pasos entre keyframes del formato delta.")
+    parser.add_argument("--step-mode", choices=STEP_MODES, default="action",
+                        help="Qué avanza cada paso: una acción, un turno o una ronda.")
+    parser.add_argument("--profile", action="store_true", help="Medir cada fase de step() e imprimir un resumen.")
+    parser.add_argument("--profile-output", default=None,
+                        help="Guardar las fases medidas en un archivo .json o .csv (implica --profile).")
+    parser.add_argument("--profile-allocations", action="store_true",
+                        help="Medir también bytes con tracemalloc (más lento; implica --profile).")
+    args = parser.parse_args(argv)
+    if args.output is None:
+        args.output = default_output(args.output_mode)
+
+    modelo = ModeloEdificio.from_scenario(load_scenario(args.scenario), seed=args.seed, step_mode=args.step_mode,
+                                          record_trajectory=args.output_mode != "summary")
+    profiler = None
+    if args.profile or args.profile_output or args.profile_allocations:
+        profiler = PhaseProfiler(track_allocations=args.profile_allocations).attach(modelo)
+    run_model_and_save_to_json(steps=args.steps, model_instance=modelo, output_file=args.output,
+                               output_mode=args.output_mode, keyframe_interval=args.keyframe_interval)
+    print(f"Semilla de la partida: {modelo.seed}")
+    if profiler is not None:
+        profiler.detach()
+        print(profiler.summary())
+        if args.profile_output:
+            profiler.save(args.profile_output, scenario=args.scenario, seed=modelo.seed, steps=modelo.steps,
+                          step_mode=args.step_mode, output_mode=args.output_mode)
 
 
-# Ejemplo de uso
 if __name__ == "__main__":
-    # Crear una instancia del modelo con datos iniciales
-    wall_data = matrix_walls  # Datos de paredes
-    poi_data = matrix_poi  # Datos de puntos de interés
-    goo_data = matrix_goo  # Datos de goo
-    doors_data = matrix_doors  # Datos de puertas
-    entry_points_data = matrix_entry_points  # Puntos de entrada
-
-    # Instanciar el modelo
-    modelo = ModeloEdificio(wall_data, poi_data, goo_data, doors_data, entry_points_data)
-
-    # Ejecutar el modelo y guardar los datos
-    run_model_and_save_to_json(steps=200, model_instance=modelo, output_file="simulation_output.json")
+    main()
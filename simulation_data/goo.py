@@ -0,0 +1,131 @@
+# -----------------------------------------------------------------------------------------------------------
+# IMPORTS
+# -----------------------------------------------------------------------------------------------------------
+
+# Importamos el siguiente paquete para el mejor manejo de valores numéricos.
+import numpy as np
+
+from board import GOO, DROPLET, THREAT
+
+# -----------------------------------------------------------------------------------------------------------
+# PROPAGACIÓN DE GOO
+# -----------------------------------------------------------------------------------------------------------
+
+# Hasta este número de celdas promote_droplets recorre el tablero celda por celda: cada
+# operación de NumPy cuesta unos microsegundos fijos y en tableros chicos (el de 6x8 del
+# juego) el recorrido sale ~2.5x más rápido; el punto de equilibrio está cerca de 300 celdas.
+LOOP_MAX_CELLS = 256
+
+def moore_any(mask):
+    """
+    Regresa una máscara con las celdas que tienen al menos una celda en ``mask`` dentro de su
+    ventana de Moore de 3x3 (sin envolver en los bordes). La ventana incluye la celda misma,
+    lo que no cambia nada al buscar goo junto a un droplet o a una celda vacía.
+    Se calcula por separado en columnas y filas (cuatro desplazamientos en lugar de ocho).
+    Acepta también un lote (B, H, W): la ventana se aplica a los dos últimos ejes.
+    """
+    rows = mask.copy()
+    rows[..., 1:] |= mask[..., :-1]
+    rows[..., :-1] |= mask[..., 1:]
+    result = rows.copy()
+    result[..., 1:, :] |= rows[..., :-1, :]
+    result[..., :-1, :] |= rows[..., 1:, :]
+    return result
+
+def _spread_right(seeds, droplets):
+    """Extiende cada semilla hacia la derecha mientras siga habiendo droplets contiguos en la fila."""
+    columns = np.arange(seeds.shape[-1])
+    last_seed = np.maximum.accumulate(np.where(seeds, columns, -1), axis=-1)
+    last_gap = np.maximum.accumulate(np.where(droplets, -1, columns), axis=-1)
+    return droplets & (last_seed > last_gap)
+
+def _promote_droplets_loop(board):
+    """promote_droplets celda por celda sobre listas de Python, para tableros chicos."""
+    rows = board.tolist()
+    height, width = board.shape
+    promoted = []
+    for x in range(height):
+        row = rows[x]
+        for y in range(width):
+            if row[y] & DROPLET:
+                window = rows[max(x - 1, 0):x + 2]
+                low, high = max(y - 1, 0), y + 2
+                if any(cell & GOO for neighbours in window for cell in neighbours[low:high]):
+                    row[y] = (row[y] & (0xFF ^ THREAT)) | GOO
+                    board[x, y] = row[y]
+                    promoted.append((x, y))
+    return promoted
+
+def promote_droplets(board):
+    """
+    Convierte en goo cada droplet que tenga goo en su vecindad de Moore, modificando el tablero
+    de bits (ver board.py) en su lugar.
+
+    Replica el recorrido celda por celda (filas y luego columnas) que cambia el arreglo
+    mientras avanza: un droplet recién convertido cuenta como goo para los droplets que
+    se revisan después (a su derecha y en la fila siguiente), pero no para los anteriores.
+    Las semillas (droplets junto a goo original) salen de una sola máscara para todo el
+    tablero; después solo se recorren, fila por fila, las filas por donde sigue una cadena
+    de droplets convertidos. Regresa las celdas (x, y) convertidas, en orden de filas.
+
+    Con NumPy cada llamada paga un costo fijo de varias operaciones sobre todo el tablero:
+    gana en tableros grandes (~4.7x en 60x80) pero pierde en los chicos, así que hasta
+    LOOP_MAX_CELLS celdas se usa el recorrido directo, que da el mismo resultado.
+    """
+    if board.size <= LOOP_MAX_CELLS:
+        return _promote_droplets_loop(board)
+    droplets = (board & DROPLET) != 0
+    if not droplets.any():
+        return []
+    seeds = droplets & moore_any((board & GOO) != 0)
+    if not seeds.any():
+        return []
+    seed_rows = np.flatnonzero(seeds.any(axis=1))
+
+    height = board.shape[0]
+    promoted = np.zeros_like(droplets)
+    previous = None  # Droplets convertidos en la fila anterior
+    x = seed_rows[0]
+    while x < height:
+        row_seeds = seeds[x]
+        if previous is not None:
+            # Arriba-izquierda, arriba y arriba-derecha de cada droplet de esta fila.
+            above = previous.copy()
+            above[1:] |= previous[:-1]
+            above[:-1] |= previous[1:]
+            row_seeds = row_seeds | above
+        row = _spread_right(row_seeds, droplets[x])
+        promoted[x] = row
+        if row.any():
+            previous = row
+            x += 1
+        else:
+            # La cadena se cortó: saltar a la siguiente fila con semillas.
+            previous = None
+            following = seed_rows[seed_rows > x]
+            if not len(following):
+                break
+            x = following[0]
+
+    board[promoted] = (board[promoted] & (0xFF ^ THREAT)) | GOO
+    return [tuple(cell) for cell in np.argwhere(promoted).tolist()]
+
+def promote_droplets_batch(boards):
+    """
+    promote_droplets para un lote de tableros (B, H, W), en su lugar: el mismo efecto en
+    cascada por filas, pero recorriendo todas las filas a la vez en los B tableros.
+    Regresa el número de droplets convertidos en cada tablero.
+    """
+    droplets = (boards & DROPLET) != 0
+    seeds = droplets & moore_any((boards & GOO) != 0)
+    promoted = np.zeros_like(droplets)
+    previous = np.zeros_like(droplets[:, 0])
+    for x in range(boards.shape[1]):
+        above = previous.copy()
+        above[:, 1:] |= previous[:, :-1]
+        above[:, :-1] |= previous[:, 1:]
+        previous = _spread_right(seeds[:, x] | above, droplets[:, x])
+        promoted[:, x] = previous
+
+    boards[promoted] = (boards[promoted] & (0xFF ^ THREAT)) | GOO
+    return promoted.sum(axis=(1, 2))
@@ -0,0 +1,123 @@
+# -----------------------------------------------------------------------------------------------------------
+# IMPORTS
+# -----------------------------------------------------------------------------------------------------------
+
+import heapq
+import math
+
+# -----------------------------------------------------------------------------------------------------------
+# CAMPOS DE DISTANCIA
+# -----------------------------------------------------------------------------------------------------------
+
+class DistanceField:
+    """
+    Distancia en puntos de acción (AP) desde cada celda hasta el objetivo más cercano.
+    Se calcula una sola vez con Dijkstra de múltiples fuentes (desde todos los objetivos
+    hacia afuera) y guarda, para cada celda, el siguiente paso y el objetivo al que lleva,
+    así que un agente solo hace búsquedas O(1) mientras el mapa no cambie.
+    Si una arista se abarata o aparece un objetivo nuevo, las distancias solo bajan y el
+    campo se corrige localmente (lower_edge, add_target) sin recalcularse completo.
+    """
+
+    def __init__(self, neighbor_edges, costs, targets, blocked=()):
+        """
+        - neighbor_edges: {celda: [(vecina, arista), ...]} (ver ModeloEdificio.build_edge_index).
+        - costs: Lista con el costo en AP de cruzar cada arista (math.inf si no se puede cruzar).
+        - targets: Celdas objetivo.
+        - blocked: Celdas a las que no se puede entrar (por ejemplo, el nido del LootBug).
+        """
+        self.neighbor_edges = neighbor_edges
+        self.costs = costs
+        self.blocked = blocked
+        self.distance = dict.fromkeys(neighbor_edges, math.inf)
+        self.next_hop = {}
+        self.target = {}
+        self._order = 0  # Desempate estable: los objetivos y vecinos se exploran en orden
+
+        heap = []
+        for cell in targets:
+            if cell in blocked or cell not in self.distance:
+                continue
+            self.distance[cell] = 0
+            self.target[cell] = cell
+            self._push(heap, 0, cell)
+        self._propagate(heap)
+
+    def _push(self, heap, distance, cell):
+        heapq.heappush(heap, (distance, self._order, cell))
+        self._order += 1
+
+    def _propagate(self, heap):
+        """Dijkstra desde las celdas del heap hacia sus vecinas mientras se encuentren caminos más baratos."""
+        distances = self.distance
+        while heap:
+            distance, _, cell = heapq.heappop(heap)
+            if distance > distances[cell]:
+                continue
+            for neighbor, edge in self.neighbor_edges[cell]:
+                if neighbor in self.blocked:
+                    continue
+                candidate = distance + self.costs[edge]
+                if candidate < distances[neighbor]:
+                    distances[neighbor] = candidate
+                    self.next_hop[neighbor] = cell
+                    self.target[neighbor] = self.target[cell]
+                    self._push(heap, candidate, neighbor)
+
+    def add_target(self, cell):
+        """Agrega un objetivo; solo se actualizan las celdas que ahora quedan más cerca de él."""
+        if cell in self.blocked or self.distance.get(cell, 0) == 0:
+            return
+        self.distance[cell] = 0
+        self.target[cell] = cell
+        self.next_hop.pop(cell, None)
+        heap = []
+        self._push(heap, 0, cell)
+        self._propagate(heap)
+
+    def lower_edge(self, edge, cell_a, cell_b, cost):
+        """Baja el costo de la arista entre ``cell_a`` y ``cell_b`` y corrige las distancias que mejoran."""
+        self.costs[edge] = cost
+        heap = []
+        for cell, neighbor in ((cell_a, cell_b), (cell_b, cell_a)):
+            if cell in self.blocked or neighbor in self.blocked:
+                continue
+            candidate = self.distance[neighbor] + cost
+            if candidate < self.distance[cell]:
+                self.distance[cell] = candidate
+                self.next_hop[cell] = neighbor
+                self.target[cell] = self.target[neighbor]
+                self._push(heap, candidate, cell)
+        self._propagate(heap)
+
+    def snapshot(self):
+        """Copia del estado del campo (sin neighbor_edges, que es fijo) para snapshots del modelo."""
+        return {
+            "costs": list(self.costs),
+            "blocked": set(self.blocked),
+            "distance": dict(self.distance),
+            "next_hop": dict(self.next_hop),
+            "target": dict(self.target),
+            "order": self._order,
+        }
+
+    @classmethod
+    def from_snapshot(cls, neighbor_edges, snapshot):
+        """Reconstruye un campo guardado con ``snapshot`` sin volver a correr Dijkstra."""
+        field = cls.__new__(cls)
+        field.neighbor_edges = neighbor_edges
+        field.costs = list(snapshot["costs"])
+        field.blocked = set(snapshot["blocked"])
+        field.distance = dict(snapshot["distance"])
+        field.next_hop = dict(snapshot["next_hop"])
+        field.target = dict(snapshot["target"])
+        field._order = snapshot["order"]
+        return field
+
+    def target_of(self, cell):
+        """Objetivo más cercano desde la celda, o None si ninguno es alcanzable."""
+        return self.target.get(cell)
+
+    def next_step(self, cell):
+        """Celda vecina a la que hay que avanzar desde ``cell``, o None si ya es un objetivo o no hay camino."""
+        return self.next_hop.get(cell)
@@ -0,0 +1,176 @@
+# -----------------------------------------------------------------------------------------------------------
+# IMPORTS
+# -----------------------------------------------------------------------------------------------------------
+
+import csv
+import json
+import sys
+import time
+import tracemalloc
+
+# -----------------------------------------------------------------------------------------------------------
+# FASES
+# -----------------------------------------------------------------------------------------------------------
+
+# Métodos que se miden en un ModeloEdificio: (dueño, método, fase). El dueño es "model",
+# "employees", "lootbugs" o "recorder". Las fases de end_turn quedan anidadas dentro de la
+# acción del agente que terminó su turno, y todas dentro de "step".
+MODEL_PHASES = (
+    ("model", "step", "step"),
+    ("employees", "step", "employee.action"),
+    ("lootbugs", "step", "lootbug.action"),
+    ("model", "end_game", "end_turn.end_game"),
+    ("model", "advance_goo", "end_turn.advance_goo"),
+    ("model", "check_secondary_effects", "end_turn.check_secondary_effects"),
+    ("employees", "knocked_down", "end_turn.knocked_down"),
+    ("model", "replenish_pois", "end_turn.replenish_pois"),
+    ("recorder", "collect", "recorder.collect"),
+)
+
+# Columnas del resumen y del CSV, en orden.
+COLUMNS = ("phase", "calls", "total_s", "self_s", "mean_us", "net_blocks", "net_bytes", "peak_bytes")
+
+# -----------------------------------------------------------------------------------------------------------
+# PERFILADOR
+# -----------------------------------------------------------------------------------------------------------
+
+class PhaseProfiler:
+    """
+    Tiempo, llamadas y memoria por fase de ModeloEdificio.step.
+
+    ``attach(model)`` reemplaza, solo en esa instancia, los métodos de MODEL_PHASES (del
+    modelo, de sus agentes y del recolector) por versiones que miden; ``detach()`` los
+    regresa. Un modelo sin perfilador no revisa nada en cada paso: no cuesta nada.
+
+    Por fase se guarda:
+    - calls: llamadas.
+    - total_s: tiempo de pared con las fases anidadas; self_s: sin ellas.
+    - net_blocks: bloques de memoria de Python que siguen vivos al salir (sys.getallocatedblocks).
+    - net_bytes: bytes que siguen vivos al salir, incluidos los arreglos de NumPy.
+    - peak_bytes: el mayor pico de memoria de una llamada sobre la que había al entrar, con
+      sus fases anidadas; cuenta los temporales que la fase crea y libera.
+    net_blocks y net_bytes son saldos, no conteos de asignaciones: una fase que crea y libera
+    miles de temporales da ~0 y una que libera más de lo que crea da un número negativo.
+    net_bytes y peak_bytes solo con ``track_allocations=True`` (tracemalloc, que hace todo
+    varias veces más lento).
+    """
+
+    def __init__(self, track_allocations=False):
+        self.track_allocations = track_allocations
+        self.phases = {}  # fase -> [calls, total, self, net_blocks, net_bytes, peak_bytes]
+        self._stack = []  # [fase, inicio, bloques, bytes, tiempo de las fases anidadas, pico]
+        self._wrapped = []  # (objeto, método) reemplazados por attach
+        self._started_tracing = False
+
+    def attach(self, model):
+        """Mide las fases de MODEL_PHASES en ``model``; regresa el perfilador."""
+        if self.track_allocations and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracing = True
+        agents = model.agent_store.agents
+        owners = {
+            "model": [model],
+            "employees": [agent for agent in agents if agent.unique_id < model.employee_agents],
+            "lootbugs": [agent for agent in agents if agent.unique_id >= model.employee_agents],
+            "recorder": [model.recorder] if model.recorder is not None else [],
+        }
+        for owner, method, phase in MODEL_PHASES:
+            for target in owners[owner]:
+                self.wrap(target, method, phase)
+        return self
+
+    def detach(self):
+        """Regresa los métodos originales (y detiene tracemalloc si lo inició attach)."""
+        for target, method in self._wrapped:
+            delattr(target, method)
+        self._wrapped = []
+        if self._started_tracing:
+            tracemalloc.stop()
+            self._started_tracing = False
+
+    def wrap(self, target, method, phase):
+        """Reemplaza ``target.method`` (un método de su clase) por una versión que mide ``phase``."""
+        function = getattr(target, method)
+        enter, leave = self.enter, self.leave
+
+        def measured(*args, **kwargs):
+            enter(phase)
+            try:
+                return function(*args, **kwargs)
+            finally:
+                leave()
+
+        setattr(target, method, measured)
+        self._wrapped.append((target, method))
+
+    def enter(self, phase):
+        """Empieza a medir ``phase`` (anidada dentro de la fase abierta, si hay)."""
+        memory = 0
+        if self.track_allocations:
+            # El pico de tracemalloc es uno solo: se guarda el de la fase abierta antes de reiniciarlo.
+            memory, peak = tracemalloc.get_traced_memory()
+            if self._stack:
+                self._stack[-1][5] = max(self._stack[-1][5], peak)
+            tracemalloc.reset_peak()
+        self._stack.append([phase, time.perf_counter(), sys.getallocatedblocks(), memory, 0.0, memory])
+
+    def leave(self):
+        """Termina la fase abierta más reciente y acumula sus datos."""
+        end = time.perf_counter()
+        blocks = sys.getallocatedblocks()
+        memory, peak = tracemalloc.get_traced_memory() if self.track_allocations else (0, 0)
+        phase, start, start_blocks, start_memory, children, child_peak = self._stack.pop()
+        peak = max(peak, child_peak)
+        elapsed = end - start
+        stats = self.phases.get(phase)
+        if stats is None:
+            stats = self.phases[phase] = [0, 0.0, 0.0, 0, 0, 0]
+        stats[0] += 1
+        stats[1] += elapsed
+        stats[2] += elapsed - children
+        stats[3] += blocks - start_blocks
+        stats[4] += memory - start_memory
+        stats[5] = max(stats[5], peak - start_memory)
+        if self._stack:
+            self._stack[-1][4] += elapsed
+            self._stack[-1][5] = max(self._stack[-1][5], peak)
+
+    def rows(self):
+        """Una fila por fase (ver COLUMNS), ordenadas por tiempo total."""
+        rows = []
+        for phase, (calls, total, own, blocks, memory, peak) in self.phases.items():
+            tracked = self.track_allocations
+            rows.append({"phase": phase, "calls": calls, "total_s": total, "self_s": own,
+                         "mean_us": total / calls * 1e6, "net_blocks": blocks,
+                         "net_bytes": memory if tracked else None, "peak_bytes": peak if tracked else None})
+        return sorted(rows, key=lambda row: -row["total_s"])
+
+    def summary(self):
+        """Tabla de texto con las fases y su porcentaje del tiempo de ``step``."""
+        rows = self.rows()
+        step_total = self.phases["step"][1] if "step" in self.phases else sum(row["self_s"] for row in rows)
+        lines = [f"{'fase':<34} {'llamadas':>9} {'total s':>9} {'propio s':>9} {'media µs':>10} "
+                 f"{'% paso':>7} {'bloq. net':>9} {'bytes net':>11} {'pico bytes':>11}"]
+        for row in rows:
+            memory = " ".join(f"{row[key]:>11,}" if row[key] is not None else f"{'-':>11}"
+                              for key in ("net_bytes", "peak_bytes"))
+            share = row["total_s"] / step_total * 100 if step_total else 0.0
+            lines.append(f"{row['phase']:<34} {row['calls']:>9} {row['total_s']:>9.4f} {row['self_s']:>9.4f} "
+                         f"{row['mean_us']:>10.1f} {share:>7.1f} {row['net_blocks']:>9,} {memory}")
+        return "\n".join(lines)
+
+    def save(self, path, **metadata):
+        """
+        Guarda las filas en ``path``: CSV si termina en .csv, JSON en otro caso
+        (``{"metadata": ..., "phases": [...]}``, con los datos extra de ``metadata``).
+        """
+        rows = self.rows()
+        if path.endswith(".csv"):
+            with open(path, "w", newline="") as file:
+                writer = csv.DictWriter(file, fieldnames=COLUMNS)
+                writer.writeheader()
+                writer.writerows(rows)
+        else:
+            metadata = dict(metadata, track_allocations=self.track_allocations)
+            with open(path, "w") as file:
+                json.dump({"metadata": metadata, "phases": rows}, file, indent=2)
@@ -0,0 +1,95 @@
+# -----------------------------------------------------------------------------------------------------------
+# PLANIFICADOR POR TURNOS
+# -----------------------------------------------------------------------------------------------------------
+
+# Granularidad de un paso del modelo:
+# - "action": una activación del agente en turno (una acción).
+# - "turn": activaciones del agente en turno hasta que termine su turno.
+# - "round": turnos hasta que todos los agentes hayan jugado una vez.
+STEP_MODES = ("action", "turn", "round")
+
+# Límite de activaciones por turno en un solo paso, para que un agente que no puede
+# terminar su turno no deje al paso en un ciclo infinito (el siguiente paso lo reintenta).
+MAX_ACTIVATIONS_PER_TURN = 64
+
+class TurnScheduler:
+    """
+    Planificador para juegos por turnos: los agentes juegan en el orden en que se agregaron
+    y en cada activación solo se llama a ``step`` del agente en turno. El agente avisa que
+    terminó su turno con ``end_turn``; el planificador pasa al siguiente y, después del
+    último, empieza una nueva ronda.
+    Conserva la interfaz de los schedulers de Mesa que usa el modelo (add, agents, steps, time).
+    """
+
+    def __init__(self, model, step_mode="action"):
+        if step_mode not in STEP_MODES:
+            raise ValueError(f"Modo de paso desconocido: {step_mode} (se esperaba uno de {', '.join(STEP_MODES)})")
+        self.model = model
+        self.step_mode = step_mode
+        self._agents = []  # Agentes en orden de turno
+        self.turn = 0  # Índice del agente en turno
+        self.rounds = 0  # Rondas completas
+        self.activations = 0  # Llamadas a step de agentes
+        self.steps = 0
+        self.time = 0
+
+    def add(self, agent):
+        """Agrega un agente al final del orden de turnos."""
+        self._agents.append(agent)
+
+    @property
+    def agents(self):
+        """Lista de los agentes en orden de turno."""
+        return list(self._agents)
+
+    def get_agent_count(self):
+        return len(self._agents)
+
+    @property
+    def current_agent(self):
+        return self._agents[self.turn]
+
+    def snapshot(self):
+        """Turno, contadores y modo de paso (los agentes los guarda el snapshot del modelo)."""
+        return {"step_mode": self.step_mode, "turn": self.turn, "rounds": self.rounds,
+                "activations": self.activations, "steps": self.steps, "time": self.time}
+
+    def load_snapshot(self, snapshot):
+        self.step_mode = snapshot["step_mode"]
+        self.turn = snapshot["turn"]
+        self.rounds = snapshot["rounds"]
+        self.activations = snapshot["activations"]
+        self.steps = snapshot["steps"]
+        self.time = snapshot["time"]
+
+    def end_turn(self):
+        """Pasa el turno al siguiente agente (y a una nueva ronda después del último)."""
+        self.turn += 1
+        if self.turn >= len(self._agents):
+            self.turn = 0
+            self.rounds += 1
+
+    def activate(self):
+        """Activa solo al agente en turno. Regresa True si con esa activación terminó su turno."""
+        turn, rounds = self.turn, self.rounds
+        self._agents[turn].step()
+        self.activations += 1
+        return self.turn != turn or self.rounds != rounds
+
+    def step(self):
+        """Avanza una acción, un turno o una ronda según ``step_mode``."""
+        if self._agents:
+            if self.step_mode == "action":
+                self.activate()
+            else:
+                limit = MAX_ACTIVATIONS_PER_TURN
+                if self.step_mode == "round":
+                    limit *= len(self._agents)
+                rounds = self.rounds
+                for _ in range(limit):
+                    if self.activate() and (self.step_mode == "turn" or self.rounds != rounds):
+                        break
+                    if not self.model.running:
+                        break
+        self.steps += 1
+        self.time += 1
@@ -0,0 +1,471 @@
+# -----------------------------------------------------------------------------------------------------------
+# IMPORTS
+# -----------------------------------------------------------------------------------------------------------
+
+# Importamos el siguiente paquete para el mejor manejo de valores numéricos.
+import numpy as np
+
+import json
+
+# -----------------------------------------------------------------------------------------------------------
+# FORMATO
+# -----------------------------------------------------------------------------------------------------------
+
+# Capas (H, W) que se guardan en cada paso, en el orden en que aparecen en el JSON.
+GRID_LAYERS = ("grid_doors_entries", "grid_walls", "grid_poi", "grid_threat_markers", "grid_agents")
+
+# Códigos enteros para los estados de paredes y puertas.
+WALL_STATE_CODES = {"okay": 0, "damaged": 1, "destroyed": 2}
+DOOR_STATE_CODES = {"closed": 0, "open": 1, "removed": 2}
+WALL_STATE_NAMES = tuple(WALL_STATE_CODES)
+DOOR_STATE_NAMES = tuple(DOOR_STATE_CODES)
+
+# Registro de ancho fijo para cada agente en cada paso.
+AGENT_DTYPE = np.dtype([("x", np.int16), ("y", np.int16), ("value", np.int8), ("carrying_victim", np.bool_)])
+
+# -----------------------------------------------------------------------------------------------------------
+# RECOLECTOR
+# -----------------------------------------------------------------------------------------------------------
+
+class TrajectoryRecorder:
+    """
+    Recolector de la trayectoria de un ModeloEdificio.
+    Escribe cada paso directamente en buffers de NumPy preasignados que crecen al doble
+    cuando se llenan, sin pasar por objetos de Python por paso ni por pandas.
+    Los sinks (JsonSink, BinarySink, ...) reciben el recolector y deciden cómo guardarlo.
+    """
+
+    def __init__(self, model, capacity=64, sinks=None, retain=True):
+        """
+        - model: Modelo del que se recolecta; fija las dimensiones y las aristas.
+        - capacity: Número de pasos preasignados antes del primer crecimiento.
+        - sinks: Sinks que se notifican en cada paso (ver TrajectorySink).
+        - retain: Si es False, solo se conserva el último paso (los sinks de streaming ya
+          lo escribieron), así que la memoria no crece con la duración de la corrida.
+        """
+        self.height, self.width = model.height, model.width
+        self.size = 0
+        self.capacity = max(1, capacity)
+        self.retain = retain
+        self.collected = 0  # Pasos recolectados en total, aunque no se conserven
+
+        # Aristas: su posición en estas listas es su id en los arreglos de estados.
+        # Los ids del modelo permiten copiar todos los estados de un paso con un solo índice.
+        self.wall_edge_ids = np.array(model.wall_edges, dtype=np.intp)
+        self.door_edge_ids = np.array(model.door_edges, dtype=np.intp)
+        self.wall_edges = [model.edge_cells[edge] for edge in model.wall_edges]
+        self.door_edges = [model.edge_cells[edge] for edge in model.door_edges]
+
+        # Agentes en orden estable por unique_id.
+        self.agents = sorted(model.schedule.agents, key=lambda agent: agent.unique_id)
+        self.agent_values = [agent.grid_value for agent in self.agents]
+        self.agent_store = model.agent_store
+        self.agent_store_ids = np.array([agent.index for agent in self.agents], dtype=np.intp)
+
+        # Superposición fija de entradas y nido sobre la matriz de puertas.
+        overlay = np.zeros((self.height, self.width), dtype=np.int8)
+        for x, y in model.entry_points:
+            overlay[x, y] = 16
+        nest_x, nest_y = model.lootbug_nest
+        overlay[nest_x, nest_y] = 32
+        self._entries_overlay = overlay
+
+        self.buffers = self._allocate(self.capacity)
+        self.sinks = list(sinks or [])
+        for sink in self.sinks:
+            sink.start(self)
+
+    def _allocate(self, capacity):
+        """Crea los buffers vacíos para ``capacity`` pasos."""
+        buffers = {layer: np.zeros((capacity, self.height, self.width), dtype=np.int8) for layer in GRID_LAYERS}
+        buffers["agents"] = np.zeros((capacity, len(self.agents)), dtype=AGENT_DTYPE)
+        buffers["wall_states"] = np.zeros((capacity, len(self.wall_edges)), dtype=np.int8)
+        buffers["door_states"] = np.zeros((capacity, len(self.door_edges)), dtype=np.int8)
+        buffers["step"] = np.zeros(capacity, dtype=np.int32)
+        buffers["collapsed_building"] = np.zeros(capacity, dtype=np.bool_)
+        buffers["saved_victims"] = np.zeros(capacity, dtype=np.int16)
+        buffers["lost_victims"] = np.zeros(capacity, dtype=np.int16)
+        return buffers
+
+    def _grow(self):
+        """Duplica la capacidad copiando los pasos ya recolectados."""
+        new_capacity = self.capacity * 2
+        new_buffers = self._allocate(new_capacity)
+        for name, buffer in self.buffers.items():
+            new_buffers[name][:self.size] = buffer[:self.size]
+        self.buffers = new_buffers
+        self.capacity = new_capacity
+
+    def add_sink(self, sink):
+        """Agrega un sink y le entrega los pasos que ya se habían recolectado."""
+        self.sinks.append(sink)
+        sink.start(self)
+        for index in range(self.size):
+            sink.step(self, index)
+
+    def collect(self, model):
+        """Guarda el estado actual del modelo como el siguiente paso."""
+        if not self.retain:
+            self.size = 0  # Reutilizar la primera fila: el paso anterior ya se entregó a los sinks
+        if self.size == self.capacity:
+            self._grow()
+        index = self.size
+        buffers = self.buffers
+
+        np.maximum(model.doors, self._entries_overlay, out=buffers["grid_doors_entries"][index], casting="unsafe")
+        buffers["grid_walls"][index] = model.walls
+        buffers["grid_poi"][index] = model.poi_placement
+        buffers["grid_threat_markers"][index] = model.threat_markers
+
+        # Igual que el get_grid anterior (benchmarks/bench_recorder.py): si varios agentes comparten celda, gana el último en la lista de la celda.
+        agents_grid = buffers["grid_agents"][index]
+        agents_grid.fill(0)
+        agents_row = buffers["agents"][index]
+        store, ids = self.agent_store, self.agent_store_ids
+        agents_row["x"] = store.x[ids]
+        agents_row["y"] = store.y[ids]
+        agents_row["value"] = self.agent_values
+        agents_row["carrying_victim"] = store.carrying[ids]
+        for x, y in zip(agents_row["x"].tolist(), agents_row["y"].tolist()):
+            if not agents_grid[x, y]:
+                agents_grid[x, y] = model.grid[x, y][-1].grid_value
+
+        buffers["wall_states"][index] = model.wall_code[self.wall_edge_ids]
+        buffers["door_states"][index] = model.door_code[self.door_edge_ids]
+        buffers["step"][index] = model.steps
+        buffers["collapsed_building"][index] = model.collapsed_building
+        buffers["saved_victims"][index] = model.saved_victims
+        buffers["lost_victims"][index] = model.lost_victims
+        self.size += 1
+        self.collected += 1
+
+        for sink in self.sinks:
+            sink.step(self, index)
+
+    def arrays(self):
+        """Regresa vistas (sin copiar) de los pasos recolectados."""
+        return {name: buffer[:self.size] for name, buffer in self.buffers.items()}
+
+    def __len__(self):
+        return self.size
+
+    def record(self, index):
+        """Regresa el paso ``index`` con el mismo formato de registro del JSON de salida."""
+        buffers = self.buffers
+        record = {"step": int(buffers["step"][index])}
+        for layer in GRID_LAYERS:
+            record[layer] = buffers[layer][index].tolist()
+        record["agents_info"] = self.agents_info(index)
+        record["wall_states"] = {
+            str(edge): WALL_STATE_NAMES[code] for edge, code in zip(self.wall_edges, buffers["wall_states"][index].tolist())
+        }
+        record["door_states"] = {
+            str(edge): DOOR_STATE_NAMES[code] for edge, code in zip(self.door_edges, buffers["door_states"][index].tolist())
+        }
+        record["collapsed_building"] = bool(buffers["collapsed_building"][index])
+        record["saved_victims"] = int(buffers["saved_victims"][index])
+        record["lost_victims"] = int(buffers["lost_victims"][index])
+        return record
+
+    def agents_info(self, index):
+        """Campo ``agents_info`` del paso ``index``."""
+        return [
+            {"position": [int(x), int(y)], "value": int(value), "carrying_victim": bool(carrying)}
+            for x, y, value, carrying in self.buffers["agents"][index].tolist()
+        ]
+
+    def records(self):
+        """Itera los pasos recolectados como registros."""
+        for index in range(self.size):
+            yield self.record(index)
+
+    def save(self, sink, summary):
+        """Entrega la trayectoria completa a un sink (y lo desconecta si recibía cada paso)."""
+        if sink in self.sinks:
+            self.sinks.remove(sink)
+        sink.finish(self, summary)
+
+# -----------------------------------------------------------------------------------------------------------
+# SINKS
+# -----------------------------------------------------------------------------------------------------------
+
+class TrajectorySink:
+    """
+    Destino de una trayectoria. Un sink puede escribir paso a paso (``step``) o todo
+    al final (``finish``); el recolector llama ``start`` al agregarlo.
+    Los sinks con ``streaming = True`` escriben cada paso en cuanto se recolecta; los que
+    tienen ``collects = False`` no usan los pasos, así que la corrida puede no recolectarlos.
+    """
+
+    streaming = False
+    collects = True
+
+    def start(self, recorder):
+        pass
+
+    def step(self, recorder, index):
+        pass
+
+    def finish(self, recorder, summary):
+        raise NotImplementedError
+
+
+class JsonSink(TrajectorySink):
+    """Guarda ``{"simulation_data": [...], "summary": {...}}`` con cada paso completo."""
+
+    def __init__(self, output_file, indent=4):
+        self.output_file = output_file
+        self.indent = indent
+
+    def finish(self, recorder, summary):
+        json_data = {"simulation_data": list(recorder.records()), "summary": summary}
+        with open(self.output_file, "w") as outfile:
+            json.dump(json_data, outfile, indent=self.indent)
+
+
+class DeltaJsonSink(TrajectorySink):
+    """Guarda keyframes cada ``keyframe_interval`` pasos y diferencias entre ellos (ver encode_delta_recorder)."""
+
+    def __init__(self, output_file, keyframe_interval=10):
+        if keyframe_interval < 1:
+            raise ValueError("keyframe_interval debe ser al menos 1")
+        self.output_file = output_file
+        self.keyframe_interval = keyframe_interval
+
+    def finish(self, recorder, summary):
+        json_data = {
+            "format": "delta",
+            "keyframe_interval": self.keyframe_interval,
+            "simulation_data": encode_delta_recorder(recorder, self.keyframe_interval),
+            "summary": summary,
+        }
+        # El formato delta se escribe compacto: el objetivo es que su tamaño dependa de los cambios.
+        with open(self.output_file, "w") as outfile:
+            json.dump(json_data, outfile, separators=(",", ":"))
+
+
+class BinarySink(TrajectorySink):
+    """
+    Guarda la trayectoria en un .npz sin compresión para que pueda abrirse con memory-map.
+    - Cada grid se guarda como un arreglo (steps, H, W) int8.
+    - Los agentes se guardan como un arreglo estructurado (steps, n_agentes) de AGENT_DTYPE.
+    - Paredes y puertas se guardan como (steps, n_aristas) int8 con WALL/DOOR_STATE_CODES,
+      más los arreglos ``*_edges`` que dan las celdas de cada arista.
+    Igual que np.savez, agrega ``.npz`` al nombre si no lo tiene: server.py reconoce el
+    formato por esa extensión.
+    """
+
+    def __init__(self, output_file):
+        if not output_file.endswith(".npz"):
+            output_file += ".npz"
+        self.output_file = output_file
+
+    def finish(self, recorder, summary):
+        arrays = recorder.arrays()
+        arrays["wall_edges"] = edges_array(recorder.wall_edges)
+        arrays["door_edges"] = edges_array(recorder.door_edges)
+        arrays["summary"] = np.array(json.dumps(summary))
+
+        # np.savez guarda sin compresión: cada arreglo queda contiguo dentro del zip.
+        with open(self.output_file, "wb") as outfile:
+            np.savez(outfile, **arrays)
+
+class StreamingJsonSink(TrajectorySink):
+    """
+    Escribe el mismo documento ``{"simulation_data": [...], "summary": {...}}`` que JsonSink,
+    pero cada paso sale al archivo en cuanto se recolecta y no se guarda en memoria.
+    """
+
+    streaming = True
+
+    def __init__(self, output_file):
+        self.output_file = output_file
+        self._file = None
+        self._steps_written = 0
+
+    def start(self, recorder):
+        self._file = open(self.output_file, "w")
+        self._file.write('{"simulation_data": [')
+        self._steps_written = 0
+
+    def step(self, recorder, index):
+        separator = ",\n" if self._steps_written else "\n"
+        self._file.write(separator + json.dumps(recorder.record(index)))
+        self._steps_written += 1
+
+    def finish(self, recorder, summary):
+        self._file.write('\n], "summary": ' + json.dumps(summary) + "}\n")
+        self._file.close()
+        self._file = None
+
+
+class NdjsonSink(TrajectorySink):
+    """
+    Escribe un registro JSON por línea en cuanto se recolecta cada paso y, al terminar,
+    una última línea ``{"summary": {...}}``. Cada línea se vacía al disco, así que el
+    servidor puede ir leyendo el archivo mientras la simulación sigue corriendo.
+    """
+
+    streaming = True
+
+    def __init__(self, output_file):
+        self.output_file = output_file
+        self._file = None
+
+    def start(self, recorder):
+        self._file = open(self.output_file, "w")
+
+    def step(self, recorder, index):
+        self._file.write(json.dumps(recorder.record(index)) + "\n")
+        self._file.flush()
+
+    def finish(self, recorder, summary):
+        self._file.write(json.dumps({"summary": summary}) + "\n")
+        self._file.close()
+        self._file = None
+
+
+class SummarySink(TrajectorySink):
+    """
+    Guarda solo ``{"summary": {...}}``. No necesita pasos (``collects = False``): las
+    corridas de Monte Carlo no pagan por recolectar grids que nadie lee.
+    """
+
+    collects = False
+
+    def __init__(self, output_file):
+        self.output_file = output_file
+
+    def finish(self, recorder, summary):
+        with open(self.output_file, "w") as outfile:
+            json.dump({"summary": summary}, outfile, indent=4)
+
+# -----------------------------------------------------------------------------------------------------------
+# CODIFICACIÓN
+# -----------------------------------------------------------------------------------------------------------
+
+def edges_array(edges):
+    """Convierte aristas ((x1, y1), (x2, y2)) en un arreglo (n_aristas, 4) int16."""
+    return np.array([[x1, y1, x2, y2] for (x1, y1), (x2, y2) in edges], dtype=np.int16).reshape(-1, 4)
+
+def diff_grid(previous, current):
+    """
+    Regresa las celdas que cambiaron entre dos grids como una lista de [x, y, valor].
+    """
+    previous_array = np.asarray(previous)
+    current_array = np.asarray(current)
+    if previous_array.shape != current_array.shape:
+        return None  # Cambió la forma: no se puede expresar como diferencias por celda
+    return [[int(x), int(y), current[x][y]] for x, y in np.argwhere(previous_array != current_array)]
+
+def encode_delta_step(previous, record):
+    """
+    Regresa las diferencias de ``record`` contra el registro anterior:
+    * campos "grid_*": lista de celdas [x, y, valor] que cambiaron.
+    * campos diccionario (wall_states, door_states): solo las llaves que cambiaron.
+    * cualquier otro campo: el valor nuevo completo, solo si cambió.
+    """
+    delta = {}
+    for field, value in record.items():
+        old_value = previous.get(field)
+        if field.startswith("grid_"):
+            cells = diff_grid(old_value, value)
+            if cells is None:
+                delta[field] = {"full": value}
+            elif cells:
+                delta[field] = cells
+        elif isinstance(value, dict) and isinstance(old_value, dict):
+            changed = {key: state for key, state in value.items() if old_value.get(key) != state}
+            if changed:
+                delta[field] = changed
+        elif value != old_value:
+            delta[field] = value
+    return delta
+
+def encode_delta_steps(records, keyframe_interval):
+    """
+    Codifica una secuencia de pasos como keyframes cada ``keyframe_interval`` pasos y
+    diferencias contra el paso anterior en los demás.
+    - Keyframe: {"step": n, "keyframe": {registro completo}}
+    - Delta: {"step": n, "delta": {campo: cambio}} (ver encode_delta_step).
+    """
+    encoded = []
+    previous = None
+    for index, record in enumerate(records):
+        if previous is None or index % keyframe_interval == 0:
+            encoded.append({"step": record["step"], "keyframe": record})
+        else:
+            encoded.append({"step": record["step"], "delta": encode_delta_step(previous, record)})
+        previous = record
+    return encoded
+
+def changes_by_step(current, previous):
+    """
+    Compara dos arreglos (pasos, ...) paso contra paso y regresa ``(índices, fronteras)``:
+    ``índices`` son las tuplas de np.nonzero de los cambios (ordenadas por paso) y los
+    cambios del paso ``i`` de ``current`` están en ``fronteras[i]:fronteras[i + 1]``.
+    """
+    changed = np.nonzero(current != previous)
+    bounds = np.searchsorted(changed[0], np.arange(len(current) + 1))
+    return changed, bounds.tolist()
+
+def encode_delta_recorder(recorder, keyframe_interval):
+    """
+    Mismo resultado que ``encode_delta_steps(recorder.records(), keyframe_interval)``, pero
+    las diferencias salen de los buffers del recolector: cada capa se compara contra el
+    paso anterior con una sola operación de NumPy para toda la corrida, y solo los keyframes
+    y los cambios se convierten en objetos de Python. El trabajo en Python crece con el
+    número de cambios y no con celdas x pasos.
+    """
+    size = len(recorder)
+    if not size:
+        return []
+    arrays = recorder.arrays()
+    current = {name: array[1:] for name, array in arrays.items()}
+    previous = {name: array[:-1] for name, array in arrays.items()}
+
+    # Celdas [x, y, valor] que cambiaron en cada capa; cambios[capa][i] es del paso i + 1.
+    grid_changes = {}
+    for layer in GRID_LAYERS:
+        (steps, xs, ys), bounds = changes_by_step(current[layer], previous[layer])
+        cells = np.stack([xs, ys, current[layer][steps, xs, ys]], axis=1).tolist()
+        grid_changes[layer] = [cells[bounds[i]:bounds[i + 1]] for i in range(size - 1)]
+
+    # Estados de paredes y puertas: {arista: estado} con solo las aristas que cambiaron.
+    state_changes = {}
+    for field, edges, names in (("wall_states", recorder.wall_edges, WALL_STATE_NAMES),
+                                ("door_states", recorder.door_edges, DOOR_STATE_NAMES)):
+        (steps, edge_ids), bounds = changes_by_step(current[field], previous[field])
+        codes = current[field][steps, edge_ids].tolist()
+        edge_ids = edge_ids.tolist()
+        state_changes[field] = [{str(edges[edge_ids[k]]): names[codes[k]] for k in range(bounds[i], bounds[i + 1])}
+                                for i in range(size - 1)]
+
+    agents_changed = (current["agents"] != previous["agents"]).any(axis=1).tolist()
+    scalars = [(name, cast, arrays[name].tolist()) for name, cast in
+               (("collapsed_building", bool), ("saved_victims", int), ("lost_victims", int))]
+    step_numbers = arrays["step"].tolist()
+
+    encoded = []
+    for index in range(size):
+        if index % keyframe_interval == 0:
+            encoded.append({"step": step_numbers[index], "keyframe": recorder.record(index)})
+            continue
+        change = index - 1
+        # Mismo orden de campos que un registro (ver TrajectoryRecorder.record).
+        delta = {}
+        if step_numbers[index] != step_numbers[index - 1]:
+            delta["step"] = step_numbers[index]
+        for layer in GRID_LAYERS:
+            if grid_changes[layer][change]:
+                delta[layer] = grid_changes[layer][change]
+        if agents_changed[change]:
+            delta["agents_info"] = recorder.agents_info(index)
+        for field in ("wall_states", "door_states"):
+            if state_changes[field][change]:
+                delta[field] = state_changes[field][change]
+        for name, cast, values in scalars:
+            if values[index] != values[index - 1]:
+                delta[name] = cast(values[index])
+        encoded.append({"step": step_numbers[index], "delta": delta})
+    return encoded